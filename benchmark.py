@@ -0,0 +1,718 @@
+"""
+效能測試腳本
+- parser: 比較頁面解析器的處理速度（合成頁面文字或已儲存的頁面文字檔）
+- excel:  比較 openpyxl 與 excel_reader 讀取 DATA/ 全部 Excel 檔案的速度
+- suite:  以合成資料逐一測量各階段（頁面解析、Excel 寫入與讀取、歷史資料檔、GitHub / Drive 同步與匯入）
+          的時間與記憶體峰值，結果存成 JSON 並與 benchmark_baseline.json 比較；
+          GitHub 與 Google Drive 以本機 HTTP 替身伺服器代替，不需要網路；本機應用程式的 config、
+          data_manager、import_historical_data 以替身代替，匯入不寫入任何資料庫
+- startup: 以 python -X importtime 測量 etf_cli.py 各子指令的模組載入時間，
+           檢查是否超出預算、是否載入了不該載入的套件（selenium、openpyxl 等）
+
+用法:
+    python benchmark.py parser
+    python benchmark.py parser --holdings 50 1000 5000 --pages page1.txt page2.txt
+    python benchmark.py excel DATA
+    python benchmark.py suite --funds 3 --days 120 --check
+    python benchmark.py suite --update-baseline
+    python benchmark.py startup --check
+"""
+import io
+import os
+import re
+import gc
+import sys
+import json
+import random
+import hashlib
+import shutil
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+import argparse
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlsplit, parse_qs
+
+from portfolio_parser import parse_portfolio_text
+from history_store import normalize_date
+import excel_reader
+
+
+def _time_call(func, arg, min_time=0.2):
+    """重複執行直到累積 min_time 秒，回傳每次平均秒數"""
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        func(arg)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return elapsed / runs
+
+
+def bench_parser(holdings_sizes, page_files):
+    """比較新舊解析器並確認結果一致"""
+    from tests.legacy_parser import legacy_parse, synthetic_page_text
+
+    cases = [(f'synthetic-{n}', synthetic_page_text(n)) for n in holdings_sizes]
+    cases += [(Path(p).name, Path(p).read_text(encoding='utf-8')) for p in page_files]
+
+    print(f"{'輸入':<24}{'行數':>8}{'舊版 ms':>12}{'新版 ms':>12}{'加速':>8}")
+    for name, text in cases:
+        expected = legacy_parse(text)
+        actual = parse_portfolio_text(text, verbose=False)
+        if actual != expected:
+            print(f"❌ {name}: 新舊解析結果不一致")
+            continue
+        old = _time_call(legacy_parse, text)
+        new = _time_call(lambda t: parse_portfolio_text(t, verbose=False), text)
+        lines = text.count('\n') + 1
+        print(f"{name:<24}{lines:>8}{old * 1000:>12.3f}{new * 1000:>12.3f}{old / new:>7.1f}x")
+
+
+def openpyxl_read(filepath):
+    """以 openpyxl 讀取固定版面（比較基準）"""
+    import openpyxl
+
+    wb = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
+    rows = list(wb.active.iter_rows(values_only=True))
+    wb.close()
+
+    def cell(row, col):
+        if row - 1 < len(rows) and col - 1 < len(rows[row - 1]):
+            return rows[row - 1][col - 1]
+        return None
+
+    fund_info = {}
+    for key, ref, _ in excel_reader.FUND_INFO_CELLS:
+        value = cell(int(ref[1:]), ord(ref[0]) - ord('A') + 1)
+        if value is not None:
+            fund_info[key] = value
+
+    holdings = []
+    for row in rows[excel_reader.HOLDINGS_START_ROW - 1:]:
+        if not row or not row[0]:
+            continue
+        holdings.append({
+            'stock_code': str(row[0]),
+            'stock_name': str(row[1]),
+            'shares': float(str(row[2]).replace(',', '')),
+            'weight': float(str(row[3]).rstrip('%')),
+        })
+    date = normalize_date(str(cell(1, 1)).split('：')[-1])
+    return {'date': date, 'holdings': holdings, 'fund_info': fund_info}
+
+
+def bench_excel(data_dir, workers):
+    """比較 openpyxl、excel_reader（單行程）與 excel_reader（行程池）讀取整個目錄"""
+    import warnings
+    warnings.filterwarnings('ignore', category=UserWarning, module='openpyxl')
+
+    files = excel_reader.list_portfolio_files(data_dir)
+    paths = [path for path, _, _ in files]
+    print(f"檔案數: {len(paths)}")
+
+    start = time.perf_counter()
+    baseline = [openpyxl_read(p) for p in paths]
+    t_openpyxl = time.perf_counter() - start
+
+    start = time.perf_counter()
+    fast = [excel_reader.read_portfolio(p) for p in paths]
+    t_serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel = [data for _, data in excel_reader.read_directory(data_dir, workers)]
+    t_parallel = time.perf_counter() - start
+
+    mismatched = 0
+    for expected, actual in zip(baseline, fast):
+        # 文字版面的基金資產與 openpyxl 讀到的字串相同；持股一律比對數值
+        if expected['date'] != actual['date'] or expected['holdings'] != actual['holdings']:
+            mismatched += 1
+    if mismatched or len(parallel) != len(fast):
+        print(f"❌ 讀取結果不一致：{mismatched} 個檔案")
+
+    print(f"{'方式':<28}{'總秒數':>10}{'每檔 ms':>10}")
+    for name, elapsed in [
+        ('openpyxl', t_openpyxl),
+        ('excel_reader', t_serial),
+        (f'excel_reader（{workers or "全部"} 行程）', t_parallel),
+    ]:
+        print(f"{name:<28}{elapsed:>10.3f}{elapsed / max(1, len(paths)) * 1000:>10.2f}")
+
+
+# ---- 端對端測試組 ----
+
+DEFAULT_RESULTS_PATH = Path('benchmark_results.json')
+DEFAULT_BASELINE_PATH = Path('benchmark_baseline.json')
+RESULTS_VERSION = 1
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """
+    GitHub 與 Google Drive 的本機替身，提供同步模組用到的端點：
+        GET /github/git/trees/<branch>        git trees 列表（Excel 與 archive/ 下的封存檔；含 ETag，If-None-Match 相符時回應 304）
+        GET /raw/DATA/<檔名>                   檔案內容
+        GET /drive/v3/files?q=...              Drive 資料夾列表（分頁）
+        GET /drive/v3/files/<id>?alt=media    Drive 檔案內容
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body, content_type='application/octet-stream', status=200, headers=None):
+        # 記錄每個請求（路徑、狀態碼、用戶端連接埠），測試可由此檢查條件請求與連線重複使用
+        self.server.requests.append((self.path, status, self.client_address[1]))
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, name):
+        filepath = self.server.data_dir / name
+        if '..' in name or not filepath.is_file():
+            self._send(b'{}', 'application/json', 404)
+            return
+        self._send(filepath.read_bytes())
+
+    def do_GET(self):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        names = sorted(p.name for p in self.server.data_dir.glob('ETF_Investment_Portfolio_*.xlsx'))
+
+        if url.path.startswith('/github/git/trees/'):
+            tree = [{'path': f'DATA/{name}', 'type': 'blob', 'sha': name, 'size': 0} for name in names]
+            archive_dir = self.server.data_dir / 'archive'
+            for filepath in sorted(archive_dir.rglob('*')) if archive_dir.exists() else []:
+                if filepath.is_file():
+                    content = filepath.read_bytes()
+                    tree.append({'path': f'DATA/{filepath.relative_to(self.server.data_dir).as_posix()}',
+                                 'type': 'blob', 'sha': hashlib.sha1(content).hexdigest(), 'size': len(content)})
+            body = json.dumps({'tree': tree, 'truncated': False}).encode('utf-8')
+            etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+            if self.headers.get('If-None-Match') == etag:
+                self._send(b'', status=304, headers={'ETag': etag})
+                return
+            self._send(body, 'application/json', headers={'ETag': etag})
+        elif url.path.startswith('/raw/DATA/'):
+            self._send_file(url.path[len('/raw/DATA/'):])
+        elif url.path == '/drive/v3/files':
+            size = min(int(params.get('pageSize', ['100'])[0]), 100)
+            start = int(params.get('pageToken', ['0'])[0])
+            page = {'files': [
+                {'id': name, 'name': name, 'modifiedTime': '2026-01-01T00:00:00Z', 'md5Checksum': None}
+                for name in names[start:start + size]
+            ]}
+            if start + size < len(names):
+                page['nextPageToken'] = str(start + size)
+            self._send(json.dumps(page).encode('utf-8'), 'application/json')
+        elif url.path.startswith('/drive/v3/files/') and params.get('alt') == ['media']:
+            self._send_file(url.path[len('/drive/v3/files/'):])
+        else:
+            self._send(b'{}', 'application/json', 404)
+
+
+class StandInServer(ThreadingHTTPServer):
+    """在背景執行緒執行的替身伺服器（port 0 表示自動選擇）"""
+    daemon_threads = True
+
+    def __init__(self, data_dir, latency=0.0, host='127.0.0.1', port=0):
+        super().__init__((host, port), _StandInHandler)
+        self.data_dir = Path(data_dir)
+        self.latency = latency
+        self.requests = []
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+class StandInDataManager:
+    """本機 DataManager 的替身：資料庫是空的，寫入只記錄日期"""
+
+    def __init__(self):
+        self.saved = []
+
+    def get_all_dates(self):
+        return []
+
+    def _save_to_database(self, date, holdings):
+        self.saved.append(date)
+
+    def save_fund_statistics(self, date, asset_allocation):
+        pass
+
+
+@contextmanager
+def stand_in_modules(data_dir):
+    """
+    以替身取代本機應用程式的模組（不在此 repository 中）：
+        config                  DATA_DIR、BASE_DIR 指向 data_dir
+        data_manager            DataManager 為 StandInDataManager
+        import_historical_data  parse_excel_file 改用 excel_reader.read_portfolio
+    行程池以 fork 啟動時子行程也使用替身
+
+    Yields:
+        建立過的 StandInDataManager 列表
+    """
+    managers = []
+
+    def make_manager():
+        managers.append(StandInDataManager())
+        return managers[-1]
+
+    data_dir = Path(data_dir)
+    data_dir.mkdir(parents=True, exist_ok=True)
+    modules = {
+        'config': types.ModuleType('config'),
+        'data_manager': types.ModuleType('data_manager'),
+        'import_historical_data': types.ModuleType('import_historical_data'),
+    }
+    modules['config'].DATA_DIR = data_dir
+    modules['config'].BASE_DIR = data_dir.parent
+    modules['data_manager'].DataManager = make_manager
+    modules['import_historical_data'].parse_excel_file = excel_reader.read_portfolio
+    with mock.patch.dict(sys.modules, modules):
+        yield managers
+
+
+def run_stage(name, func, memory=True, repeat=3):
+    """
+    執行一個階段並測量時間與記憶體峰值（tracemalloc，只計 Python 配置的記憶體）
+
+    時間取 repeat 次中的最小值，減少其他行程造成的雜訊；tracemalloc 會明顯拖慢執行，
+    因此記憶體另外再執行一次測量，階段函式必須可以重複執行；
+    func 回傳處理的項目數；缺少選用模組（ImportError）時略過該階段
+
+    Returns:
+        {'seconds', 'items', 'per_item_ms', 'peak_kb'}；略過時回傳 None
+    """
+    peak = 0
+    elapsed = None
+    try:
+        # 各模組逐檔輸出的訊息不顯示
+        with redirect_stdout(io.StringIO()):
+            for _ in range(max(1, repeat)):
+                gc.collect()
+                start = time.perf_counter()
+                items = func()
+                seconds = time.perf_counter() - start
+                elapsed = seconds if elapsed is None else min(elapsed, seconds)
+            if memory:
+                gc.collect()
+                tracemalloc.start()
+                try:
+                    func()
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+    except ImportError as e:
+        print(f"⏭️  {name}: 略過（{e}）")
+        return None
+    return {
+        'seconds': round(elapsed, 4),
+        'items': items,
+        'per_item_ms': round(elapsed / max(1, items) * 1000, 4),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def bench_suite(n_funds=3, n_days=120, n_holdings=50, seed=0, workdir=None, latency=0.0, memory=True, repeat=3):
+    """
+    以合成資料執行端對端測試
+
+    Returns:
+        測試結果 dict（可直接存成 JSON）
+    """
+    import synthetic_data
+    from history_store import HistoryStore
+    from page_archive import parse_snapshot
+
+    own_dir = workdir is None
+    workdir = Path(workdir or tempfile.mkdtemp(prefix='etf-bench-'))
+    data_dir = workdir / 'data'
+    workdir.mkdir(parents=True, exist_ok=True)
+    generated = {}
+    stages = {}
+
+    def generate():
+        generated.clear()
+        generated.update(synthetic_data.generate(data_dir, n_funds, n_days, n_holdings, seed=seed, excel=False))
+        return sum(len(p) for p in generated.values())
+
+    def parse_pages():
+        mismatched = 0
+        snapshots = synthetic_data.page_fixture_paths(data_dir)
+        expected = {(code, p['date']): p for code, items in generated.items() for p in items}
+        for fund_code, date, filepath in snapshots:
+            if parse_snapshot(filepath) != expected[(fund_code, date)]:
+                mismatched += 1
+        if mismatched:
+            raise ValueError(f"{mismatched} 份頁面的解析結果與產生的資料不同")
+        return len(snapshots)
+
+    def save_excel():
+        from fetch_and_save import save_to_excel
+        for fund_code, items in generated.items():
+            for portfolio_data in items:
+                save_to_excel(portfolio_data, fund_code=fund_code, output_dir=str(data_dir))
+        return sum(len(p) for p in generated.values())
+
+    def excel_paths():
+        return [path for path, _, _ in excel_reader.list_portfolio_files(data_dir)]
+
+    def read_excel():
+        paths = excel_paths()
+        for filepath in paths:
+            excel_reader.read_portfolio(filepath)
+        return len(paths)
+
+    def parse_files():
+        # 同步匯入時的平行解析（bulk_import.parse_files），解析函式為替身
+        from bulk_import import parse_files as parse
+        paths = excel_paths()
+        with stand_in_modules(workdir / 'parse'):
+            parsed = parse(paths)
+        if len(parsed) != len(paths):
+            raise ValueError(f"{len(paths) - len(parsed)} 個檔案解析失敗")
+        return len(parsed)
+
+    def history_append():
+        store = HistoryStore(workdir / 'history.bin')
+        if store.path.exists():
+            store.path.unlink()
+        for fund_code, items in generated.items():
+            store.append_many(items, fund_code=fund_code)
+        return sum(len(p) for p in generated.values())
+
+    def history_load():
+        store = HistoryStore(workdir / 'history.bin')
+        return sum(1 for _ in store.records())
+
+    def fresh(*paths):
+        for path in paths:
+            if path.is_dir():
+                shutil.rmtree(path)
+            elif path.exists():
+                path.unlink()
+
+    def github_sync():
+        from github_sync import GitHubSync
+        fresh(workdir / 'github', workdir / 'github_state.json')
+        with StandInServer(data_dir, latency) as server:
+            sync = GitHubSync(api_base=f"{server.base_url}/github", raw_base=f"{server.base_url}/raw",
+                              state_path=workdir / 'github_state.json')
+            files = sync.get_latest_files()
+            results = sync.download_files([f['name'] for f in files], save_dir=workdir / 'github')
+            sync.session.close()
+        return len(results)
+
+    def drive_sync():
+        from drive_sync import GoogleDriveSync
+        fresh(workdir / 'drive')
+        with StandInServer(data_dir, latency) as server:
+            sync = GoogleDriveSync(folder_url='https://drive.google.com/drive/folders/BENCH',
+                                   mirror_dir=workdir / 'drive', api_key='bench',
+                                   api_base=f"{server.base_url}/drive/v3")
+            results = sync.download_files()
+            sync.session.close()
+        return len(results or {})
+
+    def imported(managers):
+        if not managers or not managers[-1].saved:
+            raise ValueError("沒有匯入任何日期")
+        return len(managers[-1].saved)
+
+    def github_import():
+        # sync_to_database：列表、下載缺少的日期、解析並匯入（只從 GitHub）
+        from github_sync import GitHubSync
+        fresh(workdir / 'github_import', workdir / 'github_import_state.json')
+        with StandInServer(data_dir, latency) as server, stand_in_modules(workdir / 'github_import') as managers:
+            sync = GitHubSync(api_base=f"{server.base_url}/github", raw_base=f"{server.base_url}/raw",
+                              state_path=workdir / 'github_import_state.json')
+            sync.sync_to_database(race_drive=False)
+            sync.session.close()
+        return imported(managers)
+
+    def drive_import():
+        # sync_to_database：列表、下載到鏡像、解析、複製到 DATA 並匯入
+        from drive_sync import GoogleDriveSync
+        fresh(workdir / 'drive_import', workdir / 'drive_mirror')
+        with StandInServer(data_dir, latency) as server, stand_in_modules(workdir / 'drive_import') as managers:
+            sync = GoogleDriveSync(folder_url='https://drive.google.com/drive/folders/BENCH',
+                                   mirror_dir=workdir / 'drive_mirror', api_key='bench',
+                                   api_base=f"{server.base_url}/drive/v3")
+            sync.sync_to_database()
+            sync.session.close()
+        return imported(managers)
+
+    print(f"合成資料: {n_funds} 檔基金 × {n_days} 天 × {n_holdings} 檔持股（工作目錄 {workdir}）")
+    print(f"{'階段':<20}{'項目':>8}{'總秒數':>10}{'每項 ms':>10}{'記憶體峰值 KB':>16}")
+    try:
+        for name, func in [
+            ('generate', generate),
+            ('parse_pages', parse_pages),
+            ('save_excel', save_excel),
+            ('read_excel', read_excel),
+            ('parse_files', parse_files),
+            ('history_append', history_append),
+            ('history_load', history_load),
+            ('github_sync', github_sync),
+            ('drive_sync', drive_sync),
+            ('github_import', github_import),
+            ('drive_import', drive_import),
+        ]:
+            result = run_stage(name, func, memory, repeat)
+            if result is None:
+                continue
+            stages[name] = result
+            print(f"{name:<20}{result['items']:>8}{result['seconds']:>10.3f}{result['per_item_ms']:>10.3f}"
+                  f"{result['peak_kb']:>16,.0f}")
+    finally:
+        if own_dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'version': RESULTS_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'config': {'funds': n_funds, 'days': n_days, 'holdings': n_holdings, 'seed': seed,
+                   'latency': latency, 'memory': memory, 'repeat': repeat},
+        'environment': {'python': platform.python_version(), 'platform': platform.platform(),
+                        'cpus': os.cpu_count()},
+        'stages': stages,
+    }
+
+
+def compare_results(results, baseline, time_tolerance=0.3, memory_tolerance=0.2, time_floor_ms=0.5):
+    """
+    與基準比較每項平均時間與記憶體峰值
+
+    每項時間須同時超出基準 time_floor_ms 以上與 time_tolerance 比例才算退步：
+    每項不到 0.1 ms 的階段，計時誤差就足以超出比例；
+    基準中有、本次卻沒有執行的階段（例如缺少模組而略過）也視為退步，避免少測的階段掩蓋退步
+
+    Returns:
+        超出容許範圍或缺少的項目 [(階段, 指標, 基準值, 本次值)]
+    """
+    if baseline.get('config') != results.get('config'):
+        print("⚠️  基準的測試設定與本次不同，比較結果僅供參考")
+    regressions = []
+    print(f"{'階段':<20}{'每項 ms（基準）':>18}{'每項 ms':>10}{'記憶體 KB（基準）':>20}{'記憶體 KB':>12}")
+    for name, current in results['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if base is None:
+            print(f"{name:<20}{'-':>18}{current['per_item_ms']:>10.3f}{'-':>20}{current['peak_kb']:>12,.0f}")
+            continue
+        flags = ''
+        if (current['per_item_ms'] > base['per_item_ms'] * (1 + time_tolerance)
+                and current['per_item_ms'] - base['per_item_ms'] > time_floor_ms):
+            regressions.append((name, 'per_item_ms', base['per_item_ms'], current['per_item_ms']))
+            flags += ' ⚠️ 時間'
+        if base['peak_kb'] and current['peak_kb'] > base['peak_kb'] * (1 + memory_tolerance):
+            regressions.append((name, 'peak_kb', base['peak_kb'], current['peak_kb']))
+            flags += ' ⚠️ 記憶體'
+        print(f"{name:<20}{base['per_item_ms']:>18.3f}{current['per_item_ms']:>10.3f}"
+              f"{base['peak_kb']:>20,.0f}{current['peak_kb']:>12,.0f}{flags}")
+    for name, base in baseline.get('stages', {}).items():
+        if name not in results['stages']:
+            regressions.append((name, 'missing', base['per_item_ms'], None))
+            print(f"{name:<20}{base['per_item_ms']:>18.3f}{'-':>10}{base['peak_kb']:>20,.0f}{'-':>12} ⚠️ 未執行")
+    return regressions
+
+
+# 子指令啟動預算：(etf_cli.py 參數, 模組載入時間上限 ms)；{history}、{index} 代換為合成資料路徑
+STARTUP_BUDGETS = [
+    (['--help'], 60),
+    (['status', '--path', '{history}'], 60),
+    (['query', 'portfolio', '--path', '{history}'], 60),
+    (['query', 'stock', '{stock}', '--index-dir', '{index}', '--path', '{history}'], 60),
+    (['save', '--help'], 100),
+    (['sync', '--help'], 100),
+]
+# 只有實際擷取、寫入 Excel、連線或計算時才需要的套件，任何子指令在啟動時都不該載入
+HEAVY_MODULES = ('selenium', 'webdriver_manager', 'openpyxl', 'requests', 'googleapiclient', 'google.oauth2',
+                 'gdown', 'numpy', 'scipy', 'pandas')
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)')
+
+
+def import_profile(argv, cwd=None):
+    """
+    以 python -X importtime 執行一次，回傳 {模組: 自身載入時間 µs}（依載入順序）
+
+    Raises:
+        RuntimeError: 指令以非零狀態結束（載入中途失敗時測得的時間沒有意義）
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + argv, cwd=cwd,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, encoding='utf-8')
+    modules = {}
+    errors = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match:
+            modules[match.group(4)] = int(match.group(1))
+        elif line.strip():
+            errors.append(line.strip())
+    if result.returncode != 0:
+        raise RuntimeError(f"結束狀態 {result.returncode}：{errors[-1] if errors else '沒有錯誤訊息'}")
+    return modules
+
+
+def bench_startup(repeat=5, budgets=STARTUP_BUDGETS):
+    """
+    測量 etf_cli.py 各子指令的模組載入時間（扣除直譯器本身啟動時載入的模組，取多次中的最小值）
+
+    Returns:
+        超出預算或載入了重量級套件的項目 [(子指令, 原因)]
+    """
+    import synthetic_data
+    from history_store import HistoryStore
+    from stock_index import StockIndex
+
+    cli = str(Path(__file__).resolve().with_name('etf_cli.py'))
+    workdir = Path(tempfile.mkdtemp(prefix='etf_startup_'))
+    try:
+        rng = random.Random(0)
+        universe = synthetic_data.stock_universe(150, rng)
+        store = HistoryStore(workdir / 'history.bin')
+        store.append_many(list(synthetic_data.generate_fund(synthetic_data.DEFAULT_FUND_CODE,
+                                                            synthetic_data.trading_days(60), 50, universe)))
+        index = StockIndex(workdir / 'index')
+        with redirect_stdout(io.StringIO()):
+            index.rebuild(store)
+        values = {'history': str(workdir / 'history.bin'), 'index': str(workdir / 'index'),
+                  'stock': index.codes()[0]}
+
+        # 直譯器啟動時就會載入的模組（site、encodings 等）不算在子指令內
+        interpreter = set(import_profile(['-c', 'pass']))
+        failures = []
+        print(f"{'子指令':<40}{'載入 ms':>10}{'預算 ms':>10}{'模組數':>8}")
+        for argv, budget_ms in budgets:
+            argv = [arg.format(**values) for arg in argv]
+            label = ' '.join(a for a in argv if not a.startswith(str(workdir)))
+            best = None
+            try:
+                for _ in range(repeat):
+                    modules = {name: us for name, us in import_profile([cli] + argv).items()
+                               if name not in interpreter}
+                    total_ms = sum(modules.values()) / 1000
+                    if best is None or total_ms < best[0]:
+                        best = (total_ms, modules)
+            except RuntimeError as e:
+                failures.append((label, f"執行失敗（{e}）"))
+                print(f"{label:<40}{'-':>10}{budget_ms:>10}{'-':>8} ❌ 執行失敗")
+                continue
+            total_ms, modules = best
+            heavy = sorted({m for name in modules for m in HEAVY_MODULES if name == m or name.startswith(m + '.')})
+            flags = ''
+            if total_ms > budget_ms:
+                failures.append((label, f"載入 {total_ms:.1f} ms，超出預算 {budget_ms} ms"))
+                flags += ' ⚠️ 超出預算'
+            if heavy:
+                failures.append((label, f"載入了 {', '.join(heavy)}"))
+                flags += ' ⚠️ 重量級套件'
+            print(f"{label:<40}{total_ms:>10.1f}{budget_ms:>10}{len(modules):>8}{flags}")
+            if heavy or total_ms > budget_ms:
+                slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:5]
+                print('    最慢的模組: ' + ', '.join(f"{name} {us / 1000:.1f} ms" for name, us in slowest))
+        return failures
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='ETF 投資組合效能測試')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    parser_bench = sub.add_parser('parser', help='頁面解析器')
+    parser_bench.add_argument('--holdings', type=int, nargs='+', default=[50, 500, 2000, 5000],
+                              help='合成頁面的持股筆數')
+    parser_bench.add_argument('--pages', nargs='*', default=[], help='已儲存的頁面文字檔')
+
+    excel_bench = sub.add_parser('excel', help='Excel 讀取')
+    excel_bench.add_argument('data_dir', nargs='?', default='DATA')
+    excel_bench.add_argument('--workers', type=int, default=None, help='行程數（預設為 CPU 數）')
+
+    suite_bench = sub.add_parser('suite', help='以合成資料執行端對端測試並與基準比較')
+    suite_bench.add_argument('--funds', type=int, default=3, help='基金數')
+    suite_bench.add_argument('--days', type=int, default=120, help='交易日數')
+    suite_bench.add_argument('--holdings', type=int, default=50, help='每檔基金的持股數')
+    suite_bench.add_argument('--seed', type=int, default=0)
+    suite_bench.add_argument('--latency', type=float, default=0.0, help='替身伺服器每個請求的延遲（秒）')
+    suite_bench.add_argument('--workdir', default=None, help='保留合成資料的目錄（預設使用暫存目錄並於結束後刪除）')
+    suite_bench.add_argument('--no-memory', action='store_true', help='不測量記憶體（不另外執行 tracemalloc 測量）')
+    suite_bench.add_argument('--repeat', type=int, default=3, help='每個階段計時的次數（取最小值）')
+    suite_bench.add_argument('--output', default=str(DEFAULT_RESULTS_PATH), help='結果 JSON 路徑')
+    suite_bench.add_argument('--baseline', default=str(DEFAULT_BASELINE_PATH), help='基準 JSON 路徑')
+    suite_bench.add_argument('--time-tolerance', type=float, default=0.3, help='每項時間可超出基準的比例')
+    suite_bench.add_argument('--time-floor', type=float, default=0.5, help='每項時間至少超出基準幾 ms 才算退步')
+    suite_bench.add_argument('--memory-tolerance', type=float, default=0.2, help='記憶體峰值可超出基準的比例')
+    suite_bench.add_argument('--check', action='store_true', help='有退步時以非零狀態結束')
+    suite_bench.add_argument('--update-baseline', action='store_true', help='以本次結果取代基準')
+
+    startup_bench = sub.add_parser('startup', help='etf_cli.py 各子指令的模組載入時間與預算')
+    startup_bench.add_argument('--repeat', type=int, default=5, help='每個子指令執行次數（取最小值）')
+    startup_bench.add_argument('--check', action='store_true', help='超出預算時以非零狀態結束')
+
+    args = parser.parse_args()
+
+    if args.command == 'parser':
+        bench_parser(args.holdings, args.pages)
+    elif args.command == 'excel':
+        bench_excel(args.data_dir, args.workers)
+    elif args.command == 'suite':
+        results = bench_suite(args.funds, args.days, args.holdings, args.seed, args.workdir, args.latency,
+                              memory=not args.no_memory, repeat=args.repeat)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=1)
+        print(f"✅ 結果已儲存: {args.output}")
+
+        baseline_path = Path(args.baseline)
+        if args.update_baseline:
+            with open(baseline_path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, indent=1)
+            print(f"✅ 已更新基準: {baseline_path}")
+        elif baseline_path.exists():
+            with open(baseline_path, encoding='utf-8') as f:
+                baseline = json.load(f)
+            regressions = compare_results(results, baseline, args.time_tolerance, args.memory_tolerance,
+                                          args.time_floor)
+            if regressions:
+                print(f"⚠️  {len(regressions)} 項超出基準或未執行")
+                if args.check:
+                    sys.exit(1)
+            else:
+                print("✅ 所有階段都在基準範圍內")
+        else:
+            print(f"⚠️  找不到基準 {baseline_path}，可用 --update-baseline 建立")
+    elif args.command == 'startup':
+        failures = bench_startup(args.repeat)
+        if failures:
+            for label, reason in failures:
+                print(f"❌ {label}: {reason}")
+            if args.check:
+                sys.exit(1)
+        else:
+            print("✅ 所有子指令都在啟動預算內")
@@ -0,0 +1,108 @@
+"""
+批次匯入模組 - 平行解析多個日期的 Excel，再依日期順序逐日寫入
+解析分散到行程池平行處理；寫入仍經由 DataManager 的 _save_to_database / save_fund_statistics，
+每個日期各自提交（DataManager 沒有公開資料庫連線，無法合併為單一交易）。
+匯入筆數由寫入結果直接計算，不需要再掃描整個資料庫
+"""
+import os
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _parse_one(filepath):
+    """行程池工作函式：回傳 (檔案路徑, 資料, 錯誤訊息)"""
+    try:
+        from import_historical_data import parse_excel_file
+        return filepath, parse_excel_file(filepath), None
+    except Exception as e:
+        return filepath, None, str(e)
+
+
+def parse_files(filepaths, workers=None):
+    """
+    以多行程平行解析 Excel 檔案
+
+    Args:
+        filepaths: Excel 檔案路徑列表
+        workers: 行程數（預設為 CPU 數；1 表示不使用行程池）
+
+    Returns:
+        [(檔案路徑, 投資組合資料)]，順序與輸入相同；解析失敗的檔案會輸出錯誤並略過
+    """
+    paths = [str(p) for p in filepaths]
+    if not paths:
+        return []
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 8:
+        results = list(map(_parse_one, paths))
+    else:
+        chunksize = max(1, len(paths) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_parse_one, paths, chunksize=chunksize))
+
+    parsed = []
+    for path, data, error in results:
+        if error:
+            print(f"❌ 解析失敗 {Path(path).name}: {error}")
+        else:
+            parsed.append((path, data))
+    return parsed
+
+
+def _portfolio_rows(portfolios):
+    """轉為 (日期, 持股, 資產配置) 列表，依日期排序，同一日期只保留最後一筆"""
+    by_date = {}
+    for portfolio_data in portfolios:
+        by_date[portfolio_data['date']] = portfolio_data
+    return [
+        (date, by_date[date]['holdings'], by_date[date].get('asset_allocation'))
+        for date in sorted(by_date)
+    ]
+
+
+def import_portfolios(manager, portfolios):
+    """
+    將多個日期的投資組合依日期順序寫入資料庫
+
+    使用 DataManager 既有的 _save_to_database / save_fund_statistics 逐日寫入（每個日期各自提交）；
+    同一日期只寫入最後一筆，單一日期失敗不影響其他日期
+
+    Returns:
+        (成功寫入的日期數, 失敗的日期數)
+    """
+    rows = _portfolio_rows(portfolios)
+    if not rows:
+        return 0, 0
+
+    imported = 0
+    failed = 0
+    for date, holdings, asset_allocation in rows:
+        try:
+            manager._save_to_database(date, holdings)
+            if asset_allocation is not None:
+                manager.save_fund_statistics(date, asset_allocation)
+            imported += 1
+        except Exception as e:
+            print(f"  ❌ 匯入失敗 {date}: {e}")
+            failed += 1
+    return imported, failed
+
+
+def import_files(manager, filepaths, existing_dates=(), workers=None):
+    """
+    解析並匯入多個 Excel 檔案，已存在的日期不寫入
+
+    Returns:
+        (成功寫入的日期數, 失敗的日期數, 已存在而略過的日期數)
+    """
+    existing_dates = set(existing_dates)
+    portfolios = []
+    skipped = 0
+    for _, portfolio_data in parse_files(filepaths, workers):
+        if portfolio_data['date'] in existing_dates:
+            skipped += 1
+            continue
+        portfolios.append(portfolio_data)
+    imported, failed = import_portfolios(manager, portfolios)
+    return imported, failed, skipped
@@ -0,0 +1,313 @@
+"""
+精簡投資組合模組 - 以共用的股票表與陣列欄位存放每日持股，取代每筆持股一個 dict 的表示方式
+股票代號與名稱在整段歷史中只存一份（以整數編號引用），股數與權重存在 array('d')，
+基金資產資訊解析一次後存成整數；需要原本的 dict 格式時可用 to_dict() 轉回，內容與原本完全相同
+
+用法:
+    table = StockTable()
+    compact = CompactPortfolio.from_dict(portfolio_data, table)
+    portfolio_data = compact.to_dict()
+
+    portfolios = HistoryStore().load_compact()       # 直接由歷史資料檔解碼，不經過 dict
+"""
+import re
+import sys
+from array import array
+
+from history_store import date_to_int, int_to_date
+
+
+# 基金資產資訊欄位與格式：amount 為 'NTD 40,529,643,608'，units 為 '2,596,709,000'，weight 為 '2.18%'
+FUND_INFO_FIELDS = (
+    ('net_asset', 'amount'),
+    ('outstanding_units', 'units'),
+    ('nav', 'amount'),
+    ('futures', 'amount'),
+    ('futures_weight', 'weight'),
+    ('stocks_value', 'amount'),
+    ('stocks_weight', 'weight'),
+    ('cash', 'amount'),
+    ('cash_weight', 'weight'),
+    ('futures_margin', 'amount'),
+    ('futures_margin_weight', 'weight'),
+    ('subscription_payable', 'amount'),
+    ('subscription_payable_weight', 'weight'),
+    ('securities_payable', 'amount'),
+    ('securities_payable_weight', 'weight'),
+)
+FUND_INFO_INDEX = {key: i for i, (key, _) in enumerate(FUND_INFO_FIELDS)}
+FIELD_PATTERNS = {
+    'amount': re.compile(r'^NTD (-?)(\d{1,3}(?:,\d{3})*)(?:\.(\d+))?$'),
+    'units': re.compile(r'^(-?)(\d{1,3}(?:,\d{3})*)(?:\.(\d+))?$'),
+    'weight': re.compile(r'^(-?)(\d+)(?:\.(\d+))?%$'),
+}
+# 小數位數欄位中代表「沒有這個欄位」的值
+MISSING = 255
+
+
+def parse_info_value(text, kind):
+    """
+    將基金資產資訊的字串解析為 (整數值, 小數位數)，例如 'NTD 16.40' → (1640, 2)
+
+    格式不符時回傳 None（由呼叫端保留原字串）
+    """
+    match = FIELD_PATTERNS[kind].match(text) if isinstance(text, str) else None
+    if not match:
+        return None
+    sign, integer, fraction = match.groups()
+    fraction = fraction or ''
+    if len(fraction) >= MISSING or (sign and not int(integer.replace(',', '') + fraction)):
+        return None
+    value = int(integer.replace(',', '') + fraction)
+    return (-value if sign else value), len(fraction)
+
+
+def format_info_value(value, decimals, kind):
+    """parse_info_value 的反向轉換，還原為原本的字串"""
+    sign = '-' if value < 0 else ''
+    digits = str(abs(value)).rjust(decimals + 1, '0')
+    integer, fraction = (digits[:-decimals], digits[-decimals:]) if decimals else (digits, '')
+    if kind == 'weight':
+        text = integer
+    else:
+        text = f"{int(integer):,}"
+    if fraction:
+        text += '.' + fraction
+    if kind == 'amount':
+        return f"NTD {sign}{text}"
+    if kind == 'weight':
+        return f"{sign}{text}%"
+    return sign + text
+
+
+class StockTable:
+    """
+    共用的股票表：每個（股票代號, 股票名稱）組合只存一次，以整數編號引用
+
+    同一代號改名時會得到新的編號，因此每一天都能還原當天的名稱
+    """
+
+    def __init__(self):
+        self.codes = []
+        self.names = []
+        self._ids = {}
+
+    def __len__(self):
+        return len(self.codes)
+
+    def intern(self, stock_code, stock_name):
+        """回傳組合的編號（新組合會加入表中）"""
+        key = (stock_code, stock_name)
+        stock_id = self._ids.get(key)
+        if stock_id is None:
+            stock_id = len(self.codes)
+            self.codes.append(sys.intern(stock_code))
+            self.names.append(sys.intern(stock_name))
+            self._ids[key] = stock_id
+        return stock_id
+
+    def intern_many(self, codes, names):
+        """一次加入多筆，回傳 array('I') 編號"""
+        intern = self.intern
+        return array('I', (intern(c, n) for c, n in zip(codes, names)))
+
+
+# 未指定股票表時共用同一份，不同日期、不同來源載入的持股都引用相同的字串
+SHARED_TABLE = StockTable()
+
+
+class CompactPortfolio:
+    """
+    單日投資組合的精簡表示
+
+    屬性：
+        date        整數日期 YYYYMMDD
+        stock_ids   array('I')，股票表中的編號
+        shares      array('d')
+        weights     array('d')，單位為 %
+        info_values array('q')，FUND_INFO_FIELDS 各欄位的整數值（依小數位數放大）
+        info_scales bytes，各欄位的小數位數，MISSING 表示沒有這個欄位
+        extra_info  無法解析為整數的其他欄位（通常為 None）
+        table       StockTable
+    """
+
+    __slots__ = ('date', 'stock_ids', 'shares', 'weights', 'info_values', 'info_scales', 'extra_info', 'table')
+
+    def __init__(self, date, stock_ids, shares, weights, info_values, info_scales, extra_info=None, table=None):
+        self.date = date
+        self.stock_ids = stock_ids
+        self.shares = shares
+        self.weights = weights
+        self.info_values = info_values
+        self.info_scales = info_scales
+        self.extra_info = extra_info
+        self.table = table if table is not None else SHARED_TABLE
+
+    def __len__(self):
+        return len(self.stock_ids)
+
+    def __repr__(self):
+        return f"CompactPortfolio({int_to_date(self.date)}, {len(self)} 筆持股)"
+
+    @staticmethod
+    def _encode_info(fund_info):
+        values = array('q', bytes(8 * len(FUND_INFO_FIELDS)))
+        scales = bytearray([MISSING] * len(FUND_INFO_FIELDS))
+        extra = None
+        for key, text in fund_info.items():
+            i = FUND_INFO_INDEX.get(key)
+            parsed = parse_info_value(text, FUND_INFO_FIELDS[i][1]) if i is not None else None
+            if parsed is None:
+                extra = extra or {}
+                extra[key] = text
+                continue
+            values[i], scales[i] = parsed
+        return values, bytes(scales), extra
+
+    @classmethod
+    def from_columns(cls, date, codes, names, shares, weights, fund_info, table=None):
+        """由欄位資料建立（歷史資料檔解碼後直接使用，不必先建立 dict）"""
+        table = table if table is not None else SHARED_TABLE
+        info_values, info_scales, extra = cls._encode_info(fund_info)
+        return cls(
+            date_to_int(date) if isinstance(date, str) else date,
+            table.intern_many(codes, names),
+            shares if isinstance(shares, array) else array('d', shares),
+            weights if isinstance(weights, array) else array('d', weights),
+            info_values, info_scales, extra, table,
+        )
+
+    @classmethod
+    def from_dict(cls, portfolio_data, table=None):
+        """由 fetch_etf_data 格式的 dict 建立"""
+        holdings = portfolio_data['holdings']
+        return cls.from_columns(
+            portfolio_data['date'],
+            [h['stock_code'] for h in holdings],
+            [h['stock_name'] for h in holdings],
+            array('d', (float(h['shares']) for h in holdings)),
+            array('d', (float(h['weight']) for h in holdings)),
+            portfolio_data.get('fund_info', {}),
+            table,
+        )
+
+    # ---- 讀取 ----
+
+    @property
+    def date_str(self):
+        return int_to_date(self.date)
+
+    @property
+    def codes(self):
+        table_codes = self.table.codes
+        return [table_codes[i] for i in self.stock_ids]
+
+    @property
+    def names(self):
+        table_names = self.table.names
+        return [table_names[i] for i in self.stock_ids]
+
+    def info(self, key):
+        """基金資產資訊的數值（整數欄位回傳 int，有小數的回傳 float），沒有該欄位時回傳 None"""
+        i = FUND_INFO_INDEX.get(key)
+        if i is None or self.info_scales[i] == MISSING:
+            return None
+        value, decimals = self.info_values[i], self.info_scales[i]
+        return value / 10 ** decimals if decimals else value
+
+    def fund_info(self):
+        """還原為原本的基金資產資訊字串 dict"""
+        fund_info = {}
+        for i, (key, kind) in enumerate(FUND_INFO_FIELDS):
+            decimals = self.info_scales[i]
+            if decimals != MISSING:
+                fund_info[key] = format_info_value(self.info_values[i], decimals, kind)
+        if self.extra_info:
+            fund_info.update(self.extra_info)
+        return fund_info
+
+    def holdings(self):
+        """還原為原本的持股 dict 列表"""
+        codes, names = self.table.codes, self.table.names
+        return [
+            {'stock_code': codes[i], 'stock_name': names[i], 'shares': s, 'weight': w}
+            for i, s, w in zip(self.stock_ids, self.shares, self.weights)
+        ]
+
+    def to_dict(self):
+        """轉回 fetch_etf_data 格式的 dict"""
+        return {
+            'date': self.date_str,
+            'holdings': self.holdings(),
+            'fund_info': self.fund_info(),
+        }
+
+    def weight_map(self):
+        """{股票代號: 權重}"""
+        codes = self.table.codes
+        return {codes[i]: w for i, w in zip(self.stock_ids, self.weights)}
+
+    def nbytes(self):
+        """本日資料本身佔用的記憶體（不含共用的股票表）"""
+        size = sys.getsizeof(self)
+        for column in (self.stock_ids, self.shares, self.weights, self.info_values, self.info_scales):
+            size += sys.getsizeof(column)
+        return size
+
+
+def compact_many(portfolios, table=None):
+    """將 dict 格式的投資組合列表轉為 CompactPortfolio 列表（共用同一份股票表）"""
+    table = table if table is not None else SHARED_TABLE
+    return [CompactPortfolio.from_dict(p, table) for p in portfolios]
+
+
+def dict_nbytes(portfolio_data):
+    """dict 格式投資組合佔用的記憶體（遞迴計算，共用的物件只算一次）"""
+    seen = set()
+
+    def size_of(obj):
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        size = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            size += sum(size_of(k) + size_of(v) for k, v in obj.items())
+        elif isinstance(obj, (list, tuple)):
+            size += sum(size_of(item) for item in obj)
+        return size
+
+    return size_of(portfolio_data)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    from history_store import HistoryStore, DEFAULT_FUND_CODE, DEFAULT_HISTORY_PATH
+
+    parser = argparse.ArgumentParser(description='比較 dict 與精簡表示的記憶體用量')
+    parser.add_argument('--path', default=str(DEFAULT_HISTORY_PATH), help='歷史資料檔路徑')
+    parser.add_argument('--fund', default=DEFAULT_FUND_CODE, help='基金代號')
+    args = parser.parse_args()
+
+    store = HistoryStore(args.path)
+    t0 = time.perf_counter()
+    portfolios = store.load(fund_code=args.fund)
+    dict_time = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    table = StockTable()
+    compact = store.load_compact(fund_code=args.fund, table=table)
+    compact_time = time.perf_counter() - t0
+
+    if not portfolios:
+        print("⚠️  歷史資料檔中沒有資料")
+        exit(1)
+    dict_bytes = sum(dict_nbytes(p) for p in portfolios)
+    compact_bytes = sum(c.nbytes() for c in compact)
+    table_bytes = sum(dict_nbytes(column) for column in (table.codes, table.names))
+
+    days = len(portfolios)
+    print(f"{days} 個日期、股票表 {len(table)} 筆")
+    print(f"dict 表示:  {dict_bytes / days:,.0f} bytes/日（讀取 {dict_time * 1000:.1f} ms）")
+    print(f"精簡表示:  {compact_bytes / days:,.0f} bytes/日 + 股票表 {table_bytes:,} bytes"
+          f"（讀取 {compact_time * 1000:.1f} ms）")
+    print(f"縮小 {dict_bytes / (compact_bytes + table_bytes):.1f} 倍")
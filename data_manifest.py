@@ -0,0 +1,168 @@
+"""
+資料清單模組 - 維護 DATA/manifest.json
+記錄每個 Excel 檔案的日期、持股與基金資產的內容雜湊、持股筆數與檔案大小
+擷取結果與既有日期完全相同時不重寫檔案；history_server 以清單中的雜湊作為快取驗證碼
+"""
+import os
+import json
+import hashlib
+from pathlib import Path
+
+from history_store import DEFAULT_FUND_CODE
+from portfolio_parser import parse_amount
+
+
+DEFAULT_MANIFEST_PATH = Path('DATA') / 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def _normalize_number(value):
+    if isinstance(value, float):
+        return round(value, 6)
+    return value
+
+
+def normalize_portfolio(portfolio_data):
+    """
+    將投資組合轉為與來源無關的標準形式（網頁擷取、文字版或數值版 Excel 皆相同）
+
+    持股依股票代號排序；基金資產的 'NTD 1,234'、'0.56%' 等文字一律轉為數值
+    """
+    holdings = sorted(
+        [
+            h['stock_code'],
+            h['stock_name'],
+            int(round(float(h['shares']))),
+            round(float(h['weight']), 4),
+        ]
+        for h in portfolio_data['holdings']
+    )
+    fund_info = {}
+    for key, value in portfolio_data.get('fund_info', {}).items():
+        number = parse_amount(value)
+        fund_info[key] = _normalize_number(number) if number is not None else value
+    return {
+        'date': portfolio_data['date'],
+        'holdings': holdings,
+        'fund_info': fund_info,
+    }
+
+
+def portfolio_hash(portfolio_data):
+    """
+    計算投資組合內容的 SHA-256 雜湊
+
+    不含基金資產的股票權重（stocks_weight）：Excel 的 C10 寫入的是持股權重加總而不是網站公布的數值，
+    列入的話由 Excel 建立的清單與擷取結果永遠不會相同
+    """
+    normalized = normalize_portfolio(portfolio_data)
+    normalized['fund_info'].pop('stocks_weight', None)
+    canonical = json.dumps(
+        normalized,
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(',', ':'),
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class DataManifest:
+    """DATA/ 的檔案清單，以檔名為鍵"""
+
+    def __init__(self, path=DEFAULT_MANIFEST_PATH):
+        self.path = Path(path)
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.entries = data.get('files', {})
+
+    def get(self, filename):
+        return self.entries.get(filename)
+
+    def is_unchanged(self, filename, content_hash):
+        """檔案已存在於清單且內容雜湊相同"""
+        entry = self.entries.get(filename)
+        return entry is not None and entry.get('hash') == content_hash
+
+    def update(self, filename, portfolio_data, fund_code=DEFAULT_FUND_CODE, size=None, content_hash=None):
+        """新增或更新一個檔案的記錄"""
+        self.entries[filename] = {
+            'fund_code': fund_code,
+            'date': portfolio_data['date'],
+            'hash': content_hash or portfolio_hash(portfolio_data),
+            'rows': len(portfolio_data['holdings']),
+            'size': size,
+        }
+
+    def dates(self, fund_code=DEFAULT_FUND_CODE):
+        """清單中某基金的所有日期（由舊到新）"""
+        return sorted(e['date'] for e in self.entries.values() if e.get('fund_code') == fund_code)
+
+    def save(self):
+        """寫入清單（先寫暫存檔再取代，避免寫到一半中斷）"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # 每個檔案一行，清單保持精簡，每日新增只會產生一行差異
+        items = sorted(self.entries.items())
+        lines = ['{', f' "version": {MANIFEST_VERSION},', ' "files": {']
+        for i, (name, entry) in enumerate(items):
+            comma = ',' if i < len(items) - 1 else ''
+            body = json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+            lines.append(f'  {json.dumps(name)}: {body}{comma}')
+        lines += [' }', '}', '']
+
+        temp = self.path.with_name(self.path.name + '.tmp')
+        with open(temp, 'w', encoding='utf-8', newline='\n') as f:
+            f.write('\n'.join(lines))
+        os.replace(temp, self.path)
+
+    def to_dict(self):
+        return {'version': MANIFEST_VERSION, 'files': self.entries}
+
+
+def build_manifest(data_dir='DATA', path=DEFAULT_MANIFEST_PATH, workers=None, archive_dir=None):
+    """
+    從目錄中現有的 Excel 檔案與每月封存檔建立完整清單
+
+    Excel 已封存並刪除的日期仍列在清單中（檔名為原本的 Excel 檔名，size 為 None），
+    與每日擷取時逐筆更新的清單內容一致；同一日期仍有 Excel 時以 Excel 為準
+    """
+    from excel_reader import list_portfolio_files, read_directory
+    from delta_archive import DeltaArchive
+    from fetch_and_save import portfolio_filename
+
+    files = list_portfolio_files(data_dir)
+    path_of = {(fund, date): filepath for filepath, fund, date in files}
+
+    manifest = DataManifest(path)
+    manifest.entries = {}
+    archive = DeltaArchive(archive_dir or Path(data_dir) / 'archive')
+    for fund_code in archive.fund_codes():
+        for portfolio_data in archive.load(fund_code=fund_code):
+            manifest.update(portfolio_filename(portfolio_data['date'], fund_code), portfolio_data, fund_code)
+    for fund_code, portfolio_data in read_directory(data_dir, workers, files=files):
+        filepath = path_of.get((fund_code, portfolio_data['date']))
+        if filepath is None:
+            print(f"⚠️  [{fund_code}] {portfolio_data['date']} 的檔名與內容日期不符，略過")
+            continue
+        manifest.update(filepath.name, portfolio_data, fund_code, size=filepath.stat().st_size)
+    manifest.save()
+    print(f"✅ 已建立清單 {manifest.path}：{len(manifest.entries)} 個檔案")
+    return manifest
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='DATA/ 檔案清單工具')
+    parser.add_argument('--path', default=str(DEFAULT_MANIFEST_PATH), help='清單路徑')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = sub.add_parser('build', help='從 Excel 目錄重建清單')
+    build_parser.add_argument('data_dir', nargs='?', default='DATA')
+    build_parser.add_argument('--archive', default=None, help='每月封存檔目錄（預設為 <data_dir>/archive）')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_manifest(args.data_dir, args.path, archive_dir=args.archive)
@@ -0,0 +1,400 @@
+"""
+差異封存模組 - 每檔基金每月一個壓縮封存檔，取代逐日累積的 Excel
+每月第一個日期存完整快照，其餘日期只記錄與前一日的差異（權重每日都會變動，股數與名稱只記錄有變動的股票）
+重建任一日期只需解壓縮一個封存檔並套用當月的差異；已封存月份的每日 Excel 可以刪除，需要時以 export 重新產生
+
+封存檔內容（JSON；壓縮格式與頁面快照相同，有安裝 zstandard 時使用 zstd，否則使用 gzip）：
+    {"version": 1, "fund_code": ..., "month": "YYYYMM", "days": [完整快照, 差異, 差異, ...]}
+    完整快照：{"date", "rows": [[股票代號, 股票名稱, 股數, 權重], ...], "fund_info"}
+    差異：{"date", "weights": [依持股順序的權重]}，有變動時才加上
+          "order"（持股順序）、"shares"、"names"（{股票代號: 值}）、"fund_info"、"drop_info"
+"""
+import os
+import re
+import json
+import time
+from pathlib import Path
+from datetime import datetime
+
+from history_store import DEFAULT_FUND_CODE, date_to_int
+from page_archive import compress, decompress, zstandard
+
+
+DEFAULT_DELTA_DIR = Path('DATA') / 'archive'
+BUNDLE_VERSION = 1
+BUNDLE_RE = re.compile(r'^(\d{6})\.json\.(gz|zst)$')
+
+
+def month_of(date):
+    """'YYYY/MM/DD' → 'YYYYMM'"""
+    return f"{date_to_int(date) // 100:06d}"
+
+
+def _number(value):
+    """整數值的股數以整數寫入，減少封存檔大小"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def encode_month(portfolios, fund_code=DEFAULT_FUND_CODE):
+    """
+    將同一個月的投資組合編碼為封存檔內容（dict）
+
+    portfolios 需依日期由舊到新排序；第一天為完整快照，其餘為與前一天的差異
+    """
+    days = []
+    prev = None
+    for portfolio_data in portfolios:
+        holdings = portfolio_data['holdings']
+        order = [h['stock_code'] for h in holdings]
+        names = {h['stock_code']: h['stock_name'] for h in holdings}
+        shares = {h['stock_code']: _number(h['shares']) for h in holdings}
+        fund_info = dict(portfolio_data.get('fund_info', {}))
+
+        if prev is None:
+            days.append({
+                'date': portfolio_data['date'],
+                'rows': [[h['stock_code'], h['stock_name'], shares[h['stock_code']], float(h['weight'])]
+                         for h in holdings],
+                'fund_info': fund_info,
+            })
+        else:
+            prev_order, prev_names, prev_shares, prev_info = prev
+            day = {'date': portfolio_data['date'], 'weights': [float(h['weight']) for h in holdings]}
+            if order != prev_order:
+                day['order'] = order
+            changed_shares = {c: s for c, s in shares.items() if prev_shares.get(c) != s or c not in prev_names}
+            if changed_shares:
+                day['shares'] = changed_shares
+            changed_names = {c: n for c, n in names.items() if prev_names.get(c) != n}
+            if changed_names:
+                day['names'] = changed_names
+            changed_info = {k: v for k, v in fund_info.items() if prev_info.get(k) != v}
+            if changed_info:
+                day['fund_info'] = changed_info
+            dropped_info = sorted(set(prev_info) - set(fund_info))
+            if dropped_info:
+                day['drop_info'] = dropped_info
+            days.append(day)
+        prev = (order, names, shares, fund_info)
+
+    return {
+        'version': BUNDLE_VERSION,
+        'fund_code': fund_code,
+        'month': month_of(portfolios[0]['date']) if portfolios else None,
+        'days': days,
+    }
+
+
+def iter_month(bundle):
+    """依序套用差異，逐日產生投資組合（格式與 fetch_etf_data 回傳值相同）"""
+    order = []
+    names = {}
+    shares = {}
+    fund_info = {}
+    for day in bundle['days']:
+        if 'rows' in day:
+            order = [row[0] for row in day['rows']]
+            names = {row[0]: row[1] for row in day['rows']}
+            shares = {row[0]: row[2] for row in day['rows']}
+            weights = [row[3] for row in day['rows']]
+            fund_info = dict(day['fund_info'])
+        else:
+            order = day.get('order', order)
+            names.update(day.get('names', {}))
+            shares.update(day.get('shares', {}))
+            weights = day['weights']
+            fund_info.update(day.get('fund_info', {}))
+            for key in day.get('drop_info', []):
+                fund_info.pop(key, None)
+        yield {
+            'date': day['date'],
+            'holdings': [
+                {'stock_code': c, 'stock_name': names[c], 'shares': float(shares[c]), 'weight': float(w)}
+                for c, w in zip(order, weights)
+            ],
+            'fund_info': dict(fund_info),
+        }
+
+
+class DeltaArchive:
+    """
+    每月差異封存檔
+
+    目錄內容（每檔基金一個子目錄）：
+        <基金代號>/<YYYYMM>.json.<zst|gz>  當月封存檔
+        <基金代號>/index.json              每個月份包含的日期（同步端不必下載封存檔即可比對）
+    """
+
+    def __init__(self, root=DEFAULT_DELTA_DIR, codec=None):
+        self.root = Path(root)
+        self.codec = codec or ('zst' if zstandard is not None else 'gz')
+
+    def _bundles(self, fund_code):
+        """{月份: 封存檔路徑}"""
+        fund_dir = self.root / fund_code
+        if not fund_dir.exists():
+            return {}
+        bundles = {}
+        for filepath in fund_dir.iterdir():
+            match = BUNDLE_RE.match(filepath.name)
+            if match:
+                bundles[match.group(1)] = filepath
+        return bundles
+
+    def _load_index(self, fund_code):
+        index_path = self.root / fund_code / 'index.json'
+        if not index_path.exists():
+            return {}
+        with open(index_path, encoding='utf-8') as f:
+            return json.load(f).get('months', {})
+
+    def _save_index(self, fund_code, months):
+        index_path = self.root / fund_code / 'index.json'
+        temp = index_path.with_name('index.json.tmp')
+        with open(temp, 'w', encoding='utf-8', newline='\n') as f:
+            json.dump({'version': BUNDLE_VERSION, 'months': months}, f, indent=1, sort_keys=True)
+            f.write('\n')
+        os.replace(temp, index_path)
+
+    def fund_codes(self):
+        """有封存檔的基金代號"""
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir() and self._bundles(p.name))
+
+    def months(self, fund_code=DEFAULT_FUND_CODE):
+        """已封存的月份（由舊到新）"""
+        return sorted(self._bundles(fund_code))
+
+    def dates(self, fund_code=DEFAULT_FUND_CODE):
+        """已封存的所有日期（由舊到新）"""
+        months = self._load_index(fund_code)
+        return [date for month in sorted(months) for date in months[month]]
+
+    def read_bundle(self, fund_code, month):
+        """讀取一個月份的封存檔內容，沒有時回傳 None"""
+        filepath = self._bundles(fund_code).get(month)
+        if filepath is None:
+            return None
+        with open(filepath, 'rb') as f:
+            return json.loads(decompress(f.read(), BUNDLE_RE.match(filepath.name).group(2)).decode('utf-8'))
+
+    def load_month(self, fund_code, month):
+        """重建一個月份的所有日期"""
+        bundle = self.read_bundle(fund_code, month)
+        return list(iter_month(bundle)) if bundle else []
+
+    def write_month(self, fund_code, month, portfolios):
+        """以 portfolios（同一個月份）覆寫該月封存檔，並更新 index.json"""
+        portfolios = sorted(portfolios, key=lambda p: p['date'])
+        fund_dir = self.root / fund_code
+        fund_dir.mkdir(parents=True, exist_ok=True)
+        target = fund_dir / f"{month}.json.{self.codec}"
+
+        body = json.dumps(encode_month(portfolios, fund_code), ensure_ascii=False, separators=(',', ':'))
+        temp = target.with_name(target.name + '.tmp')
+        with open(temp, 'wb') as f:
+            f.write(compress(body.encode('utf-8'), self.codec))
+        os.replace(temp, target)
+
+        previous = self._bundles(fund_code).get(month)
+        if previous is not None and previous != target:
+            previous.unlink()
+
+        months = self._load_index(fund_code)
+        months[month] = [p['date'] for p in portfolios]
+        self._save_index(fund_code, months)
+        return target
+
+    def add_many(self, portfolios, fund_code=DEFAULT_FUND_CODE):
+        """
+        加入多個日期（同一日期以新資料為準），每個受影響的月份重寫一次
+
+        Returns:
+            重寫的封存檔路徑列表
+        """
+        by_month = {}
+        for portfolio_data in portfolios:
+            by_month.setdefault(month_of(portfolio_data['date']), []).append(portfolio_data)
+
+        written = []
+        for month, new_portfolios in sorted(by_month.items()):
+            by_date = {p['date']: p for p in self.load_month(fund_code, month)}
+            for portfolio_data in new_portfolios:
+                by_date[portfolio_data['date']] = portfolio_data
+            written.append(self.write_month(fund_code, month, by_date.values()))
+        return written
+
+    def add(self, portfolio_data, fund_code=DEFAULT_FUND_CODE):
+        """加入一天的資料（重寫當月封存檔）"""
+        return self.add_many([portfolio_data], fund_code)[0]
+
+    def reconstruct(self, date, fund_code=DEFAULT_FUND_CODE):
+        """重建單一日期的投資組合，沒有該日期時回傳 None"""
+        bundle = self.read_bundle(fund_code, month_of(date))
+        if bundle is None:
+            return None
+        for portfolio_data in iter_month(bundle):
+            if portfolio_data['date'] == date:
+                return portfolio_data
+        return None
+
+    def load(self, start_date=None, end_date=None, fund_code=DEFAULT_FUND_CODE):
+        """重建日期區間內的投資組合（含起訖日），依日期由舊到新排序"""
+        start = date_to_int(start_date) if start_date else 0
+        end = date_to_int(end_date) if end_date else 99999999
+        portfolios = []
+        for month in self.months(fund_code):
+            if not start // 100 <= int(month) <= end // 100:
+                continue
+            for portfolio_data in self.load_month(fund_code, month):
+                if start <= date_to_int(portfolio_data['date']) <= end:
+                    portfolios.append(portfolio_data)
+        return portfolios
+
+    def export(self, date, fund_code=DEFAULT_FUND_CODE, output_dir='DATA'):
+        """從封存檔重新產生一天的 Excel，回傳檔名；沒有該日期時回傳 None"""
+        from fetch_and_save import save_to_excel
+
+        portfolio_data = self.reconstruct(date, fund_code)
+        if portfolio_data is None:
+            return None
+        return save_to_excel(portfolio_data, fund_code=fund_code, output_dir=output_dir)
+
+
+def pack_workbooks(data_dir='DATA', archive=None, fund_code=None, before=None, prune=False, workers=None,
+                   store=None):
+    """
+    將每日 Excel 封存為每月封存檔
+
+    歷史資料檔中有的日期以歷史資料檔的內容封存（與 save_portfolio 寫入當月封存檔的內容相同），
+    其餘日期以 Excel 的內容封存
+
+    Args:
+        data_dir: Excel 所在目錄
+        archive: DeltaArchive
+        fund_code: 只處理某基金（預設為全部）
+        before: 只處理早於此月份（'YYYYMM'）的檔案，預設為本月，即只封存已結束的月份
+        prune: 封存後刪除 Excel；只刪除歷史資料檔中有該日期、封存檔重建結果與歷史資料檔的內容雜湊相同，
+               且 Excel 內容與歷史資料檔一致的檔案（以另一份獨立的資料驗證，而不是與封存來源本身比對）
+        workers: 解析 Excel 的行程數
+        store: HistoryStore
+
+    Returns:
+        (封存的日期數, 刪除的檔案數)
+    """
+    from excel_reader import list_portfolio_files, read_directory
+    from data_manifest import normalize_portfolio, portfolio_hash
+    from history_store import HistoryStore
+
+    start = time.perf_counter()
+    archive = archive or DeltaArchive()
+    store = store or HistoryStore()
+    before = before or datetime.now().strftime('%Y%m')
+    files = [
+        (path, code, date) for path, code, date in list_portfolio_files(data_dir)
+        if (fund_code is None or code == fund_code) and month_of(date) < before
+    ]
+    if not files:
+        print("⚠️  沒有需要封存的 Excel 檔案")
+        return 0, 0
+
+    workbooks = {}
+    for code, portfolio_data in read_directory(data_dir, workers, files):
+        workbooks.setdefault(code, {})[portfolio_data['date']] = portfolio_data
+    stored = {}
+    for code, portfolios in workbooks.items():
+        dates = sorted(portfolios)
+        stored[code] = {p['date']: p for p in store.load(dates[0], dates[-1], fund_code=code)}
+    by_fund = {
+        code: {date: stored[code].get(date, portfolio_data) for date, portfolio_data in portfolios.items()}
+        for code, portfolios in workbooks.items()
+    }
+    xlsx_bytes = sum(os.path.getsize(path) for path, _, _ in files)
+
+    packed = 0
+    bundle_bytes = 0
+    for code, portfolios in sorted(by_fund.items()):
+        for bundle in archive.add_many(portfolios.values(), code):
+            bundle_bytes += os.path.getsize(bundle)
+        packed += len(portfolios)
+
+    pruned = 0
+    if prune:
+        for path, code, date in files:
+            workbook = workbooks.get(code, {}).get(date)
+            reference = stored.get(code, {}).get(date)
+            if workbook is None or reference is None:
+                print(f"⚠️  {path.name} 的日期不在歷史資料檔中，無法驗證，保留原檔")
+                continue
+            rebuilt = archive.reconstruct(date, code)
+            # 封存檔保存完整內容（含網站公布的股票權重），必須與歷史資料檔完全相同
+            if rebuilt is None or normalize_portfolio(rebuilt) != normalize_portfolio(reference):
+                print(f"⚠️  {path.name} 封存檔重建結果與歷史資料檔不同，保留原檔")
+                continue
+            # Excel 的 C10 是持股權重加總，portfolio_hash 不含此項
+            if portfolio_hash(workbook) != portfolio_hash(reference):
+                print(f"⚠️  {path.name} 的內容與歷史資料檔不同，保留原檔")
+                continue
+            path.unlink()
+            pruned += 1
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ 已封存 {packed} 個日期：Excel {xlsx_bytes:,} bytes → 封存檔 {bundle_bytes:,} bytes，"
+          f"刪除 {pruned} 個 Excel，耗時 {elapsed:.2f}s")
+    return packed, pruned
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='ETF 每月差異封存工具')
+    parser.add_argument('--root', default=str(DEFAULT_DELTA_DIR), help='封存目錄')
+    parser.add_argument('--fund', default=DEFAULT_FUND_CODE, help='基金代號')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    pack_parser = sub.add_parser('pack', help='將已結束月份的每日 Excel 封存為每月封存檔')
+    pack_parser.add_argument('--data-dir', default='DATA', help='Excel 所在目錄')
+    pack_parser.add_argument('--before', default=None, help='只封存早於此月份（YYYYMM）的檔案，預設為本月')
+    pack_parser.add_argument('--all-funds', action='store_true', help='封存所有基金')
+    pack_parser.add_argument('--prune', action='store_true', help='封存並驗證後刪除原本的 Excel')
+    pack_parser.add_argument('--workers', type=int, default=None, help='行程數（預設為 CPU 數）')
+    pack_parser.add_argument('--history', default=None, help='驗證用的歷史資料檔路徑')
+
+    sub.add_parser('list', help='列出封存檔')
+
+    show_parser = sub.add_parser('show', help='重建並顯示單一日期')
+    show_parser.add_argument('date', help='日期 YYYY/MM/DD')
+
+    export_parser = sub.add_parser('export', help='從封存檔重新產生 Excel')
+    export_parser.add_argument('dates', nargs='+', help='日期 YYYY/MM/DD')
+    export_parser.add_argument('--output-dir', default='DATA', help='Excel 輸出目錄')
+
+    args = parser.parse_args()
+    archive = DeltaArchive(args.root)
+
+    if args.command == 'pack':
+        from history_store import HistoryStore
+        store = HistoryStore(args.history) if args.history else HistoryStore()
+        pack_workbooks(args.data_dir, archive, None if args.all_funds else args.fund, args.before,
+                       args.prune, args.workers, store)
+    elif args.command == 'list':
+        months = archive._load_index(args.fund)
+        for month, filepath in sorted(archive._bundles(args.fund).items()):
+            print(f"{month}  {len(months.get(month, []))} 個日期  {filepath.name}  {filepath.stat().st_size:,} bytes")
+    elif args.command == 'show':
+        t0 = time.perf_counter()
+        portfolio_data = archive.reconstruct(args.date, args.fund)
+        elapsed = (time.perf_counter() - t0) * 1000
+        if portfolio_data is None:
+            print(f"❌ 封存檔中沒有 {args.date}")
+            exit(1)
+        print(f"{args.date}：{len(portfolio_data['holdings'])} 筆持股，重建耗時 {elapsed:.2f} ms")
+        for h in portfolio_data['holdings']:
+            print(f"  {h['stock_code']}  {h['stock_name']:<8} {h['shares']:>14,.0f}  {h['weight']:6.2f}%")
+    elif args.command == 'export':
+        for date in args.dates:
+            filename = archive.export(date, args.fund, args.output_dir)
+            if filename is None:
+                print(f"❌ 封存檔中沒有 {date}")
@@ -1,114 +1,297 @@
 """
 Google Drive 同步模組 - 從 Google Drive 下載最新 ETF 資料
 作為 GitHub 同步的備援方案
+
+下載的檔案保存在本地鏡像目錄，並以狀態檔記錄每個檔案的 ID、修改時間與檢查碼；
+每次同步只列出一次資料夾，只下載新增或內容有變動的檔案
+判斷內容是否有變動需要 Drive API 提供的修改時間與檢查碼，必須設定 API 金鑰（GOOGLE_API_KEY）；
+以 gdown 列出時只能比對檔案 ID，而 Drive 上原地更新的檔案 ID 不變，鏡像中的舊版本不會重新下載
 """
 import os
+import re
+import json
 import shutil
-import gdown
+import hashlib
+import importlib.util
 from pathlib import Path
-from datetime import datetime
-from data_manager import DataManager
-import config
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from bulk_import import parse_files, import_portfolios
+
+DRIVE_API_BASE = "https://www.googleapis.com/drive/v3"
+FILENAME_PATTERN = r'ETF_Investment_Portfolio_\d{8}\.xlsx'
+
+
+def file_md5(filepath):
+    """計算檔案的 MD5（與 Drive 的 md5Checksum 相同）"""
+    digest = hashlib.md5()
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def drive_available(api_key=None):
+    """能否列出 Drive 資料夾：有 API 金鑰，或已安裝 gdown（只檢查不載入）"""
+    if api_key or os.environ.get('GOOGLE_API_KEY'):
+        return True
+    return importlib.util.find_spec('gdown') is not None
+
 
 class GoogleDriveSync:
     """從 Google Drive 同步 ETF 資料"""
     
-    def __init__(self, folder_url="https://drive.google.com/drive/folders/1mK6gf2kYPA2Mkh-JqG5J197nJQ8KONOd?usp=sharing"):
+    def __init__(self, folder_url="https://drive.google.com/drive/folders/1mK6gf2kYPA2Mkh-JqG5J197nJQ8KONOd?usp=sharing",
+                 mirror_dir=None, api_key=None, api_base=DRIVE_API_BASE, max_workers=4):
         self.folder_url = folder_url
-        self.temp_dir = config.BASE_DIR / "temp_drive_download"
+        match = re.search(r'/folders/([\w-]+)', folder_url)
+        self.folder_id = match.group(1) if match else None
+        if mirror_dir is None:
+            import config
+            mirror_dir = config.BASE_DIR / "drive_mirror"
+        self.mirror_dir = Path(mirror_dir)
+        self.state_path = self.mirror_dir / "drive_sync_state.json"
+        # 有 API 金鑰時以 Drive v3 API 列出資料夾（含修改時間與檢查碼），否則使用 gdown
+        self.api_key = api_key or os.environ.get('GOOGLE_API_KEY')
+        self.api_base = api_base
+        self.max_workers = max_workers
+        import requests
+        self.session = requests.Session()
+    
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                return json.load(f).get('files', {})
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_state(self, files):
+        self.mirror_dir.mkdir(parents=True, exist_ok=True)
+        temp = self.state_path.with_name(self.state_path.name + '.tmp')
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump({'files': files}, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(temp, self.state_path)
+    
+    def list_remote_files(self):
+        """
+        列出 Drive 資料夾中的 Excel 檔案（只列出，不下載）
+        
+        Returns:
+            {檔名: {'id', 'modified', 'md5'}}；以 gdown 列出時 modified 與 md5 為 None
+        """
+        files = {}
+        if self.api_key and self.folder_id:
+            params = {
+                'q': f"'{self.folder_id}' in parents and trashed = false",
+                'fields': 'nextPageToken, files(id, name, modifiedTime, md5Checksum)',
+                'pageSize': 1000,
+                'key': self.api_key,
+            }
+            while True:
+                response = self.session.get(f"{self.api_base}/files", params=params, timeout=30)
+                response.raise_for_status()
+                data = response.json()
+                for item in data.get('files', []):
+                    files[item['name']] = {
+                        'id': item['id'],
+                        'modified': item.get('modifiedTime'),
+                        'md5': item.get('md5Checksum'),
+                    }
+                if not data.get('nextPageToken'):
+                    break
+                params['pageToken'] = data['nextPageToken']
+        else:
+            import gdown
+            print("⚠️  未設定 Google API 金鑰：無法取得修改時間與檢查碼，Drive 上原地更新的檔案不會重新下載")
+            entries = gdown.download_folder(url=self.folder_url, quiet=True, use_cookies=False, skip_download=True)
+            for entry in entries or []:
+                files[Path(entry.path).name] = {'id': entry.id, 'modified': None, 'md5': None}
         
-    def download_files(self):
-        """從 Google Drive 下載資料夾"""
+        return {name: info for name, info in files.items() if re.fullmatch(FILENAME_PATTERN, name)}
+    
+    def _is_current(self, name, remote, state):
+        """
+        鏡像中的檔案與 Drive 上的版本相同
+
+        以 gdown 列出時沒有修改時間與檢查碼，只要 ID 相同且鏡像中有檔案就視為最新
+        """
+        entry = state.get(name)
+        if entry is None or entry.get('id') != remote['id']:
+            return False
+        if not (self.mirror_dir / name).exists():
+            return False
+        if remote['md5'] and entry.get('md5') != remote['md5']:
+            return False
+        if remote['modified'] and entry.get('modified') != remote['modified']:
+            return False
+        return True
+    
+    def download_file(self, name, file_id, cancel=None):
+        """
+        下載單一檔案到鏡像目錄（先寫入暫存檔再取代）
+        
+        cancel: threading.Event；下載途中被設定時放棄並回傳 None（gdown 只能在開始前取消）
+        """
+        target = self.mirror_dir / name
+        temp = target.with_name(name + '.part')
         try:
-            print(f"正在從 Google Drive 下載資料: {self.folder_url}")
-            
-            # 建立暫存目錄
-            if self.temp_dir.exists():
-                shutil.rmtree(self.temp_dir)
-            self.temp_dir.mkdir(parents=True, exist_ok=True)
-            
-            # 使用 gdown 下載整個資料夾
-            # --folder 參數用於下載資料夾
-            # output 參數指定下載路徑
-            gdown.download_folder(url=self.folder_url, output=str(self.temp_dir), quiet=False, use_cookies=False)
-            
-            print(f"✅ Google Drive 下載完成: {self.temp_dir}")
-            return True
-            
+            if cancel is not None and cancel.is_set():
+                return None
+            if self.api_key:
+                with self.session.get(
+                    f"{self.api_base}/files/{file_id}",
+                    params={'alt': 'media', 'key': self.api_key},
+                    timeout=60,
+                    stream=True,
+                ) as response:
+                    response.raise_for_status()
+                    with open(temp, 'wb') as f:
+                        for chunk in response.iter_content(64 * 1024):
+                            if cancel is not None and cancel.is_set():
+                                break
+                            f.write(chunk)
+            else:
+                import gdown
+                gdown.download(id=file_id, output=str(temp), quiet=True, use_cookies=False)
+            if cancel is not None and cancel.is_set():
+                temp.unlink()
+                print(f"⏭️  已取消: {name}")
+                return None
+            os.replace(temp, target)
+            print(f"✅ 下載成功: {name}")
+            return target
         except Exception as e:
-            print(f"❌ Google Drive 下載失敗: {e}")
-            return False
-            
+            print(f"❌ 下載失敗 {name}: {e}")
+            if temp.exists():
+                temp.unlink()
+            return None
+    
+    def mirror_file(self, name, remote_entry, state, cancel=None):
+        """
+        確保鏡像中有 Drive 上最新版本的檔案（已是最新時不下載），並更新 state
+        
+        Returns:
+            鏡像中的檔案路徑；下載失敗或被取消時回傳 None
+        """
+        if self._is_current(name, remote_entry, state):
+            return self.mirror_dir / name
+        self.mirror_dir.mkdir(parents=True, exist_ok=True)
+        target = self.download_file(name, remote_entry['id'], cancel)
+        if target:
+            state[name] = {
+                'id': remote_entry['id'],
+                'modified': remote_entry['modified'],
+                'md5': remote_entry['md5'] or file_md5(target),
+            }
+        return target
+    
+    def download_files(self, wanted=None, remote=None):
+        """
+        更新本地鏡像：只下載新增或有變動的檔案
+        
+        Args:
+            wanted: 只考慮這些檔名（預設為資料夾中全部檔案）
+            remote: 已取得的 list_remote_files() 結果（避免重複列出）
+        
+        Returns:
+            {檔名: 鏡像中的檔案路徑}（包含原本就是最新的檔案），列出失敗時回傳 None
+        """
+        if remote is None:
+            try:
+                print(f"正在列出 Google Drive 資料夾: {self.folder_url}")
+                remote = self.list_remote_files()
+            except Exception as e:
+                print(f"❌ Google Drive 列出檔案失敗: {e}")
+                return None
+        
+        state = self._load_state()
+        names = sorted(remote if wanted is None else set(wanted) & set(remote))
+        stale = [name for name in names if not self._is_current(name, remote[name], state)]
+        print(f"找到 {len(remote)} 個檔案，需要下載 {len(stale)} 個")
+        
+        if stale:
+            workers = max(1, min(self.max_workers, len(stale)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(self.mirror_file, name, remote[name], state) for name in stale]
+                for future in as_completed(futures):
+                    future.result()
+            self._save_state(state)
+        
+        return {
+            name: self.mirror_dir / name
+            for name in names
+            if name in state and (self.mirror_dir / name).exists()
+        }
+    
     def sync_to_database(self):
         """同步最新資料到本地資料庫"""
         print("="*60)
         print("Google Drive 資料同步 (備援)")
         print("="*60)
         
-        # 下載檔案
-        if not self.download_files():
+        # 取得本地資料庫已有的日期
+        import config
+        from data_manager import DataManager
+        manager = DataManager()
+        existing_dates = set(manager.get_all_dates())
+        
+        # 只列出一次資料夾，以檔名中的日期判斷哪些檔案需要處理，不必開啟任何 Excel
+        try:
+            remote = self.list_remote_files()
+        except Exception as e:
+            print(f"❌ Google Drive 列出檔案失敗: {e}")
             return False
-            
-        # 尋找所有 Excel 檔案
-        excel_files = sorted(self.temp_dir.glob('**/*.xlsx'))
         
-        if not excel_files:
+        if not remote:
             print("⚠️  Google Drive 中沒有找到 Excel 檔案")
             return False
-            
-        print(f"找到 {len(excel_files)} 個 Excel 檔案")
-        
-        # 取得本地資料庫已有的日期
-        manager = DataManager()
-        existing_dates = set(manager.get_all_dates())
         
-        imported_count = 0
+        wanted = []
         skipped_count = 0
+        for name in remote:
+            digits = name.replace('ETF_Investment_Portfolio_', '').replace('.xlsx', '')
+            date = f"{digits[:4]}/{digits[4:6]}/{digits[6:8]}"
+            if date in existing_dates:
+                skipped_count += 1
+            else:
+                wanted.append(name)
         
-        from import_historical_data import parse_excel_file
+        print(f"找到 {len(remote)} 個 Excel 檔案，其中 {len(wanted)} 個日期尚未匯入")
+        if not wanted:
+            print("\n" + "="*60)
+            print(f"備援同步完成")
+            print(f"  新增: 0 個日期")
+            print(f"  跳過: {skipped_count} 個日期")
+            print("="*60)
+            return False
         
-        for filepath in excel_files:
-            try:
-                # 檢查檔名格式
-                if not filepath.name.startswith('ETF_Investment_Portfolio_'):
-                    continue
-                    
-                # 解析 Excel 以取得日期
-                portfolio_data = parse_excel_file(str(filepath))
-                date = portfolio_data['date']
-                
-                # 檢查是否已存在
-                if date in existing_dates:
-                    skipped_count += 1
-                    continue
-                
-                print(f"\n匯入新資料: {filepath.name} ({date})")
-                
-                # 1. 複製檔案到 data 目錄 (保留一份副本)
-                target_path = config.DATA_DIR / filepath.name
-                shutil.copy2(filepath, target_path)
-                print(f"  已複製到 data 目錄")
-                
-                # 2. 匯入資料庫
-                manager._save_to_database(date, portfolio_data['holdings'])
-                
-                # 3. 儲存資產配置
-                if 'asset_allocation' in portfolio_data:
-                    manager.save_fund_statistics(date, portfolio_data['asset_allocation'])
-                
-                print(f"  ✅ 已匯入資料庫")
-                imported_count += 1
-                
-            except Exception as e:
-                print(f"  ❌ 處理失敗 {filepath.name}: {e}")
+        # 只下載缺少的日期中，鏡像沒有或已過期的檔案
+        mirrored = self.download_files(wanted, remote)
+        if mirrored is None:
+            return False
         
-        # 清理暫存檔
-        try:
-            shutil.rmtree(self.temp_dir)
-            print("\n已清理暫存檔案")
-        except:
-            pass
+        # 以多行程平行解析
+        parsed = parse_files(mirrored[name] for name in sorted(mirrored))
+        
+        new_portfolios = []
+        for filepath, portfolio_data in parsed:
+            date = portfolio_data['date']
+            
+            # 檔名日期與內容日期不同時，以內容為準再檢查一次
+            if date in existing_dates:
+                skipped_count += 1
+                continue
             
+            print(f"匯入新資料: {Path(filepath).name} ({date})")
+            
+            # 複製檔案到 data 目錄 (保留一份副本)
+            shutil.copy2(filepath, config.DATA_DIR / Path(filepath).name)
+            new_portfolios.append(portfolio_data)
+        
+        # 依日期順序寫入持股與資產配置
+        imported_count, failed_count = import_portfolios(manager, new_portfolios)
+        if failed_count:
+            print(f"  ❌ {failed_count} 個日期匯入失敗")
+        
         print("\n" + "="*60)
         print(f"備援同步完成")
         print(f"  新增: {imported_count} 個日期")
@@ -118,5 +301,13 @@ class GoogleDriveSync:
         return imported_count > 0
 
 if __name__ == '__main__':
-    drive_sync = GoogleDriveSync()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='從 Google Drive 同步 ETF 資料（備援）')
+    parser.add_argument('--api-key', default=None, help='Google API 金鑰（預設讀取 GOOGLE_API_KEY 環境變數）')
+    parser.add_argument('--api-base', default=DRIVE_API_BASE, help='Drive API 根網址（可指向本機測試伺服器）')
+    parser.add_argument('--mirror-dir', default=None, help='本地鏡像目錄')
+    args = parser.parse_args()
+    
+    drive_sync = GoogleDriveSync(mirror_dir=args.mirror_dir, api_key=args.api_key, api_base=args.api_base)
     drive_sync.sync_to_database()
@@ -0,0 +1,176 @@
+"""
+ETF 投資組合指令列工具 - 單一入口，各子指令只載入自己用到的模組
+
+    fetch    擷取投資組合（不儲存），輸出摘要或 JSON
+    save     擷取並儲存（同 fetch_and_save.py，參數原樣傳入）
+    sync     從 GitHub 與 Google Drive 同步到資料庫（同 sync_orchestrator.py）
+    upload   上傳 Excel 檔案到 Google Drive（同 upload_to_drive.py）
+    status   各基金已儲存的日期數與最後日期
+    query    查詢某日的投資組合或單一股票的持股歷史
+
+selenium、openpyxl、requests、googleapiclient 等較慢的套件只在 fetch / save / sync / upload 實際執行時載入；
+status、query 只讀取歷史資料檔與個股索引，可用 python benchmark.py startup --check 檢查啟動時間
+
+用法:
+    python etf_cli.py status
+    python etf_cli.py query portfolio --date 2024/05/02
+    python etf_cli.py query stock 2330 --start 2024/01/01
+    python etf_cli.py fetch --funds 49YTW,61YTW --json
+    python etf_cli.py save --poll --deadline 120
+    python etf_cli.py sync --no-drive
+"""
+import sys
+import json
+import argparse
+
+from history_store import DEFAULT_FUND_CODE, DEFAULT_HISTORY_PATH
+
+
+# 原樣轉交給既有腳本的子指令：子指令 → (模組, 說明)
+DELEGATED = {
+    'save': ('fetch_and_save', '擷取並儲存（參數同 fetch_and_save.py）'),
+    'sync': ('sync_orchestrator', '同步到資料庫（參數同 sync_orchestrator.py）'),
+    'upload': ('upload_to_drive', '上傳 Excel 檔案到 Google Drive'),
+}
+
+
+def run_delegated(module, argv):
+    """以 __main__ 身分執行既有腳本，sys.argv 換成轉交的參數"""
+    import runpy
+    sys.argv = [f"{module}.py"] + argv
+    runpy.run_module(module, run_name='__main__', alter_sys=True)
+
+
+def cmd_fetch(args):
+    """擷取但不儲存"""
+    from fetch_and_save import fetch_funds, EZMONEY_BASE_URL
+
+    fund_codes = [code.strip() for code in args.funds.split(',') if code.strip()]
+    results, errors = fetch_funds(fund_codes, engine=args.engine, base_url=args.base_url or EZMONEY_BASE_URL,
+                                  max_workers=args.workers, max_browsers=args.browsers)
+    if args.json:
+        output = {code: {key: value for key, value in data.items() if key != 'raw_page'}
+                  for code, data in results.items()}
+        print(json.dumps(output, ensure_ascii=False, indent=1))
+    else:
+        for code, data in results.items():
+            print(f"✅ [{code}] 資料日期: {data['date']}，持股數量: {len(data['holdings'])}")
+    for code, error in errors.items():
+        print(f"❌ [{code}] 擷取失敗: {error}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+def cmd_status(args):
+    """各基金已儲存的日期數、起訖日期"""
+    from history_store import HistoryStore
+
+    store = HistoryStore(args.path)
+    fund_codes = [args.fund] if args.fund else store.fund_codes()
+    if not fund_codes:
+        print("⚠️  歷史資料檔中沒有資料")
+        return 1
+    for code in fund_codes:
+        dates = store.dates(code)
+        if dates:
+            print(f"{code}  {len(dates)} 個日期  {dates[0]} ~ {dates[-1]}")
+        else:
+            print(f"{code}  沒有資料")
+    return 0
+
+
+def cmd_query(args):
+    """查詢某日的投資組合（預設為最後一天）或單一股票的持股歷史"""
+    from history_store import HistoryStore
+
+    if args.target == 'portfolio':
+        store = HistoryStore(args.path)
+        date = args.date or (store.dates(args.fund) or [None])[-1]
+        portfolios = store.load(date, date, fund_code=args.fund) if date else []
+        if not portfolios:
+            print(f"⚠️  [{args.fund}] 沒有 {date or '任何'} 的資料")
+            return 1
+        portfolio_data = portfolios[0]
+        if args.json:
+            print(json.dumps(portfolio_data, ensure_ascii=False, indent=1))
+            return 0
+        print(f"[{args.fund}] 資料日期: {portfolio_data['date']}，持股數量: {len(portfolio_data['holdings'])}")
+        for h in portfolio_data['holdings'][:args.top]:
+            print(f"{h['stock_code']:>8}  {h['stock_name']}  {h['shares']:,.0f}  {h['weight']:.2f}%")
+        return 0
+
+    # 個股索引只讀取該股票的檔案，不必解析整個歷史資料檔；索引不提交到 repository，
+    # 尚未建立或落後歷史資料檔（例如 git pull 之後）時先補上
+    from stock_index import StockIndex
+    from history_store import HistoryStore
+    index = StockIndex(args.index_dir) if args.index_dir else StockIndex()
+    added = index.sync(HistoryStore(args.path), args.fund)
+    if added:
+        print(f"個股索引已從歷史資料檔補上 {args.fund} 的 {added} 個日期", file=sys.stderr)
+    series = index.series(args.stock_code, args.start, args.end, fund_code=args.fund)
+    if not series['date']:
+        print(f"⚠️  [{args.fund}] {args.stock_code} 沒有持股紀錄")
+        return 1
+    if args.json:
+        print(json.dumps({'date': series['date'], 'shares': list(series['shares']),
+                          'weight': list(series['weight'])}, ensure_ascii=False, indent=1))
+        return 0
+    print(f"[{args.fund}] {args.stock_code} {index.name(args.stock_code, args.fund) or ''}"
+          f"  {len(series['date'])} 個日期")
+    for date, shares, weight in zip(series['date'], series['shares'], series['weight']):
+        print(f"{date}  {shares:,.0f}  {weight:.2f}%")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='ETF 投資組合指令列工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    fetch_parser = sub.add_parser('fetch', help='擷取投資組合（不儲存）')
+    fetch_parser.add_argument('--funds', default=DEFAULT_FUND_CODE, help='基金代號，多檔以逗號分隔')
+    fetch_parser.add_argument('--engine', choices=['auto', 'http', 'selenium'], default='auto', help='擷取方式')
+    fetch_parser.add_argument('--workers', type=int, default=4, help='同時擷取的基金數')
+    fetch_parser.add_argument('--browsers', type=int, default=2, help='最多同時啟動的瀏覽器數')
+    fetch_parser.add_argument('--base-url', default=None, help='網站根網址')
+    fetch_parser.add_argument('--json', action='store_true', help='以 JSON 輸出完整資料')
+
+    # 轉交的子指令不解析參數（包含 --help），全部交給原本的腳本
+    for name, (_, help_text) in DELEGATED.items():
+        delegated = sub.add_parser(name, help=help_text, add_help=False)
+        delegated.add_argument('args', nargs=argparse.REMAINDER)
+
+    status_parser = sub.add_parser('status', help='各基金已儲存的日期')
+    status_parser.add_argument('--fund', default=None, help='基金代號（預設為全部）')
+    status_parser.add_argument('--path', default=str(DEFAULT_HISTORY_PATH), help='歷史資料檔路徑')
+
+    query_parser = sub.add_parser('query', help='查詢投資組合或個股持股歷史')
+    query_sub = query_parser.add_subparsers(dest='target', required=True)
+    portfolio_parser = query_sub.add_parser('portfolio', help='某日的投資組合')
+    portfolio_parser.add_argument('--date', default=None, help='日期 YYYY/MM/DD（預設為最後一天）')
+    portfolio_parser.add_argument('--top', type=int, default=None, help='只列出權重最高的幾筆')
+    portfolio_parser.add_argument('--path', default=str(DEFAULT_HISTORY_PATH), help='歷史資料檔路徑')
+    stock_parser = query_sub.add_parser('stock', help='單一股票的持股歷史')
+    stock_parser.add_argument('stock_code', help='股票代號')
+    stock_parser.add_argument('--start', help='起始日期 YYYY/MM/DD')
+    stock_parser.add_argument('--end', help='結束日期 YYYY/MM/DD')
+    stock_parser.add_argument('--index-dir', default=None, help='個股索引目錄')
+    stock_parser.add_argument('--path', default=str(DEFAULT_HISTORY_PATH), help='歷史資料檔路徑（索引尚未建立或落後時用來補上）')
+    for target_parser in (portfolio_parser, stock_parser):
+        target_parser.add_argument('--fund', default=DEFAULT_FUND_CODE, help='基金代號')
+        target_parser.add_argument('--json', action='store_true', help='以 JSON 輸出')
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # 轉交的子指令直接執行，其餘參數（包含 --help）不經過本工具解析
+    if argv and argv[0] in DELEGATED:
+        run_delegated(DELEGATED[argv[0]][0], argv[1:])
+        return 0
+
+    args = build_parser().parse_args(argv)
+    handlers = {'fetch': cmd_fetch, 'status': cmd_status, 'query': cmd_query}
+    return handlers[args.command](args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
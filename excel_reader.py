@@ -0,0 +1,317 @@
+"""
+Excel 快速讀取模組 - 直接從 xlsx 壓縮檔串流解析工作表 XML，只讀取固定版面需要的儲存格
+不經過 openpyxl；大量匯入時以多個行程平行解析，由單一寫入者收集結果
+"""
+import os
+import re
+import time
+import zipfile
+from pathlib import Path
+from xml.etree.ElementTree import iterparse
+from concurrent.futures import ProcessPoolExecutor
+
+from history_store import HistoryStore, DEFAULT_FUND_CODE, DEFAULT_HISTORY_PATH, normalize_date
+
+
+NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+NS_CP = '{http://schemas.openxmlformats.org/package/2006/metadata/core-properties}'
+NS_DC = '{http://purl.org/dc/elements/1.1/}'
+
+# 與 fetch_and_save.save_to_excel 的版面標記一致
+LAYOUT_ID = 'ETF_Investment_Portfolio'
+TYPED_LAYOUT_VERSION = '2'
+
+HOLDINGS_START_ROW = 21
+FILENAME_RE = re.compile(r'^ETF_Investment_Portfolio_(?:([A-Za-z0-9]+)_)?(\d{8})\.xlsx$')
+CELL_RE = re.compile(r'^([A-Z]+)(\d+)$')
+
+# 基金資產儲存格：(欄位, 儲存格, 類型)
+FUND_INFO_CELLS = [
+    ('net_asset', 'B4', 'amount'),
+    ('outstanding_units', 'B5', 'units'),
+    ('nav', 'B6', 'nav'),
+    ('futures', 'B9', 'amount'),
+    ('futures_weight', 'C9', 'weight'),
+    ('stocks_value', 'B10', 'amount'),
+    ('stocks_weight', 'C10', 'weight'),
+    ('cash', 'B13', 'amount'),
+    ('cash_weight', 'C13', 'weight'),
+    ('futures_margin', 'B14', 'amount'),
+    ('futures_margin_weight', 'C14', 'weight'),
+    ('subscription_payable', 'B15', 'amount'),
+    ('subscription_payable_weight', 'C15', 'weight'),
+    ('securities_payable', 'B16', 'amount'),
+    ('securities_payable_weight', 'C16', 'weight'),
+]
+HEADER_CELLS = {'A1'} | {ref for _, ref, _ in FUND_INFO_CELLS}
+
+
+def parse_portfolio_filename(name):
+    """
+    從檔名取出基金代號與日期
+
+    Returns:
+        (基金代號, 'YYYY/MM/DD')，檔名不符時回傳 None
+    """
+    match = FILENAME_RE.match(Path(name).name)
+    if not match:
+        return None
+    fund_code = match.group(1) or DEFAULT_FUND_CODE
+    digits = match.group(2)
+    return fund_code, f"{digits[:4]}/{digits[4:6]}/{digits[6:8]}"
+
+
+def _is_typed_layout(archive):
+    """檢查文件屬性中的版面標記（save_to_excel typed 模式）"""
+    try:
+        with archive.open('docProps/core.xml') as f:
+            identifier = version = None
+            for _, elem in iterparse(f):
+                if elem.tag == NS_DC + 'identifier':
+                    identifier = elem.text
+                elif elem.tag == NS_CP + 'version':
+                    version = elem.text
+        return identifier == LAYOUT_ID and version == TYPED_LAYOUT_VERSION
+    except KeyError:
+        return False
+
+
+def _shared_strings(archive):
+    """讀取共用字串表（openpyxl 產生的檔案使用內嵌字串，通常不存在）"""
+    try:
+        f = archive.open('xl/sharedStrings.xml')
+    except KeyError:
+        return []
+    strings = []
+    with f:
+        for _, elem in iterparse(f):
+            if elem.tag == NS_MAIN + 'si':
+                strings.append(''.join(t.text or '' for t in elem.iter(NS_MAIN + 't')))
+                elem.clear()
+    return strings
+
+
+def _sheet_path(archive):
+    names = archive.namelist()
+    if 'xl/worksheets/sheet1.xml' in names:
+        return 'xl/worksheets/sheet1.xml'
+    sheets = sorted(n for n in names if n.startswith('xl/worksheets/sheet') and n.endswith('.xml'))
+    if not sheets:
+        raise ValueError("找不到工作表")
+    return sheets[0]
+
+
+def _cell_value(elem, shared):
+    """回傳 (是否為數值, 原始文字)"""
+    cell_type = elem.get('t')
+    if cell_type == 'inlineStr':
+        node = elem.find(NS_MAIN + 'is')
+        text = '' if node is None else ''.join(t.text or '' for t in node.iter(NS_MAIN + 't'))
+        return False, text
+    node = elem.find(NS_MAIN + 'v')
+    if node is None or node.text is None:
+        return False, None
+    if cell_type == 's':
+        return False, shared[int(node.text)]
+    if cell_type in ('str', 'e', 'b'):
+        return False, node.text
+    return True, node.text
+
+
+def _format_fund_value(is_number, text, kind):
+    """將數值儲存格轉回 fetch_etf_data 的文字格式；文字儲存格原樣回傳"""
+    if not is_number:
+        return text
+    if kind == 'amount':
+        return f"NTD {int(float(text)):,}"
+    if kind == 'units':
+        return f"{int(float(text)):,}"
+    if kind == 'nav':
+        return f"NTD {float(text):.2f}"
+    # 權重為百分比數值，以有效位數輸出以去除浮點數尾差（例如 0.5600000000000001）
+    return f"{float(text):g}%"
+
+
+def read_portfolio(filepath):
+    """
+    讀取 save_to_excel 產生的 Excel 檔案
+
+    Returns:
+        {'date', 'holdings', 'fund_info'}，格式與 fetch_etf_data 回傳值相同
+    """
+    with zipfile.ZipFile(filepath) as archive:
+        typed = _is_typed_layout(archive)
+        shared = _shared_strings(archive)
+
+        header = {}
+        rows = {}
+        c_tag = NS_MAIN + 'c'
+        row_tag = NS_MAIN + 'row'
+        with archive.open(_sheet_path(archive)) as f:
+            for _, elem in iterparse(f):
+                tag = elem.tag
+                if tag == c_tag:
+                    ref = elem.get('r')
+                    match = CELL_RE.match(ref)
+                    column, row = match.group(1), int(match.group(2))
+                    if row >= HOLDINGS_START_ROW:
+                        if column in ('A', 'B', 'C', 'D'):
+                            rows.setdefault(row, {})[column] = _cell_value(elem, shared)
+                    elif ref in HEADER_CELLS:
+                        header[ref] = _cell_value(elem, shared)
+                elif tag == row_tag:
+                    elem.clear()
+
+    date_text = (header.get('A1') or (False, ''))[1] or ''
+    date = normalize_date(date_text.split('：')[-1])
+
+    fund_info = {}
+    for key, ref, kind in FUND_INFO_CELLS:
+        if ref in header and header[ref][1] is not None:
+            fund_info[key] = _format_fund_value(*header[ref], kind)
+
+    holdings = []
+    for row in sorted(rows):
+        cells = rows[row]
+        code = cells.get('A', (False, None))[1]
+        if not code:
+            continue
+        _, name = cells.get('B', (False, ''))
+        shares_is_number, shares = cells.get('C', (True, '0'))
+        weight_is_number, weight = cells.get('D', (True, '0'))
+        if typed and shares_is_number and weight_is_number:
+            # 版面 2：數值儲存格，直接轉換
+            shares_value = float(shares)
+            weight_value = float(weight)
+        else:
+            shares_value = float(str(shares).replace(',', ''))
+            weight_value = float(str(weight).rstrip('%'))
+        holdings.append({
+            'stock_code': str(code),
+            'stock_name': name or '',
+            'shares': shares_value,
+            'weight': weight_value,
+        })
+
+    return {'date': date, 'holdings': holdings, 'fund_info': fund_info}
+
+
+def _read_one(filepath):
+    """行程池工作函式：回傳 (檔案路徑, 資料, 錯誤訊息)"""
+    try:
+        return filepath, read_portfolio(filepath), None
+    except Exception as e:
+        return filepath, None, str(e)
+
+
+def list_portfolio_files(data_dir='DATA'):
+    """列出目錄中的 Excel 檔案，回傳 [(路徑, 基金代號, 檔名日期)]，依日期排序"""
+    files = []
+    for filepath in Path(data_dir).glob('ETF_Investment_Portfolio_*.xlsx'):
+        parsed = parse_portfolio_filename(filepath.name)
+        if parsed:
+            files.append((filepath, parsed[0], parsed[1]))
+    files.sort(key=lambda item: (item[1], item[2]))
+    return files
+
+
+def read_directory(data_dir='DATA', workers=None, files=None):
+    """
+    以多行程平行讀取目錄中的 Excel 檔案
+
+    Args:
+        data_dir: 資料目錄
+        workers: 行程數（預設為 CPU 數；1 表示不使用行程池）
+        files: 指定要讀取的 [(路徑, 基金代號, 檔名日期)]，預設為目錄中全部檔案
+
+    Yields:
+        (基金代號, 投資組合資料)，讀取失敗的檔案會輸出錯誤並略過
+    """
+    if files is None:
+        files = list_portfolio_files(data_dir)
+    fund_of = {str(path): fund for path, fund, _ in files}
+    paths = [str(path) for path, _, _ in files]
+    if not paths:
+        return
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(paths) < 8:
+        results = map(_read_one, paths)
+        for path, data, error in results:
+            if error:
+                print(f"❌ 讀取失敗 {Path(path).name}: {error}")
+            else:
+                yield fund_of[path], data
+        return
+
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for path, data, error in executor.map(_read_one, paths, chunksize=chunksize):
+            if error:
+                print(f"❌ 讀取失敗 {Path(path).name}: {error}")
+            else:
+                yield fund_of[path], data
+
+
+def rebuild_history(data_dir='DATA', path=DEFAULT_HISTORY_PATH, workers=None, archive_dir=None):
+    """
+    從目錄中全部 Excel 檔案與每月封存檔重建歷史資料檔
+
+    已封存的月份 Excel 可能已被刪除，因此先讀取封存檔（預設為 <data_dir>/archive），
+    同一日期仍有 Excel 時以 Excel 為準。
+    解析工作分散到行程池，主行程是唯一的寫入者；先寫入暫存檔再取代原檔
+    """
+    from delta_archive import DeltaArchive
+
+    start = time.perf_counter()
+    by_fund = {}
+    archive = DeltaArchive(archive_dir or Path(data_dir) / 'archive')
+    for fund_code in archive.fund_codes():
+        for data in archive.load(fund_code=fund_code):
+            by_fund.setdefault(fund_code, {})[data['date']] = data
+    for fund_code, data in read_directory(data_dir, workers):
+        by_fund.setdefault(fund_code, {})[data['date']] = data
+
+    target = Path(path)
+    temp = target.with_name(target.name + '.tmp')
+    if temp.exists():
+        temp.unlink()
+    store = HistoryStore(temp)
+    total = 0
+    for fund_code, by_date in sorted(by_fund.items()):
+        portfolios = [by_date[date] for date in sorted(by_date)]
+        store.append_many(portfolios, fund_code=fund_code)
+        total += len(portfolios)
+    if temp.exists():
+        os.replace(temp, target)
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ 已重建歷史資料檔 {target}：{total} 個日期，耗時 {elapsed:.2f}s")
+    return total
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='ETF Excel 快速讀取工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    read_parser = sub.add_parser('read', help='讀取單一檔案並顯示摘要')
+    read_parser.add_argument('file')
+
+    rebuild_parser = sub.add_parser('rebuild', help='從 Excel 目錄重建歷史資料檔')
+    rebuild_parser.add_argument('data_dir', nargs='?', default='DATA')
+    rebuild_parser.add_argument('--path', default=str(DEFAULT_HISTORY_PATH), help='歷史資料檔路徑')
+    rebuild_parser.add_argument('--workers', type=int, default=None, help='行程數')
+    rebuild_parser.add_argument('--archive', default=None, help='每月封存檔目錄（預設為 <data_dir>/archive）')
+
+    args = parser.parse_args()
+
+    if args.command == 'read':
+        data = read_portfolio(args.file)
+        print(f"資料日期: {data['date']}")
+        print(f"持股數量: {len(data['holdings'])}")
+        for key, value in data['fund_info'].items():
+            print(f"  {key}: {value}")
+    elif args.command == 'rebuild':
+        rebuild_history(args.data_dir, args.path, args.workers, args.archive)
@@ -2,22 +2,159 @@
 GitHub Actions 執行腳本 - 擷取並儲存 ETF 投資組合資料
 在 GitHub 雲端伺服器上執行，無需本地電腦開機
 """
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
+# selenium、webdriver_manager、requests 與 openpyxl 載入較慢，只在實際用到的函式內載入；
+# 歷史資料檔、清單、索引與封存等儲存模組只在 save_portfolio 與命令列執行時載入
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+import os
+import queue
+import threading
 import time
 import re
-import openpyxl
-from openpyxl.styles import Font, Alignment
+from history_store import DEFAULT_FUND_CODE
+from portfolio_parser import parse_portfolio_text, parse_amount, html_to_text, find_data_date
 
+try:
+    import psutil
+except ImportError:
+    psutil = None
 
-def fetch_etf_data():
-    """擷取 ETF 投資組合資料"""
+
+EZMONEY_BASE_URL = "https://www.ezmoney.com.tw"
+TAB_TIMEOUT = 10      # 等待「基金投資組合」分頁可點擊的上限（秒）
+READY_TIMEOUT = 20    # 等待持股表格出現的上限（秒）
+# 已解析的 chromedriver 路徑快取，避免每次執行都呼叫 ChromeDriverManager().install()
+DRIVER_PATH_CACHE = Path.home() / '.cache' / 'etf-portfolio' / 'chromedriver_path.txt'
+# 輪詢模式：初始間隔、每輪乘數與間隔上限（秒）
+POLL_INTERVAL = 60
+POLL_BACKOFF = 1.5
+POLL_MAX_INTERVAL = 600
+
+# Excel 版面版本：2 = 數值儲存格 + 數字格式（讀取端可直接取數值，不必解析文字）
+EXCEL_LAYOUT_ID = 'ETF_Investment_Portfolio'
+EXCEL_LAYOUT_VERSION = 2
+AMOUNT_FORMAT = '"NTD "#,##0;"NTD "-#,##0'
+NAV_FORMAT = '"NTD "0.00'
+UNITS_FORMAT = '#,##0'
+SHARES_FORMAT = '#,##0'
+WEIGHT_FORMAT = '0.00"%"'
+HTTP_HEADERS = {
+    'User-Agent': (
+        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+        '(KHTML, like Gecko) Chrome/124.0 Safari/537.36'
+    ),
+    'Accept-Language': 'zh-TW,zh;q=0.9',
+}
+
+
+def fund_info_url(fund_code=DEFAULT_FUND_CODE, base_url=EZMONEY_BASE_URL):
+    """組出基金資訊頁網址"""
+    return f"{base_url.rstrip('/')}/ETF/Fund/Info?fundCode={fund_code}"
+
+
+def create_http_session(pool_size=4):
+    """建立可共用連線的 HTTP session（連線池大小與同時擷取數相同）"""
+    import requests
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class StageTimer:
+    """記錄並輸出擷取流程各階段的耗時"""
+    
+    def __init__(self, label=''):
+        self.label = label
+        self.stages = []
+    
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stages.append((name, elapsed))
+            prefix = f"[{self.label}] " if self.label else ''
+            print(f"⏱️  {prefix}{name}: {elapsed:.2f}s")
+    
+    def summary(self):
+        """輸出各階段耗時總表"""
+        total = sum(elapsed for _, elapsed in self.stages)
+        detail = ' | '.join(f"{name} {elapsed:.2f}s" for name, elapsed in self.stages)
+        prefix = f"[{self.label}] " if self.label else ''
+        print(f"⏱️  {prefix}總耗時 {total:.2f}s（{detail}）")
+
+
+def portfolio_ready(driver):
+    """
+    等待條件：持股表頭「股票代號/股票名稱/股數」與「資料日期」都已出現
+    
+    成立時回傳當下的頁面文字，整個流程只讀取這一次 body.text
+    """
+    from selenium.webdriver.common.by import By
+    page_text = driver.find_element(By.TAG_NAME, 'body').text
+    if '資料日期' not in page_text:
+        return False
+    for line in page_text.split('\n'):
+        if '股票代號' in line and '股票名稱' in line and '股數' in line:
+            return page_text
+    return False
+
+
+def resolve_driver_path(timer=None, refresh=False):
+    """
+    取得 chromedriver 路徑
+    
+    優先順序：CHROMEDRIVER_PATH 環境變數 → 快取中仍存在的路徑 → webdriver_manager 安裝（並寫入快取）
+    """
+    timer = timer or StageTimer()
+    env_path = os.environ.get('CHROMEDRIVER_PATH')
+    if env_path:
+        return env_path
+    
+    if not refresh:
+        try:
+            cached = DRIVER_PATH_CACHE.read_text(encoding='utf-8').strip()
+            if cached and os.path.exists(cached):
+                return cached
+        except OSError:
+            pass
+    
+    from webdriver_manager.chrome import ChromeDriverManager
+    with timer.stage('driver install'):
+        driver_path = ChromeDriverManager().install()
+    try:
+        DRIVER_PATH_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        DRIVER_PATH_CACHE.write_text(driver_path, encoding='utf-8')
+    except OSError as e:
+        print(f"⚠️  無法寫入 chromedriver 路徑快取: {e}")
+    return driver_path
+
+
+def driver_rss_mb(driver):
+    """chromedriver 與其下所有 Chrome 行程的記憶體用量（MB）；未安裝 psutil 時回傳 None"""
+    if psutil is None:
+        return None
+    try:
+        process = psutil.Process(driver.service.process.pid)
+        processes = [process] + process.children(recursive=True)
+        return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def create_chrome_driver(driver_path=None, timer=None):
+    """啟動無頭 Chrome"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.chrome.service import Service
+    
+    timer = timer or StageTimer()
     
     # 設定 Chrome 選項
     chrome_options = Options()
@@ -26,299 +163,793 @@ def fetch_etf_data():
     chrome_options.add_argument('--disable-dev-shm-usage')
     chrome_options.add_argument('--disable-gpu')
     
-    # 使用 webdriver_manager 自動安裝並管理 chromedriver
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    
+    # 使用快取的 chromedriver 路徑；快取的版本與 Chrome 不符而啟動失敗時，重新安裝一次
+    cached = driver_path is None
+    if cached:
+        driver_path = resolve_driver_path(timer)
     try:
-        url = "https://www.ezmoney.com.tw/ETF/Fund/Info?fundCode=49YTW"
-        print(f"正在載入頁面: {url}")
-        driver.get(url)
-        time.sleep(3)
-        
-        # 點擊「基金投資組合」分頁
+        with timer.stage('driver start'):
+            return webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+    except Exception:
+        if not cached or os.environ.get('CHROMEDRIVER_PATH'):
+            raise
+        print("⚠️  快取的 chromedriver 無法啟動，重新安裝")
+        driver_path = resolve_driver_path(timer, refresh=True)
+        with timer.stage('driver start'):
+            return webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+
+
+class DriverPool:
+    """
+    固定上限的瀏覽器池，讓多檔基金重複使用已啟動的 Chrome
+    
+    max_uses: 每個瀏覽器最多使用幾次就關閉重開（None 表示不限）
+    max_rss_mb: 瀏覽器行程記憶體超過此值（MB）時關閉重開，需要 psutil（未安裝時在建立時就失敗）
+    """
+    
+    def __init__(self, size=2, max_uses=None, max_rss_mb=None):
+        self.size = size
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self._idle = queue.Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._driver_path = None
+        self._drivers = []
+        self._uses = {}
+        self._closed = False
+        self.recycled = 0
+        if max_rss_mb and psutil is None:
+            raise RuntimeError("依記憶體用量回收瀏覽器需要 psutil（pip install psutil）")
+    
+    def _create(self):
+        timer = StageTimer('driver pool')
+        with self._lock:
+            if self._driver_path is None:
+                self._driver_path = resolve_driver_path(timer)
+            driver_path = self._driver_path
         try:
-            portfolio_tab = WebDriverWait(driver, 10).until(
-                EC.element_to_be_clickable((By.LINK_TEXT, "基金投資組合"))
-            )
-            portfolio_tab.click()
-            print("已點擊「基金投資組合」分頁")
-            time.sleep(2)
-        except:
-            print("無需點擊分頁")
-        
-        # 擷取資料日期 - 從頁面文字中尋找「資料日期」標籤
-        page_text = driver.find_element(By.TAG_NAME, 'body').text
-        
-        # 尋找「資料日期:YYYY/MM/DD」格式
-        date_pattern = r'資料日期[：:]\s*(\d{3,4})[/-](\d{1,2})[/-](\d{1,2})'
-        match = re.search(date_pattern, page_text)
-        
-        if match:
-            year_or_roc = match.group(1)
-            month = match.group(2)
-            day = match.group(3)
-            
-            # 如果是民國年（3位數），轉換為西元年
-            if len(year_or_roc) == 3:
-                year = str(int(year_or_roc) + 1911)
-            else:
-                year = year_or_roc
-            
-            data_date = f"{year}/{month.zfill(2)}/{day.zfill(2)}"
-            print(f"✅ 找到資料日期: {data_date}")
-        else:
-            # 修正：無法找到日期也不要自動使用當前日期，避免產生錯誤資料
-            # data_date = datetime.now().strftime('%Y/%m/%d')
-            print(f"⚠️  無法從網頁解析資料日期！停止擷取以避免資料錯誤。")
-            raise ValueError("無法解析資料日期")
-        
-        # 擷取持股資料
-        page_text = driver.find_element(By.TAG_NAME, 'body').text
-        lines = [line.strip() for line in page_text.split('\n') if line.strip()]
-        
-        holdings = []
-        stock_pattern = r'^(\d{4})\s+(.+?)\s+([\d,]+)\s+([\d.]+)%'
+            driver = create_chrome_driver(driver_path, timer=timer)
+        except Exception:
+            # 與 create_chrome_driver 相同：快取的版本與 Chrome 不符而啟動失敗時，重新安裝一次
+            if os.environ.get('CHROMEDRIVER_PATH'):
+                raise
+            with self._lock:
+                # 其他瀏覽器可能已先重新安裝
+                if self._driver_path == driver_path:
+                    print("⚠️  快取的 chromedriver 無法啟動，重新安裝")
+                    self._driver_path = None
+                    self._driver_path = resolve_driver_path(timer, refresh=True)
+                driver_path = self._driver_path
+            driver = create_chrome_driver(driver_path, timer=timer)
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                self._drivers.append(driver)
+                self._uses[id(driver)] = 0
+        if closed:
+            # 啟動期間瀏覽器池已關閉
+            driver.quit()
+            raise RuntimeError("瀏覽器池已關閉")
+        return driver
+    
+    def _acquire(self):
+        while True:
+            if self._closed:
+                # 喚醒下一個等待中的借用
+                self._idle.put(None)
+                raise RuntimeError("瀏覽器池已關閉")
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    can_create = self._created < self.size
+                    if can_create:
+                        self._created += 1
+                if can_create:
+                    try:
+                        return self._create()
+                    except Exception:
+                        with self._lock:
+                            self._created -= 1
+                        raise
+                driver = self._idle.get()
+            # None 表示有瀏覽器被回收或瀏覽器池已關閉，重新檢查
+            if driver is not None:
+                return driver
+    
+    def _should_recycle(self, driver):
+        uses = self._uses.get(id(driver), 0)
+        if self.max_uses and uses >= self.max_uses:
+            return f"已使用 {uses} 次"
+        if self.max_rss_mb:
+            rss = driver_rss_mb(driver)
+            if rss is not None and rss > self.max_rss_mb:
+                return f"記憶體 {rss:.0f} MB"
+        return None
+    
+    def _retire(self, driver, reason):
+        print(f"♻️  回收瀏覽器（{reason}）")
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+            self._uses.pop(id(driver), None)
+            self._created -= 1
+            self.recycled += 1
+        self._idle.put(None)
+    
+    @contextmanager
+    def driver(self):
+        """
+        借用一個瀏覽器，用完歸還（未達上限時才新建，否則等待）
         
-        # 找到表頭
-        for i, line in enumerate(lines):
-            if '股票代號' in line and '股票名稱' in line and '股數' in line:
-                start_idx = i + 1
-                print(f"找到股票表格標題於第 {i} 行")
-                
-                # 解析持股
-                for j in range(start_idx, len(lines)):
-                    match = re.match(stock_pattern, lines[j])
-                    if match:
-                        stock_code = match.group(1)
-                        stock_name = match.group(2).strip()
-                        shares_text = match.group(3)
-                        weight_text = match.group(4)
-                        
-                        shares = float(shares_text.replace(',', ''))
-                        weight = float(weight_text)
-                        
-                        holdings.append({
-                            'stock_code': stock_code,
-                            'stock_name': stock_name,
-                            'shares': shares,
-                            'weight': weight
-                        })
-                    elif '友善列印' in lines[j] or '匯出' in lines[j]:
-                        break
-                
+        借用期間發生例外時不歸還：瀏覽器可能停在錯誤頁面或已失去回應，直接關閉，之後視需要重開
+        """
+        driver = self._acquire()
+        failed = False
+        try:
+            yield driver
+        except Exception:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._uses[id(driver)] = self._uses.get(id(driver), 0) + 1
+            # close() 已關閉所有瀏覽器時不再歸還
+            if not self._closed:
+                reason = '發生錯誤' if failed else self._should_recycle(driver)
+                if reason:
+                    self._retire(driver, reason)
+                else:
+                    self._idle.put(driver)
+    
+    def warm(self):
+        """預先啟動所有瀏覽器"""
+        drivers = []
+        try:
+            for _ in range(self.size):
+                drivers.append(self._acquire())
+        finally:
+            for driver in drivers:
+                self._idle.put(driver)
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'alive': len(self._drivers),
+                'uses': sorted(self._uses.values()),
+                'recycled': self.recycled,
+            }
+    
+    def close(self):
+        """關閉所有瀏覽器；之後借用會引發 RuntimeError，等待中的借用也會被喚醒並失敗"""
+        with self._lock:
+            self._closed = True
+            drivers, self._drivers = self._drivers, []
+            self._uses = {}
+            self._created = 0
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
                 break
+        self._idle.put(None)
+        if not drivers:
+            return
+        timer = StageTimer('driver pool')
+        with timer.stage('quit'):
+            for driver in drivers:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+
+
+def fetch_etf_data_http(fund_code=DEFAULT_FUND_CODE, base_url=EZMONEY_BASE_URL, session=None, timeout=10):
+    """不啟動瀏覽器，直接以 HTTP 取得伺服器端 HTML 並解析投資組合"""
+    
+    url = fund_info_url(fund_code, base_url)
+    timer = StageTimer(f"{fund_code} http")
+    if session is None:
+        import requests
+    http = session or requests.Session()
+    try:
+        print(f"正在以 HTTP 載入頁面: {url}")
+        with timer.stage('navigation'):
+            response = http.get(url, headers=HTTP_HEADERS, timeout=timeout)
+            response.raise_for_status()
+            if not response.encoding or response.encoding.lower() == 'iso-8859-1':
+                response.encoding = 'utf-8'
+            html = response.text
         
-        print(f"成功擷取 {len(holdings)} 筆持股資料")
-        
-        # 擷取基金資產資訊
-        fund_info = {}
+        with timer.stage('extract'):
+            portfolio_data = parse_portfolio_text(html_to_text(html))
+            # 保留原始頁面，供 save_portfolio 存入頁面快照
+            portfolio_data['raw_page'] = ('html', html)
+    finally:
+        if session is None:
+            http.close()
+        timer.summary()
+    
+    # 伺服器 HTML 沒有持股表格時（例如改由前端載入），視為失敗以改用瀏覽器
+    if not portfolio_data['holdings']:
+        raise ValueError("HTTP 回應中找不到持股表格")
+    
+    return portfolio_data
+
+
+def load_portfolio_page(driver, url, timer=None):
+    """以已啟動的瀏覽器載入基金頁面，回傳頁面文字（以條件等待取代固定秒數）"""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException, WebDriverException
+    
+    timer = timer or StageTimer()
+    
+    print(f"正在載入頁面: {url}")
+    with timer.stage('navigation'):
+        driver.get(url)
+    
+    # 點擊「基金投資組合」分頁（分頁內容已在頁面上時不需點擊）
+    with timer.stage('tab switch'):
+        page_text = portfolio_ready(driver)
+        if page_text:
+            print("無需點擊分頁")
+        else:
+            try:
+                portfolio_tab = WebDriverWait(driver, TAB_TIMEOUT).until(
+                    EC.element_to_be_clickable((By.LINK_TEXT, "基金投資組合"))
+                )
+                portfolio_tab.click()
+                print("已點擊「基金投資組合」分頁")
+            except TimeoutException:
+                print("無需點擊分頁")
+            except WebDriverException as e:
+                # 分頁被遮住、元素已失效等：不點擊，仍等待持股表格出現
+                print(f"⚠️  無法點擊「基金投資組合」分頁: {e.__class__.__name__}")
+    
+    # 等待持股表頭與資料日期出現，並取得唯一一次的頁面文字快照
+    with timer.stage('ready'):
+        if not page_text:
+            try:
+                page_text = WebDriverWait(driver, READY_TIMEOUT, poll_frequency=0.2).until(portfolio_ready)
+            except TimeoutException:
+                # 逾時仍以目前頁面內容解析，由解析階段判斷是否缺少資料日期
+                print(f"⚠️  等待持股表格逾時（{READY_TIMEOUT} 秒）")
+                page_text = driver.find_element(By.TAG_NAME, 'body').text
+    return page_text
+
+
+def scrape_with_driver(driver, url, timer=None):
+    """以已啟動的瀏覽器載入基金頁面並解析"""
+    
+    timer = timer or StageTimer()
+    page_text = load_portfolio_page(driver, url, timer)
+    with timer.stage('extract'):
+        portfolio_data = parse_portfolio_text(page_text)
+        portfolio_data['raw_page'] = ('text', page_text)
+        return portfolio_data
+
+
+def fetch_etf_data_selenium(fund_code=DEFAULT_FUND_CODE, base_url=EZMONEY_BASE_URL, driver_pool=None):
+    """以 Selenium 無頭瀏覽器擷取 ETF 投資組合資料"""
+    
+    url = fund_info_url(fund_code, base_url)
+    timer = StageTimer(f"{fund_code} selenium")
+    
+    # 有瀏覽器池時借用已啟動的瀏覽器，否則啟動一次性的瀏覽器
+    if driver_pool is not None:
         try:
-            # 尋找基金資產相關數據
-            lines_text = '\n'.join(lines)
-            
-            # 為了調試，打印一些關鍵文字
-            print("\n=== 調試：尋找資產配置資訊 ===")
-            
-            # === 基金資產 ===
-            # 淨資產 - 更寬鬆的匹配
-            for pattern in [
-                r'淨資產\s*[:：]?\s*(NTD\s*-?[\d,]+)',
-                r'淨資產[^\d]+(NTD\s*-?[\d,]+)',
-            ]:
-                match = re.search(pattern, lines_text, re.IGNORECASE)
-                if match:
-                    fund_info['net_asset'] = match.group(1)
-                    print(f"✓ 淨資產: {match.group(1)}")
-                    break
-            
-            # 流通在外單位數
-            for pattern in [
-                r'流通在外單位數\s*[:：]?\s*([\d,]+)',
-                r'流通在外單位數[^\d]+([\d,]+)',
-            ]:
-                match = re.search(pattern, lines_text)
-                if match:
-                    fund_info['outstanding_units'] = match.group(1)
-                    print(f"✓ 流通在外單位數: {match.group(1)}")
-                    break
-            
-            # 每單位淨值
-            for pattern in [
-                r'每單位淨值\s*[:：]?\s*(NTD\s*-?[\d.]+)',
-                r'每單位淨值[^\d]+(NTD\s*-?[\d.]+)',
-            ]:
-                match = re.search(pattern, lines_text, re.IGNORECASE)
-                if match:
-                    fund_info['nav'] = match.group(1)
-                    print(f"✓ 每單位淨值: {match.group(1)}")
-                    break
-            
-            # === 尋找表格形式的資產配置 ===
-            # 尋找「項目」「金額」「權重」表格
-            items_to_find = {
-                '現金': ('cash', 'cash_weight'),
-                '期貨保證金': ('futures_margin', 'futures_margin_weight'),
-                '申贖應付款': ('subscription_payable', 'subscription_payable_weight'),
-                '應收付證券款': ('securities_payable', 'securities_payable_weight'),
-                '期貨': ('futures', 'futures_weight'),
-                '股票': ('stocks_value', 'stocks_weight'),
-            }
-            
-            for item_name, (value_key, weight_key) in items_to_find.items():
-                # 嘗試找到「項目名稱 金額 權重」的模式
-                # 注意：百分比可能是 "0.56%" 或 "0.56 %"（有空格），且可能為負數
-                patterns = [
-                    rf'{item_name}\s+(NTD\s*-?[\d,]+)\s+(-?[\d.]+)\s*%',  # 允許 % 前有空格，允許負數
-                    rf'{item_name}[^\n]*?(NTD\s*-?[\d,]+)[^\d]+(-?[\d.]+)\s*%',
-                ]
-                
-                for pattern in patterns:
-                    match = re.search(pattern, lines_text, re.IGNORECASE)
-                    if match:
-                        fund_info[value_key] = match.group(1)
-                        fund_info[weight_key] = match.group(2) + '%'
-                        print(f"✓ {item_name}: {match.group(1)}, {match.group(2)}%")
-                        break
-            
-            print("=== 調試結束 ===\n")
-            
-            extracted_count = len([k for k in fund_info.keys()])
-            print(f"✅ 成功擷取 {extracted_count} 項基金資產資訊")
+            with driver_pool.driver() as driver:
+                return scrape_with_driver(driver, url, timer)
+        finally:
+            timer.summary()
+    
+    driver = create_chrome_driver(timer=timer)
+    try:
+        return scrape_with_driver(driver, url, timer)
+    finally:
+        with timer.stage('quit'):
+            driver.quit()
+        timer.summary()
+
+
+def fetch_etf_data(fund_code=DEFAULT_FUND_CODE, engine='auto', base_url=EZMONEY_BASE_URL,
+                   session=None, driver_pool=None):
+    """
+    擷取 ETF 投資組合資料
+    
+    Args:
+        fund_code: 基金代號
+        engine: 'auto'（先 HTTP，失敗再用瀏覽器）、'http' 或 'selenium'
+        base_url: 網站根網址
+        session: 共用的 requests.Session
+        driver_pool: 共用的 DriverPool
+    """
+    
+    if engine in ('auto', 'http'):
+        try:
+            return fetch_etf_data_http(fund_code, base_url, session=session)
         except Exception as e:
-            print(f"⚠️  基金資產資訊擷取失敗: {e}")
-            import traceback
-            traceback.print_exc()
-        
-        return {
-            'date': data_date,
-            'holdings': holdings,
-            'fund_info': fund_info
-        }
-        
+            if engine == 'http':
+                raise
+            print(f"⚠️  [{fund_code}] HTTP 擷取失敗，改用瀏覽器: {e}")
+    
+    return fetch_etf_data_selenium(fund_code, base_url, driver_pool=driver_pool)
+
+
+def fetch_funds(fund_codes, engine='auto', base_url=EZMONEY_BASE_URL, max_workers=4, max_browsers=2):
+    """
+    同時擷取多檔基金
+    
+    HTTP 擷取共用同一個連線池；需要瀏覽器時，最多同時啟動 max_browsers 個 Chrome 並重複使用
+    
+    Returns:
+        (results, errors): {基金代號: 投資組合資料}、{基金代號: 例外}
+    """
+    
+    fund_codes = list(dict.fromkeys(fund_codes))
+    results = {}
+    errors = {}
+    if not fund_codes:
+        return results, errors
+    
+    workers = max(1, min(max_workers, len(fund_codes)))
+    session = create_http_session(workers)
+    driver_pool = DriverPool(size=max(1, min(max_browsers, workers)))
+    
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    fetch_etf_data, code, engine, base_url,
+                    session=session, driver_pool=driver_pool,
+                ): code
+                for code in fund_codes
+            }
+            for future in as_completed(futures):
+                code = futures[future]
+                try:
+                    results[code] = future.result()
+                    print(f"✅ [{code}] 擷取完成：{results[code]['date']}，{len(results[code]['holdings'])} 筆持股")
+                except Exception as e:
+                    errors[code] = e
+                    print(f"❌ [{code}] 擷取失敗: {e}")
     finally:
-        driver.quit()
+        session.close()
+        driver_pool.close()
+    
+    # 依輸入順序回傳
+    results = {code: results[code] for code in fund_codes if code in results}
+    return results, errors
 
 
-def save_to_excel(portfolio_data):
-    """儲存為 Excel 格式"""
+def latest_saved_date(fund_code=DEFAULT_FUND_CODE, manifest=None, store=None):
+    """已儲存的最後資料日期：先查清單，清單中沒有該基金時再查歷史資料檔"""
+    from history_store import HistoryStore
+    from data_manifest import DataManifest
+    manifest = manifest or DataManifest()
+    dates = manifest.dates(fund_code)
+    if not dates:
+        dates = (store or HistoryStore()).dates(fund_code)
+    return dates[-1] if dates else None
+
+
+def probe_http(fund_code, base_url, session, validators, timeout=10):
+    """
+    以條件式 GET 取得頁面，只找出資料日期（不解析持股）
     
-    wb = openpyxl.Workbook()
-    ws = wb.active
+    validators 保存每檔基金上一次回應的 ETag / Last-Modified
     
-    # 資料日期（使用西元年）
-    date_str = portfolio_data['date']
-    date_obj = datetime.strptime(date_str, '%Y/%m/%d')
-    formatted_date = f"{date_obj.year}/{date_obj.month:02d}/{date_obj.day:02d}"
+    Returns:
+        (資料日期, ('html', html))；伺服器回應 304 時回傳 (None, None)，
+        頁面中找不到資料日期時日期為 None
+    """
+    headers = dict(HTTP_HEADERS)
+    cached = validators.get(fund_code, {})
+    if cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
     
-    # 建立 Excel 結構
-    ws['A1'] = f'資料日期：{formatted_date}'
-    ws['A1'].font = Font(bold=True)
-    # 基金資產資訊（從 portfolio_data 取得，如果沒有則使用預設值）
-    fund_info = portfolio_data.get('fund_info', {})
+    response = session.get(fund_info_url(fund_code, base_url), headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        return None, None
+    response.raise_for_status()
+    if not response.encoding or response.encoding.lower() == 'iso-8859-1':
+        response.encoding = 'utf-8'
+    validators[fund_code] = {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+    
+    html = response.text
+    # 先轉為頁面文字再找日期，避免比對到 script 內的字串
+    date = find_data_date(html_to_text(html))
+    return date, ('html', html)
+
+
+def probe_selenium(fund_code, base_url, driver_pool):
+    """以瀏覽器池中已啟動的 Chrome 重新載入頁面，只找出資料日期"""
+    with driver_pool.driver() as driver:
+        page_text = load_portfolio_page(driver, fund_info_url(fund_code, base_url), StageTimer(f"{fund_code} probe"))
+    return find_data_date(page_text), ('text', page_text)
+
+
+def poll_once(fund_code, last_date, engine, base_url, session, driver_pool, validators, use_browser):
+    """
+    檢查一次資料日期，晚於 last_date 時才完整解析
     
-    ws['A3'] = '基金資產'
-    ws['A3'].font = Font(bold=True)
+    use_browser: HTTP 檢查失敗或頁面中找不到資料日期的基金，之後改以瀏覽器檢查（會被更新）
     
-    ws['A4'] = '淨資產'
-    ws['B4'] = fund_info.get('net_asset', 'NTD 42,575,942,188')
+    Returns:
+        日期已前進時回傳投資組合資料，否則回傳 None
+    """
+    if fund_code not in use_browser:
+        try:
+            date, page = probe_http(fund_code, base_url, session, validators)
+        except Exception as e:
+            if engine == 'http':
+                raise
+            print(f"⚠️  [{fund_code}] HTTP 檢查失敗（{e}），改用瀏覽器檢查")
+            use_browser.add(fund_code)
+        else:
+            if page is None:
+                print(f"[{fund_code}] 頁面未變動（304）")
+                return None
+            if date is None:
+                if engine == 'http':
+                    raise ValueError("HTTP 回應中找不到資料日期")
+                print(f"⚠️  [{fund_code}] HTTP 回應中找不到資料日期，改用瀏覽器檢查")
+                use_browser.add(fund_code)
+    if fund_code in use_browser:
+        date, page = probe_selenium(fund_code, base_url, driver_pool)
+        if date is None:
+            raise ValueError("頁面中找不到資料日期")
     
-    ws['A5'] = '流通在外單位數'
-    ws['B5'] = fund_info.get('outstanding_units', '2,596,709,000')
+    if last_date and date <= last_date:
+        print(f"[{fund_code}] 資料日期仍為 {date}")
+        return None
     
-    ws['A6'] = '每單位淨值'
-    ws['B6'] = fund_info.get('nav', 'NTD 16.40')
+    print(f"🔄 [{fund_code}] 資料日期已更新: {last_date or '（無）'} → {date}")
+    kind, content = page
+    portfolio_data = parse_portfolio_text(html_to_text(content) if kind == 'html' else content)
+    portfolio_data['raw_page'] = page
+    if not portfolio_data['holdings']:
+        # 伺服器 HTML 有日期但沒有持股表格時，改以瀏覽器完整擷取
+        if engine == 'http':
+            raise ValueError("HTTP 回應中找不到持股表格")
+        return fetch_etf_data_selenium(fund_code, base_url, driver_pool=driver_pool)
+    return portfolio_data
+
+
+def poll_funds(fund_codes, last_dates, engine='auto', base_url=EZMONEY_BASE_URL, interval=POLL_INTERVAL,
+               backoff=POLL_BACKOFF, max_interval=POLL_MAX_INTERVAL, deadline=None, max_browsers=1):
+    """
+    反覆檢查各基金的資料日期，直到都晚於已儲存的最後日期，或到達期限
     
-    # 資產配置
-    ws['A8'] = '項目'
-    ws['B8'] = '金額'
-    ws['C8'] = '權重'
+    每輪只做便宜的日期檢查（HTTP 條件式 GET；需要瀏覽器時重複使用同一個已啟動的 Chrome），
+    日期前進的基金才完整解析。檢查間隔每輪乘以 backoff，最多 max_interval 秒
+    
+    Args:
+        fund_codes: 基金代號列表
+        last_dates: {基金代號: 已儲存的最後日期}
+        deadline: 期限（time.time() 的值），None 表示不限
+    
+    Returns:
+        (results, pending, errors): 日期已前進的 {基金代號: 投資組合資料}、到期時仍未更新的基金代號、
+        仍未更新且最後一次檢查失敗的 {基金代號: 例外}
+    """
+    
+    pending = list(dict.fromkeys(fund_codes))
+    results = {}
+    errors = {}
+    validators = {}
+    use_browser = set(pending) if engine == 'selenium' else set()
+    session = create_http_session(max(1, len(pending)))
+    driver_pool = DriverPool(size=max(1, max_browsers))
+    wait = interval
+    attempt = 0
     
-    ws['A9'] = '期貨(名目本金)'
-    ws['B9'] = fund_info.get('futures', 'NTD 0')
-    ws['C9'] = fund_info.get('futures_weight', '0%')
+    try:
+        while pending:
+            attempt += 1
+            for code in list(pending):
+                try:
+                    data = poll_once(code, last_dates.get(code), engine, base_url,
+                                     session, driver_pool, validators, use_browser)
+                except Exception as e:
+                    print(f"⚠️  [{code}] 第 {attempt} 次檢查失敗: {e}")
+                    errors[code] = e
+                    continue
+                # 檢查成功（日期未前進也算），之前的失敗不再影響結束狀態
+                errors.pop(code, None)
+                if data is not None:
+                    results[code] = data
+                    pending.remove(code)
+            if not pending:
+                break
+            
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                print(f"⏱️  已到期限，資料日期仍未更新: {', '.join(pending)}")
+                break
+            # 最後一次檢查對齊期限
+            sleep = wait if remaining is None else min(wait, remaining)
+            print(f"⏭️  第 {attempt} 次檢查：{', '.join(pending)} 尚未更新，{sleep:.0f} 秒後再檢查")
+            time.sleep(sleep)
+            wait = min(wait * backoff, max_interval)
+    finally:
+        session.close()
+        driver_pool.close()
     
-    total_weight = sum(h['weight'] for h in portfolio_data['holdings'])
-    ws['A10'] = '股票'
-    ws['B10'] = fund_info.get('stocks_value', 'NTD 40,529,643,608')
-    ws['C10'] = f'{total_weight:.2f}%'
+    return results, pending, errors
+
+
+def portfolio_filename(date_str, fund_code=DEFAULT_FUND_CODE):
+    """Excel 檔名（預設基金沿用原本的檔名，其他基金在日期前加上基金代號）"""
+    date_str = date_str.replace('/', '')
+    if fund_code == DEFAULT_FUND_CODE:
+        return f"ETF_Investment_Portfolio_{date_str}.xlsx"
+    return f"ETF_Investment_Portfolio_{fund_code}_{date_str}.xlsx"
+
+
+def save_to_excel(portfolio_data, fund_code=DEFAULT_FUND_CODE, typed=False, output_dir=None):
+    """
+    儲存為 Excel 格式（write-only 串流寫入，持股再多也不需在記憶體建立完整工作表）
     
-    ws['A12'] = '項目'
-    ws['B12'] = '金額'
-    ws['C12'] = '權重'
+    Args:
+        portfolio_data: fetch_etf_data 回傳的資料
+        fund_code: 基金代號（決定檔名）
+        typed: True 時金額、股數、權重寫成數值儲存格並套用數字格式（外觀與文字版相同），
+               並在文件屬性標記 EXCEL_LAYOUT_VERSION；False 時沿用舊版的文字儲存格。
+               預設為 False：本機同步仍以 import_historical_data.parse_excel_file 解析，
+               它是依文字儲存格（'12,345'、'5.20%'）撰寫的，改用 excel_reader 之前不可改為數值儲存格
+    """
+    import openpyxl
+    from openpyxl.styles import Font, Alignment
+    from openpyxl.cell import WriteOnlyCell
     
-    ws['A13'] = '現金'
-    ws['B13'] = fund_info.get('cash', 'NTD 0')
-    ws['C13'] = fund_info.get('cash_weight', '0%')
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
     
-    ws['A14'] = '期貨保證金'
-    ws['B14'] = fund_info.get('futures_margin', 'NTD 0')
-    ws['C14'] = fund_info.get('futures_margin_weight', '0%')
+    if typed:
+        wb.properties.identifier = EXCEL_LAYOUT_ID
+        wb.properties.version = str(EXCEL_LAYOUT_VERSION)
     
-    ws['A15'] = '申贖應付款'
-    ws['B15'] = fund_info.get('subscription_payable', 'NTD 0')
-    ws['C15'] = fund_info.get('subscription_payable_weight', '0%')
+    def text_cell(value, bold=False, center=False):
+        cell = WriteOnlyCell(ws, value=value)
+        if bold:
+            cell.font = Font(bold=True)
+        if center:
+            cell.alignment = Alignment(horizontal='center')
+        return cell
     
-    ws['A16'] = '應收付證券款'
-    ws['B16'] = fund_info.get('securities_payable', 'NTD 0')
-    ws['C16'] = fund_info.get('securities_payable_weight', '0%')
+    def number_cell(text, number_format):
+        """typed 模式下將文字轉為數值儲存格，無法轉換時保留原文字"""
+        if not typed:
+            return text
+        value = parse_amount(text)
+        if value is None:
+            return text
+        cell = WriteOnlyCell(ws, value=value)
+        cell.number_format = number_format
+        return cell
     
-    # 股票資料
-    ws['A19'] = '股票'
-    ws['A19'].font = Font(bold=True)
-    
-    ws['A20'] = '股票代號'
-    ws['B20'] = '股票名稱'
-    ws['C20'] = '股數'
-    ws['D20'] = '持股權重'
-    
-    for cell in ws[20]:
-        cell.font = Font(bold=True)
-        cell.alignment = Alignment(horizontal='center')
-    
-    # 填入持股
-    for idx, holding in enumerate(portfolio_data['holdings'], start=21):
-        ws[f'A{idx}'] = holding['stock_code']
-        ws[f'B{idx}'] = holding['stock_name']
-        ws[f'C{idx}'] = f"{holding['shares']:,.0f}"
-        ws[f'D{idx}'] = f"{holding['weight']:.2f}%"
-    
-    # 調整欄寬
+    def amount_cell(text):
+        return number_cell(text, AMOUNT_FORMAT)
+    
+    def weight_cell(text):
+        return number_cell(text, WEIGHT_FORMAT)
+    
+    # 資料日期（使用西元年）
+    date_str = portfolio_data['date']
+    date_obj = datetime.strptime(date_str, '%Y/%m/%d')
+    formatted_date = f"{date_obj.year}/{date_obj.month:02d}/{date_obj.day:02d}"
+    
+    # 基金資產資訊（從 portfolio_data 取得，如果沒有則使用預設值）
+    fund_info = portfolio_data.get('fund_info', {})
+    holdings = portfolio_data['holdings']
+    total_weight = sum(h['weight'] for h in holdings)
+    
+    # 調整欄寬（write-only 模式需在寫入資料列之前設定）
     ws.column_dimensions['A'].width = 12
     ws.column_dimensions['B'].width = 25
     ws.column_dimensions['C'].width = 15
     ws.column_dimensions['D'].width = 12
     
+    # 建立 Excel 結構（依列號順序寫入）
+    ws.append([text_cell(f'資料日期：{formatted_date}', bold=True)])   # 1
+    ws.append([])                                                      # 2
+    ws.append([text_cell('基金資產', bold=True)])                      # 3
+    ws.append(['淨資產', amount_cell(fund_info.get('net_asset', 'NTD 42,575,942,188'))])
+    ws.append(['流通在外單位數', number_cell(fund_info.get('outstanding_units', '2,596,709,000'), UNITS_FORMAT)])
+    ws.append(['每單位淨值', number_cell(fund_info.get('nav', 'NTD 16.40'), NAV_FORMAT)])
+    ws.append([])                                                      # 7
+    
+    # 資產配置
+    ws.append(['項目', '金額', '權重'])                                 # 8
+    ws.append(['期貨(名目本金)',
+               amount_cell(fund_info.get('futures', 'NTD 0')),
+               weight_cell(fund_info.get('futures_weight', '0%'))])
+    ws.append(['股票',
+               amount_cell(fund_info.get('stocks_value', 'NTD 40,529,643,608')),
+               weight_cell(f'{total_weight:.2f}%')])
+    ws.append([])                                                      # 11
+    
+    ws.append(['項目', '金額', '權重'])                                 # 12
+    for label, value_key, weight_key in [
+        ('現金', 'cash', 'cash_weight'),
+        ('期貨保證金', 'futures_margin', 'futures_margin_weight'),
+        ('申贖應付款', 'subscription_payable', 'subscription_payable_weight'),
+        ('應收付證券款', 'securities_payable', 'securities_payable_weight'),
+    ]:                                                                 # 13-16
+        ws.append([label,
+                   amount_cell(fund_info.get(value_key, 'NTD 0')),
+                   weight_cell(fund_info.get(weight_key, '0%'))])
+    ws.append([])                                                      # 17
+    ws.append([])                                                      # 18
+    
+    # 股票資料
+    ws.append([text_cell('股票', bold=True)])                          # 19
+    ws.append([text_cell(title, bold=True, center=True)
+               for title in ('股票代號', '股票名稱', '股數', '持股權重')])  # 20
+    
+    # 填入持股（第 21 列起）
+    if typed:
+        for holding in holdings:
+            shares = WriteOnlyCell(ws, value=holding['shares'])
+            shares.number_format = SHARES_FORMAT
+            weight = WriteOnlyCell(ws, value=holding['weight'])
+            weight.number_format = WEIGHT_FORMAT
+            ws.append([holding['stock_code'], holding['stock_name'], shares, weight])
+    else:
+        for holding in holdings:
+            ws.append([
+                holding['stock_code'],
+                holding['stock_name'],
+                f"{holding['shares']:,.0f}",
+                f"{holding['weight']:.2f}%",
+            ])
+    
     # 儲存檔案
-    date_str = portfolio_data['date'].replace('/', '')
-    filename = f"ETF_Investment_Portfolio_{date_str}.xlsx"
-    wb.save(filename)
+    filename = portfolio_filename(portfolio_data['date'], fund_code)
+    wb.save(os.path.join(output_dir, filename) if output_dir else filename)
     print(f"Excel 已儲存: {filename}")
     
     return filename
 
 
+def save_portfolio(portfolio_data, fund_code=DEFAULT_FUND_CODE, store=None, manifest=None, index=None,
+                   archive=None, output_dir=None, deltas=None, metrics=None):
+    """
+    儲存一檔基金一天的資料：頁面快照、Excel、歷史資料檔、個股索引、每月差異封存檔、指標快取與 DATA/manifest.json
+    
+    頁面快照每次都會保存（同一日期以最新一次為準）；
+    清單中同一檔名的內容雜湊相同時不重寫其他檔案
+    
+    Returns:
+        Excel 檔名；內容未變動時回傳 None
+    """
+    from history_store import HistoryStore
+    from data_manifest import DataManifest, portfolio_hash
+    from stock_index import StockIndex
+    from page_archive import PageArchive
+    from delta_archive import DeltaArchive
+    from metrics_cache import MetricsCache
+    
+    store = store or HistoryStore()
+    manifest = manifest or DataManifest()
+    index = index or StockIndex()
+    archive = archive or PageArchive()
+    deltas = deltas or DeltaArchive()
+    metrics = metrics or MetricsCache()
+    
+    if portfolio_data.get('raw_page'):
+        kind, content = portfolio_data['raw_page']
+        archive.save(fund_code, portfolio_data['date'], kind, content)
+    
+    filename = portfolio_filename(portfolio_data['date'], fund_code)
+    content_hash = portfolio_hash(portfolio_data)
+    if manifest.is_unchanged(filename, content_hash):
+        print(f"⏭️  [{fund_code}] {portfolio_data['date']} 資料與既有檔案相同，不重寫")
+        return None
+    
+    filename = save_to_excel(portfolio_data, fund_code=fund_code, output_dir=output_dir)
+    store.append(portfolio_data, fund_code=fund_code)
+    index.update(portfolio_data, fund_code, store)
+    deltas.add(portfolio_data, fund_code)
+    metrics.update(portfolio_data, fund_code, store)
+    manifest.update(filename, portfolio_data, fund_code,
+                    size=os.path.getsize(os.path.join(output_dir or '', filename)), content_hash=content_hash)
+    manifest.save()
+    return filename
+
+
 if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='擷取並儲存 ETF 投資組合資料')
+    parser.add_argument('--engine', choices=['auto', 'http', 'selenium'], default='auto',
+                        help='擷取方式（預設先以 HTTP 擷取，失敗再用瀏覽器）')
+    parser.add_argument('--funds', default=DEFAULT_FUND_CODE,
+                        help='基金代號，多檔以逗號分隔（例如 49YTW,61YTW）')
+    parser.add_argument('--workers', type=int, default=4, help='同時擷取的基金數')
+    parser.add_argument('--browsers', type=int, default=2, help='最多同時啟動的瀏覽器數')
+    parser.add_argument('--base-url', default=EZMONEY_BASE_URL, help='網站根網址')
+    parser.add_argument('--poll', action='store_true',
+                        help='輪詢模式：資料日期晚於已儲存的最後日期時才解析並儲存')
+    parser.add_argument('--interval', type=float, default=POLL_INTERVAL, help='輪詢初始間隔（秒）')
+    parser.add_argument('--backoff', type=float, default=POLL_BACKOFF, help='每輪間隔乘數')
+    parser.add_argument('--max-interval', type=float, default=POLL_MAX_INTERVAL, help='輪詢間隔上限（秒）')
+    parser.add_argument('--deadline', type=float, default=None, help='最長輪詢時間（分鐘，預設不限）')
+    args = parser.parse_args()
+    fund_codes = [code.strip() for code in args.funds.split(',') if code.strip()]
+    
+    from history_store import HistoryStore
+    from data_manifest import DataManifest
+    from stock_index import StockIndex
+    from page_archive import PageArchive
+    from delta_archive import DeltaArchive
+    from metrics_cache import MetricsCache
+    
     print("="*60)
     print("GitHub Actions - ETF 投資組合自動擷取")
     print("="*60)
     
     try:
+        store = HistoryStore()
+        manifest = DataManifest()
+        
         # 擷取資料
-        print("\n[1/2] 擷取 ETF 投資組合資料...")
-        data = fetch_etf_data()
+        print(f"\n[1/2] 擷取 ETF 投資組合資料（{len(fund_codes)} 檔基金）...")
+        if args.poll:
+            last_dates = {code: latest_saved_date(code, manifest, store) for code in fund_codes}
+            deadline = time.time() + args.deadline * 60 if args.deadline is not None else None
+            results, pending, errors = poll_funds(
+                fund_codes, last_dates, engine=args.engine, base_url=args.base_url,
+                interval=args.interval, backoff=args.backoff, max_interval=args.max_interval,
+                deadline=deadline, max_browsers=args.browsers,
+            )
+        else:
+            results, errors = fetch_funds(
+                fund_codes, engine=args.engine, base_url=args.base_url,
+                max_workers=args.workers, max_browsers=args.browsers,
+            )
         
-        # 儲存 Excel
-        print("\n[2/2] 儲存為 Excel 格式...")
-        filename = save_to_excel(data)
+        # 儲存 Excel、歷史資料檔、個股索引、差異封存檔、指標快取與清單（內容未變動的日期會略過）
+        print("\n[2/2] 儲存資料...")
+        index = StockIndex()
+        archive = PageArchive()
+        deltas = DeltaArchive()
+        metrics = MetricsCache()
+        filenames = {}
+        for code, data in results.items():
+            filenames[code] = save_portfolio(data, code, store=store, manifest=manifest, index=index,
+                                             archive=archive, deltas=deltas, metrics=metrics)
         
         print("\n" + "="*60)
-        print("✅ 執行成功！")
-        print(f"資料日期: {data['date']}")
-        print(f"持股數量: {len(data['holdings'])}")
-        print(f"檔案名稱: {filename}")
+        for code, data in results.items():
+            filename = filenames[code] or '（內容未變動，未重寫）'
+            print(f"✅ [{code}] 資料日期: {data['date']}，持股數量: {len(data['holdings'])}，檔案名稱: {filename}")
+        for code, error in errors.items():
+            print(f"❌ [{code}] 擷取失敗: {error}")
+        if args.poll:
+            # 最後一次檢查失敗的基金已列為擷取失敗；只有日期未前進才算正常結束
+            for code in pending:
+                if code not in errors:
+                    print(f"⏭️  [{code}] 資料日期仍為 {last_dates[code]}，未儲存")
         print("="*60)
         
+        if errors:
+            exit(1)
+        
     except Exception as e:
         print(f"\n❌ 執行失敗: {e}")
         import traceback
@@ -0,0 +1,199 @@
+"""
+常駐擷取服務 - 保持已啟動的瀏覽器池與 HTTP 連線池，透過本機 socket 接受擷取請求
+第一次之後的擷取不必再安裝 chromedriver 或啟動 Chrome；瀏覽器使用 N 次或記憶體過高時自動重開
+
+用法:
+    python fetch_daemon.py serve --browsers 1 --max-uses 50 --max-rss-mb 800
+    python fetch_daemon.py fetch 49YTW --save
+    python fetch_daemon.py status
+    python fetch_daemon.py stop
+
+通訊協定：每行一個 JSON 請求，回應也是一行 JSON
+    {"cmd": "fetch", "fund": "49YTW", "engine": "selenium", "save": false}
+    {"cmd": "status"}
+    {"cmd": "shutdown"}
+"""
+import json
+import socket
+import threading
+import time
+import socketserver
+
+from fetch_and_save import (
+    DriverPool, create_http_session, fetch_etf_data, save_portfolio,
+    EZMONEY_BASE_URL,
+)
+from history_store import HistoryStore, DEFAULT_FUND_CODE
+from data_manifest import DataManifest
+from stock_index import StockIndex
+from page_archive import PageArchive
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8799
+
+
+class FetchService:
+    """常駐的擷取狀態：瀏覽器池、HTTP 連線池與單一寫入者鎖"""
+
+    def __init__(self, engine='selenium', base_url=EZMONEY_BASE_URL, browsers=1,
+                 max_uses=50, max_rss_mb=None):
+        self.engine = engine
+        self.base_url = base_url
+        self.driver_pool = DriverPool(size=browsers, max_uses=max_uses, max_rss_mb=max_rss_mb)
+        self.session = create_http_session(max(4, browsers))
+        self.started = time.time()
+        self.requests = 0
+        self._write_lock = threading.Lock()
+        self._count_lock = threading.Lock()
+
+    def warm(self):
+        """預先解析 chromedriver 路徑並啟動瀏覽器（只用 HTTP 時不需要）"""
+        if self.engine != 'http':
+            self.driver_pool.warm()
+
+    def fetch(self, fund_code=DEFAULT_FUND_CODE, engine=None, save=False):
+        with self._count_lock:
+            self.requests += 1
+        start = time.perf_counter()
+        portfolio_data = fetch_etf_data(
+            fund_code, engine or self.engine, self.base_url,
+            session=self.session, driver_pool=self.driver_pool,
+        )
+        filename = None
+        if save:
+            # 儲存一律由同一個鎖序列化，歷史資料檔與清單只有一個寫入者
+            with self._write_lock:
+                filename = save_portfolio(
+                    portfolio_data, fund_code,
+                    store=HistoryStore(), manifest=DataManifest(), index=StockIndex(), archive=PageArchive(),
+                )
+        result = {key: value for key, value in portfolio_data.items() if key != 'raw_page'}
+        return {
+            'ok': True,
+            'data': result,
+            'filename': filename,
+            'elapsed': round(time.perf_counter() - start, 3),
+        }
+
+    def status(self):
+        return {
+            'ok': True,
+            'engine': self.engine,
+            'uptime': round(time.time() - self.started, 1),
+            'requests': self.requests,
+            'browsers': self.driver_pool.stats(),
+        }
+
+    def close(self):
+        self.driver_pool.close()
+        self.session.close()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        service = self.server.service
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                cmd = request.get('cmd', 'fetch')
+                if cmd == 'fetch':
+                    response = service.fetch(
+                        request.get('fund', DEFAULT_FUND_CODE), request.get('engine'), request.get('save', False)
+                    )
+                elif cmd == 'status':
+                    response = service.status()
+                elif cmd == 'shutdown':
+                    response = {'ok': True}
+                    threading.Thread(target=self.server.shutdown, daemon=True).start()
+                else:
+                    response = {'ok': False, 'error': f"未知的指令: {cmd}"}
+            except Exception as e:
+                response = {'ok': False, 'error': str(e)}
+            self.wfile.write((json.dumps(response, ensure_ascii=False) + '\n').encode('utf-8'))
+            self.wfile.flush()
+
+
+class FetchServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        super().__init__((host, port), _RequestHandler)
+        self.service = service
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, **service_options):
+    """啟動常駐服務（前景執行，Ctrl+C 或 stop 指令結束）"""
+    service = FetchService(**service_options)
+    print("正在預熱瀏覽器...")
+    service.warm()
+    server = FetchServer(service, host, port)
+    print(f"✅ 擷取服務已啟動: {host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        print("擷取服務已停止")
+
+
+def send_request(request, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=120):
+    """送出一個請求並等待回應"""
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        sock.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("擷取服務沒有回應")
+    return json.loads(line)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='ETF 常駐擷取服務')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = sub.add_parser('serve', help='啟動服務')
+    serve_parser.add_argument('--engine', choices=['auto', 'http', 'selenium'], default='selenium')
+    serve_parser.add_argument('--base-url', default=EZMONEY_BASE_URL, help='網站根網址')
+    serve_parser.add_argument('--browsers', type=int, default=1, help='瀏覽器數')
+    serve_parser.add_argument('--max-uses', type=int, default=50, help='每個瀏覽器使用幾次後重開')
+    serve_parser.add_argument('--max-rss-mb', type=float, default=None, help='瀏覽器記憶體上限（MB，需要 psutil）')
+
+    fetch_parser = sub.add_parser('fetch', help='請服務擷取一檔基金')
+    fetch_parser.add_argument('fund', nargs='?', default=DEFAULT_FUND_CODE)
+    fetch_parser.add_argument('--engine', choices=['auto', 'http', 'selenium'], default=None)
+    fetch_parser.add_argument('--save', action='store_true', help='擷取後儲存 Excel 與歷史資料')
+
+    sub.add_parser('status', help='顯示服務狀態')
+    sub.add_parser('stop', help='停止服務')
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.host, args.port, engine=args.engine, base_url=args.base_url, browsers=args.browsers,
+              max_uses=args.max_uses, max_rss_mb=args.max_rss_mb)
+    elif args.command == 'fetch':
+        response = send_request({'cmd': 'fetch', 'fund': args.fund, 'engine': args.engine, 'save': args.save},
+                                args.host, args.port)
+        if not response['ok']:
+            print(f"❌ 擷取失敗: {response['error']}")
+            exit(1)
+        data = response['data']
+        print(f"✅ [{args.fund}] 資料日期: {data['date']}，持股數量: {len(data['holdings'])}，"
+              f"耗時 {response['elapsed']}s")
+        if response.get('filename'):
+            print(f"檔案名稱: {response['filename']}")
+    elif args.command == 'status':
+        print(json.dumps(send_request({'cmd': 'status'}, args.host, args.port), ensure_ascii=False, indent=2))
+    elif args.command == 'stop':
+        send_request({'cmd': 'shutdown'}, args.host, args.port)
+        print("已送出停止指令")
@@ -1,44 +1,112 @@
 """
 GitHub 同步模組 - 從 GitHub 下載最新 ETF 資料並匯入資料庫
 """
-import requests
 import os
+import re
+import json
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from data_manager import DataManager
-try:
-    from drive_sync import GoogleDriveSync
-except ImportError:
-    GoogleDriveSync = None
-import config
+from bulk_import import import_files
+from delta_archive import DeltaArchive
+from history_store import DEFAULT_FUND_CODE
+
+
+def _default_data_dir():
+    """本機應用程式的資料目錄；config 只在未指定路徑時載入"""
+    import config
+    return config.DATA_DIR
 
 
 class GitHubSync:
     """從 GitHub repository 同步 ETF 資料"""
     
-    def __init__(self, repo_owner="stujackwang7845-sudo", repo_name="etf-portfolio-backup"):
+    def __init__(self, repo_owner="stujackwang7845-sudo", repo_name="etf-portfolio-backup",
+                 branch="main", api_base=None, raw_base=None, max_workers=8, state_path=None):
         self.repo_owner = repo_owner
         self.repo_name = repo_name
-        self.api_base = f"https://api.github.com/repos/{repo_owner}/{repo_name}"
-        self.raw_base = f"https://raw.githubusercontent.com/{repo_owner}/{repo_name}/main"
+        self.branch = branch
+        self.api_base = api_base or f"https://api.github.com/repos/{repo_owner}/{repo_name}"
+        self.raw_base = raw_base or f"https://raw.githubusercontent.com/{repo_owner}/{repo_name}/{branch}"
+        self.max_workers = max_workers
+        self.archive_files = []
+        self.state_path = Path(state_path) if state_path else _default_data_dir() / 'github_sync_state.json'
         
+        # 共用連線池：列表與所有下載都重複使用同一組連線
+        import requests
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['Accept'] = 'application/vnd.github+json'
+        token = os.environ.get('GITHUB_TOKEN')
+        if token:
+            self.session.headers['Authorization'] = f"Bearer {token}"
+    
+    def _load_state(self):
+        try:
+            with open(self.state_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_state(self, state):
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.state_path, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+        except OSError as e:
+            print(f"⚠️  無法儲存同步狀態: {e}")
+    
     def get_latest_files(self):
-        """取得 repository 中所有 Excel 檔案列表"""
+        """
+        取得 repository 中所有 Excel 檔案列表
+        
+        使用 git trees API（不受 contents API 目錄筆數上限影響），
+        並以 ETag / If-None-Match 條件請求；列表未變動時只花一次 304 回應
+        同一次列表中的每月差異封存檔（DATA/archive/）記錄在 self.archive_files
+        """
+        state = self._load_state()
+        url = f"{self.api_base}/git/trees/{self.branch}"
+        headers = {}
+        if state.get('etag') and state.get('files') is not None and state.get('archive') is not None:
+            headers['If-None-Match'] = state['etag']
+        
         try:
-            url = f"{self.api_base}/contents/DATA"
-            response = requests.get(url, timeout=10)
+            response = self.session.get(url, params={'recursive': '1'}, headers=headers, timeout=10)
+            
+            if response.status_code == 304:
+                print("檔案列表未變動（304 Not Modified）")
+                self.archive_files = state['archive']
+                return state['files']
+            
             response.raise_for_status()
+            tree = response.json()
+            if tree.get('truncated'):
+                print("⚠️  git trees 回應被截斷，部分檔案可能未列出")
             
-            files = response.json()
-            excel_files = [
-                f for f in files 
-                if f['name'].startswith('ETF_Investment_Portfolio_') 
-                and f['name'].endswith('.xlsx')
-            ]
+            excel_files = []
+            archive_files = []
+            archive_prefix = f"archive/{DEFAULT_FUND_CODE}/"
+            for item in tree.get('tree', []):
+                if item.get('type') != 'blob' or not item['path'].startswith('DATA/'):
+                    continue
+                name = item['path'][len('DATA/'):]
+                # 只取預設基金的檔案（其他基金檔名為 ETF_Investment_Portfolio_<代號>_<日期>.xlsx）
+                if re.fullmatch(r'ETF_Investment_Portfolio_\d{8}\.xlsx', name):
+                    excel_files.append({'name': name, 'sha': item.get('sha'), 'size': item.get('size')})
+                elif name.startswith(archive_prefix):
+                    archive_files.append({'name': name, 'sha': item.get('sha'), 'size': item.get('size')})
             
             # 按日期排序（從檔名提取）
             excel_files.sort(key=lambda x: x['name'], reverse=True)
             
+            self.archive_files = archive_files
+            etag = response.headers.get('ETag')
+            if etag:
+                state.update({'etag': etag, 'files': excel_files, 'archive': archive_files})
+                self._save_state(state)
+            
             return excel_files
             
         except Exception as e:
@@ -51,29 +119,152 @@ class GitHubSync:
                 pass
             return []
     
-    def download_file(self, filename, save_dir=None):
-        """下載單一 Excel 檔案"""
+    def download_file(self, filename, save_dir=None, cancel=None):
+        """
+        下載單一檔案（DATA/ 下的相對路徑），先寫入暫存檔再取代
+        
+        cancel: threading.Event；下載途中被設定時放棄並回傳 None
+        """
         if save_dir is None:
-            save_dir = config.DATA_DIR
+            save_dir = _default_data_dir()
         
+        filepath = Path(save_dir) / filename
+        temp = filepath.with_name(filepath.name + '.part')
         try:
             url = f"{self.raw_base}/DATA/{filename}"
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            
-            filepath = save_dir / filename
-            with open(filepath, 'wb') as f:
-                f.write(response.content)
+            filepath.parent.mkdir(parents=True, exist_ok=True)
+            with self.session.get(url, timeout=30, stream=True) as response:
+                response.raise_for_status()
+                with open(temp, 'wb') as f:
+                    for chunk in response.iter_content(64 * 1024):
+                        if cancel is not None and cancel.is_set():
+                            break
+                        f.write(chunk)
+            if cancel is not None and cancel.is_set():
+                temp.unlink()
+                print(f"⏭️  已取消: {filename}")
+                return None
+            os.replace(temp, filepath)
             
             print(f"✅ 下載成功: {filename}")
             return filepath
             
         except Exception as e:
             print(f"❌ 下載失敗 {filename}: {e}")
+            if temp.exists():
+                temp.unlink()
+            return None
+    
+    def download_files(self, filenames, save_dir=None):
+        """
+        以固定上限的執行緒同時下載多個檔案
+        
+        Returns:
+            {檔名: 檔案路徑}，下載失敗的檔案不在結果中
+        """
+        results = {}
+        if not filenames:
+            return results
+        
+        workers = max(1, min(self.max_workers, len(filenames)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self.download_file, name, save_dir): name for name in filenames}
+            for future in as_completed(futures):
+                filepath = future.result()
+                if filepath:
+                    results[futures[future]] = filepath
+        return results
+    
+    def list_archived_dates(self, save_dir=None):
+        """
+        列出已封存的日期（需先呼叫 get_latest_files）
+        
+        index.json 的內容與列表中的 blob sha 一起記錄在狀態檔，sha 未變動時不重新下載
+        
+        Returns:
+            {日期: 月份封存檔名稱}；repository 中沒有封存檔時回傳空 dict
+        """
+        if save_dir is None:
+            save_dir = _default_data_dir()
+        names = {item['name'] for item in self.archive_files}
+        index_name = f"archive/{DEFAULT_FUND_CODE}/index.json"
+        if index_name not in names:
+            return {}
+        index_sha = next(item['sha'] for item in self.archive_files if item['name'] == index_name)
+        
+        state = self._load_state()
+        cached = state.get('archive_index') or {}
+        if index_sha and cached.get('sha') == index_sha:
+            months = cached['months']
+        else:
+            index_path = self.download_file(index_name, save_dir)
+            if index_path is None:
+                return {}
+            with open(index_path, encoding='utf-8') as f:
+                months = json.load(f).get('months', {})
+            if index_sha:
+                state['archive_index'] = {'sha': index_sha, 'months': months}
+                self._save_state(state)
+        bundles = {Path(name).name.split('.')[0]: name for name in names if name != index_name}
+        return {
+            date: bundles[month]
+            for month in sorted(months) if month in bundles
+            for date in months[month]
+        }
+    
+    def export_archived(self, date, save_dir=None):
+        """由已下載的月份封存檔在 save_dir 重新產生一天的 Excel，回傳路徑或 None"""
+        if save_dir is None:
+            save_dir = _default_data_dir()
+        archive = DeltaArchive(Path(save_dir) / 'archive')
+        try:
+            filename = archive.export(date, DEFAULT_FUND_CODE, output_dir=str(save_dir))
+        except Exception as e:
+            print(f"❌ 無法從封存檔重建 {date}: {e}")
             return None
+        return Path(save_dir) / filename if filename else None
+    
+    def restore_archived(self, known_dates, save_dir=None):
+        """
+        補齊已封存並從 DATA/ 刪除的日期
+        
+        先下載 index.json 比對日期，只下載有缺少日期的月份封存檔，
+        再由封存檔在 save_dir 重新產生 Excel（之後與一般下載的檔案一起匯入）
+        
+        Returns:
+            重新產生的 Excel 路徑列表
+        """
+        archived = self.list_archived_dates(save_dir)
+        missing = [date for date in sorted(archived) if date not in known_dates]
+        if not missing:
+            return []
+        
+        bundles = sorted({archived[date] for date in missing})
+        print(f"\n從 {len(bundles)} 個月份封存檔補齊 {len(missing)} 個已封存的日期...")
+        self.download_files(bundles, save_dir)
+        
+        paths = []
+        for date in missing:
+            path = self.export_archived(date, save_dir)
+            if path:
+                paths.append(path)
+        return paths
     
-    def sync_to_database(self):
-        """同步最新資料到本地資料庫"""
+    def sync_to_database(self, race_drive=True):
+        """
+        同步最新資料到本地資料庫
+        
+        可使用 Google Drive 時（race_drive），交由 SyncOrchestrator 同時查詢 GitHub 與 Google Drive，
+        不必等 GitHub 完整失敗後才開始備援；否則只從 GitHub 同步
+        """
+        if race_drive:
+            # drive_sync 只在需要備援時才載入
+            from drive_sync import drive_available
+            race_drive = drive_available()
+        if race_drive:
+            from sync_orchestrator import SyncOrchestrator, GitHubSource, DriveSource
+            return SyncOrchestrator([GitHubSource(self), DriveSource()], max_workers=self.max_workers).sync_to_database()
+        
         print("="*60)
         print("GitHub 資料同步")
         print("="*60)
@@ -83,72 +274,72 @@ class GitHubSync:
         github_files = self.get_latest_files()
         
         if not github_files:
-            print("⚠️  GitHub repository 沒有找到資料檔案，將嘗試備援方案")
+            print("⚠️  GitHub repository 沒有找到資料檔案")
 
         
         print(f"找到 {len(github_files)} 個檔案")
         
         # 取得本地資料庫已有的日期
+        from data_manager import DataManager
         manager = DataManager()
         existing_dates = set(manager.get_all_dates())
         
         # 檢查並下載新檔案
-        downloaded = 0
         skipped = 0
         
+        missing = []
+        listed_dates = set()
         for file_info in github_files:
             filename = file_info['name']
             
             # 從檔名提取日期
             date_str = filename.replace('ETF_Investment_Portfolio_', '').replace('.xlsx', '')
             date = f"{date_str[:4]}/{date_str[4:6]}/{date_str[6:8]}"
+            listed_dates.add(date)
             
             # 檢查是否已存在
             if date in existing_dates:
                 skipped += 1
                 continue
-            
-            # 下載檔案
-            print(f"\n下載新資料: {filename}")
-            filepath = self.download_file(filename)
-            
-            if filepath:
-                # 匯入資料庫（使用現有的 import_historical_data 邏輯）
-                try:
-                    from import_historical_data import parse_excel_file
-                    portfolio_data = parse_excel_file(str(filepath))
-                    
-                    # 1. 儲存持股資料
-                    manager._save_to_database(portfolio_data['date'], portfolio_data['holdings'])
-                    
-                    # 2. 儲存資產配置 (基金統計資料)
-                    if 'asset_allocation' in portfolio_data:
-                        manager.save_fund_statistics(portfolio_data['date'], portfolio_data['asset_allocation'])
-                    
-                    downloaded += 1
-                    print(f"  ✅ 已匯入資料庫: {date}")
-                except Exception as e:
-                    print(f"  ❌ 匯入失敗: {e}")
+            missing.append((filename, date))
+        
+        # 同時下載所有缺少的檔案
+        if missing:
+            print(f"\n下載 {len(missing)} 個新檔案（最多同時 {self.max_workers} 個）...")
+        paths = self.download_files([filename for filename, _ in missing])
+        
+        # 已封存並從 DATA/ 刪除的日期，由每月差異封存檔重新產生 Excel
+        archived = self.restore_archived(existing_dates | listed_dates)
+        
+        # 一次平行解析全部下載的檔案，再依日期順序寫入資料庫
+        downloaded, failed, _ = import_files(
+            manager, [paths[filename] for filename, _ in missing if filename in paths] + archived, existing_dates
+        )
+        if failed:
+            print(f"  ❌ {failed} 個日期匯入失敗")
         
         # 顯示結果
         print("\n" + "="*60)
         print(f"同步完成！")
         print(f"  新增: {downloaded} 個日期")
         print(f"  跳過: {skipped} 個日期（已存在）")
-        print(f"  資料庫總計: {len(manager.get_all_dates())} 個日期")
+        print(f"  資料庫總計: {len(existing_dates) + downloaded} 個日期")
         print("="*60)
         
-        if downloaded == 0 and GoogleDriveSync:
-            print("\nGitHub 未發現新資料或下載失敗，嘗試使用 Google Drive 備援...")
-            try:
-                drive_sync = GoogleDriveSync()
-                return drive_sync.sync_to_database()
-            except Exception as e:
-                print(f"備援同步失敗: {e}")
-                
         return downloaded > 0
 
 
 if __name__ == '__main__':
-    sync = GitHubSync()
-    sync.sync_to_database()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='從 GitHub 同步 ETF 資料')
+    parser.add_argument('--api-base', default=None, help='API 根網址（預設為 GitHub repository API，可指向本機測試伺服器）')
+    parser.add_argument('--raw-base', default=None, help='檔案下載根網址（預設為 raw.githubusercontent.com）')
+    parser.add_argument('--branch', default='main', help='分支名稱')
+    parser.add_argument('--workers', type=int, default=8, help='同時下載的檔案數上限')
+    parser.add_argument('--github-only', action='store_true', help='只從 GitHub 同步，不同時查詢 Google Drive')
+    args = parser.parse_args()
+    
+    sync = GitHubSync(branch=args.branch, api_base=args.api_base, raw_base=args.raw_base,
+                      max_workers=args.workers)
+    sync.sync_to_database(race_drive=not args.github_only)
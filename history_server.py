@@ -0,0 +1,378 @@
+"""
+歷史資料查詢服務 - 以本機 HTTP 提供 JSON 格式的持股資料（唯讀，可完全離線執行）
+資料來源為 fetch_and_save.py 寫入的歷史資料檔與 DATA/manifest.json；下游工具不必再各自下載並解析 Excel
+
+端點（fund 參數預設為 49YTW，日期可寫成 YYYY/MM/DD、YYYY-MM-DD 或 YYYYMMDD）:
+    GET /funds                                    所有基金與日期範圍
+    GET /dates?fund=49YTW                         某基金的所有日期
+    GET /portfolio?date=2026/08/21                單日投資組合（date=latest 為最新日期）
+    GET /range?start=2026/08/01&end=2026/08/21    日期區間內的投資組合
+    GET /stock/2330?start=2026/01/01              單一股票的持股歷史
+
+ETag 由回應涵蓋的各日期內容雜湊計算，資料未變動時 If-None-Match 直接回傳 304，不必重新產生內容；
+產生過的回應（含 gzip 壓縮結果）保留在 LRU 快取中，多個用戶端共用同一次解析
+
+用法:
+    python history_server.py --port 8800
+"""
+import gzip
+import json
+import time
+import bisect
+import hashlib
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+from history_store import HistoryStore, DEFAULT_FUND_CODE, DEFAULT_HISTORY_PATH, date_to_int, int_to_date
+from data_manifest import DEFAULT_MANIFEST_PATH, portfolio_hash
+from compact_portfolio import CompactPortfolio, StockTable
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8800
+API_VERSION = 1
+# 小於此大小的回應不壓縮
+GZIP_MIN_SIZE = 512
+# 兩次檢查資料檔是否更新的最短間隔（秒）
+RELOAD_INTERVAL = 1.0
+
+
+class QueryError(Exception):
+    """請求參數錯誤或查無資料（附帶 HTTP 狀態碼）"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_date_param(text):
+    """'YYYY/MM/DD'、'YYYY-MM-DD' 或 'YYYYMMDD' → 整數日期"""
+    digits = text.strip().replace('/', '').replace('-', '')
+    if len(digits) != 8 or not digits.isdigit():
+        raise QueryError(400, f"日期格式錯誤: {text}")
+    return int(digits)
+
+
+class ResponseCache:
+    """以 ETag 為鍵的 LRU 快取，值為 (JSON 位元組, gzip 位元組或 None)"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, etag):
+        with self._lock:
+            item = self._items.get(etag)
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(etag)
+            self.hits += 1
+            return item
+
+    def put(self, etag, body, compressed):
+        with self._lock:
+            self._items[etag] = (body, compressed)
+            self._items.move_to_end(etag)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._items), 'hits': self.hits, 'misses': self.misses}
+
+
+class HistoryService:
+    """
+    記憶體內的歷史資料與回應產生
+
+    資料以 CompactPortfolio 保存；歷史資料檔或清單的修改時間改變時自動重新載入
+    """
+
+    def __init__(self, history_path=DEFAULT_HISTORY_PATH, manifest_path=DEFAULT_MANIFEST_PATH, cache_size=256):
+        self.store = HistoryStore(history_path)
+        self.manifest_path = Path(manifest_path)
+        self.cache = ResponseCache(cache_size)
+        self._funds = {}
+        self._version = ''
+        self._signature = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    # ---- 載入 ----
+
+    def _file_signature(self):
+        signature = []
+        for filepath in (self.store.path, self.manifest_path):
+            try:
+                stat = filepath.stat()
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _manifest_hashes(self):
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path, encoding='utf-8') as f:
+            entries = json.load(f).get('files', {})
+        return {
+            (e.get('fund_code', DEFAULT_FUND_CODE), date_to_int(e['date'])): e['hash']
+            for e in entries.values() if e.get('date') and e.get('hash')
+        }
+
+    def reload(self):
+        """重新載入歷史資料檔；清單中沒有的日期另外計算內容雜湊"""
+        start = time.perf_counter()
+        signature = self._file_signature()
+        known = self._manifest_hashes()
+        table = StockTable()
+        funds = {}
+        computed = 0
+        for fund_code, date_int, codes, names, shares, weights, fund_info in self.store.records():
+            portfolio = CompactPortfolio.from_columns(date_int, codes, names, shares, weights, fund_info, table)
+            fund = funds.setdefault(fund_code, {'dates': [], 'portfolios': {}, 'hashes': {}})
+            fund['dates'].append(date_int)
+            fund['portfolios'][date_int] = portfolio
+            content_hash = known.get((fund_code, date_int))
+            if content_hash is None:
+                content_hash = portfolio_hash(portfolio.to_dict())
+                computed += 1
+            fund['hashes'][date_int] = content_hash
+
+        version = hashlib.sha256()
+        for fund_code in sorted(funds):
+            fund = funds[fund_code]
+            for date_int in fund['dates']:
+                version.update(f"{fund_code}{date_int}{fund['hashes'][date_int]}".encode('ascii'))
+
+        self._funds = funds
+        self._version = version.hexdigest()
+        self._signature = signature
+        total = sum(len(f['dates']) for f in funds.values())
+        print(f"✅ 已載入 {len(funds)} 檔基金、{total} 個日期（{computed} 個日期自行計算雜湊），"
+              f"耗時 {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def refresh(self):
+        """資料檔有變動時重新載入（最多每 RELOAD_INTERVAL 秒檢查一次）"""
+        now = time.monotonic()
+        if self._signature is not None and now - self._checked < RELOAD_INTERVAL:
+            return
+        with self._lock:
+            if self._signature is not None and now - self._checked < RELOAD_INTERVAL:
+                return
+            self._checked = now
+            if self._file_signature() != self._signature:
+                self.reload()
+
+    # ---- 查詢 ----
+
+    def _fund(self, params):
+        fund_code = params.get('fund', DEFAULT_FUND_CODE)
+        fund = self._funds.get(fund_code)
+        if fund is None:
+            raise QueryError(404, f"沒有基金 {fund_code} 的資料")
+        return fund_code, fund
+
+    def _date_range(self, fund, params):
+        dates = fund['dates']
+        start = parse_date_param(params['start']) if params.get('start') else 0
+        end = parse_date_param(params['end']) if params.get('end') else 99999999
+        return dates[bisect.bisect_left(dates, start):bisect.bisect_right(dates, end)]
+
+    def _etag(self, key, hashes):
+        digest = hashlib.sha256(f"{API_VERSION}|{key}|".encode('utf-8'))
+        for content_hash in hashes:
+            digest.update(content_hash.encode('ascii'))
+        return digest.hexdigest()[:32]
+
+    def _portfolio_json(self, fund_code, fund, date_int):
+        data = fund['portfolios'][date_int].to_dict()
+        data['fund_code'] = fund_code
+        return data
+
+    def resolve(self, path, params):
+        """
+        找出請求對應的 ETag 與產生內容的函式（只查日期與雜湊，不產生內容）
+
+        Returns:
+            (ETag, 產生回應 dict 的函式)
+        """
+        funds = self._funds
+        key = f"{path}?{json.dumps(params, sort_keys=True)}"
+
+        if path == '/funds':
+            def build():
+                return {'funds': [
+                    {'fund_code': code, 'dates': len(f['dates']),
+                     'first_date': int_to_date(f['dates'][0]), 'last_date': int_to_date(f['dates'][-1])}
+                    for code, f in sorted(funds.items())
+                ]}
+            return self._etag(key, [self._version]), build
+
+        fund_code, fund = self._fund(params)
+
+        if path == '/dates':
+            dates = fund['dates']
+            return (self._etag(key, (fund['hashes'][d] for d in dates)),
+                    lambda: {'fund_code': fund_code, 'dates': [int_to_date(d) for d in dates]})
+
+        if path == '/portfolio':
+            text = params.get('date', 'latest')
+            date_int = fund['dates'][-1] if text == 'latest' else parse_date_param(text)
+            if date_int not in fund['portfolios']:
+                raise QueryError(404, f"沒有 {fund_code} {int_to_date(date_int)} 的資料")
+            return (self._etag(f"{path}?{fund_code}|{date_int}", [fund['hashes'][date_int]]),
+                    lambda: self._portfolio_json(fund_code, fund, date_int))
+
+        if path == '/range':
+            dates = self._date_range(fund, params)
+            return (self._etag(key, (fund['hashes'][d] for d in dates)),
+                    lambda: {'fund_code': fund_code,
+                             'portfolios': [self._portfolio_json(fund_code, fund, d) for d in dates]})
+
+        if path.startswith('/stock/'):
+            stock_code = path[len('/stock/'):]
+            dates = self._date_range(fund, params)
+
+            def build():
+                series = {'fund_code': fund_code, 'stock_code': stock_code, 'stock_name': None,
+                          'date': [], 'shares': [], 'weight': []}
+                for date_int in dates:
+                    portfolio = fund['portfolios'][date_int]
+                    table = portfolio.table
+                    for stock_id, shares, weight in zip(portfolio.stock_ids, portfolio.shares, portfolio.weights):
+                        if table.codes[stock_id] == stock_code:
+                            series['stock_name'] = table.names[stock_id]
+                            series['date'].append(int_to_date(date_int))
+                            series['shares'].append(shares)
+                            series['weight'].append(weight)
+                            break
+                return series
+            return self._etag(key, (fund['hashes'][d] for d in dates)), build
+
+        raise QueryError(404, f"未知的路徑: {path}")
+
+    def response(self, etag, build):
+        """回傳 (JSON 位元組, gzip 位元組或 None)，已產生過的回應直接取自快取"""
+        cached = self.cache.get(etag)
+        if cached is not None:
+            return cached
+        body = json.dumps(build(), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        compressed = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= GZIP_MIN_SIZE else None
+        self.cache.put(etag, body, compressed)
+        return body, compressed
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = 'ETFHistory/1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json_error(self, status, message):
+        body = json.dumps({'error': message}, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_GET(self):
+        service = self.server.service
+        url = urlsplit(self.path)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            service.refresh()
+            etag, build = service.resolve(url.path.rstrip('/') or '/', params)
+        except QueryError as e:
+            self._send_json_error(e.status, str(e))
+            return
+        except Exception as e:
+            self._send_json_error(500, str(e))
+            return
+
+        use_gzip = 'gzip' in self.headers.get('Accept-Encoding', '')
+        # 同一份內容的 gzip 與未壓縮版本使用不同的 ETag；接受 gzip 的用戶端也可能持有未壓縮版本
+        # （回應小於 GZIP_MIN_SIZE 時不壓縮），兩者都可以回應 304
+        tags = [f'"{etag}-gz"', f'"{etag}"'] if use_gzip else [f'"{etag}"']
+        if_none_match = self.headers.get('If-None-Match', '')
+        requested = {tag.strip() for tag in if_none_match.split(',')}
+        matched = [tag for tag in tags if tag in requested] or (tags[:1] if '*' in requested else [])
+        if matched:
+            self.send_response(304)
+            self.send_header('ETag', matched[0])
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+
+        try:
+            body, compressed = service.response(etag, build)
+        except QueryError as e:
+            self._send_json_error(e.status, str(e))
+            return
+        payload = compressed if use_gzip and compressed is not None else body
+        tag = f'"{etag}-gz"' if payload is compressed else f'"{etag}"'
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('ETag', tag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if payload is compressed:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(payload)
+
+    do_HEAD = do_GET
+
+
+class HistoryServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, service, host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False):
+        super().__init__((host, port), _RequestHandler)
+        self.service = service
+        self.verbose = verbose
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False, **service_options):
+    """啟動查詢服務（前景執行，Ctrl+C 結束）"""
+    service = HistoryService(**service_options)
+    service.refresh()
+    server = HistoryServer(service, host, port, verbose)
+    print(f"✅ 歷史資料查詢服務已啟動: http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"查詢服務已停止（快取: {service.cache.stats()}）")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='ETF 歷史資料查詢服務（唯讀）')
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--history', default=str(DEFAULT_HISTORY_PATH), help='歷史資料檔路徑')
+    parser.add_argument('--manifest', default=str(DEFAULT_MANIFEST_PATH), help='資料清單路徑')
+    parser.add_argument('--cache-size', type=int, default=256, help='快取的回應數上限')
+    parser.add_argument('--verbose', action='store_true', help='輸出每個請求的記錄')
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.verbose, history_path=args.history, manifest_path=args.manifest,
+          cache_size=args.cache_size)
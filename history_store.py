@@ -0,0 +1,319 @@
+"""
+歷史資料儲存模組 - 將每日持股與基金資產資訊附加到單一欄位式二進位檔
+讀取任意日期區間時不需要開啟 openpyxl，也不需要逐一開啟 DATA/ 中的 Excel 檔案
+"""
+import os
+import sys
+import json
+import struct
+from array import array
+from pathlib import Path
+
+
+DEFAULT_FUND_CODE = '49YTW'
+DEFAULT_HISTORY_PATH = Path('DATA') / 'portfolio_history.bin'
+
+# 每筆記錄的表頭：魔術字、版本、日期(YYYYMMDD)、基金代號、持股筆數、內容長度
+RECORD_MAGIC = b'ETFH'
+RECORD_VERSION = 1
+FUND_CODE_SIZE = 8
+RECORD_HEADER = struct.Struct(f'<4sBI{FUND_CODE_SIZE}sII')
+# 內容表頭：股票代號、股票名稱、基金資產資訊各自的位元組長度
+PAYLOAD_HEADER = struct.Struct('<III')
+FIELD_SEP = '\x1f'
+
+
+def normalize_date(text):
+    """將 'YYYY/MM/DD' 或民國年 'YYY/MM/DD' 統一為西元 'YYYY/MM/DD'"""
+    year, month, day = text.strip().replace('-', '/').split('/')
+    if len(year) == 3:
+        year = str(int(year) + 1911)
+    return f"{year}/{month.zfill(2)}/{day.zfill(2)}"
+
+
+def date_to_int(date_str):
+    """將 'YYYY/MM/DD' 轉為整數 YYYYMMDD"""
+    return int(date_str.replace('/', '').replace('-', ''))
+
+
+def int_to_date(value):
+    """將整數 YYYYMMDD 轉回 'YYYY/MM/DD'"""
+    text = f"{value:08d}"
+    return f"{text[:4]}/{text[4:6]}/{text[6:8]}"
+
+
+def encode_record(portfolio_data, fund_code=DEFAULT_FUND_CODE):
+    """
+    將單日投資組合編碼為一筆二進位記錄
+
+    Raises:
+        ValueError: 基金代號不是 1 到 FUND_CODE_SIZE 個 ASCII 字元（過長的代號寫入表頭時會被截斷）
+    """
+    if not fund_code or not fund_code.isascii() or len(fund_code) > FUND_CODE_SIZE:
+        raise ValueError(f"基金代號必須是 1 到 {FUND_CODE_SIZE} 個 ASCII 字元: {fund_code!r}")
+    holdings = portfolio_data['holdings']
+    shares = array('d', (float(h['shares']) for h in holdings))
+    weights = array('d', (float(h['weight']) for h in holdings))
+    codes = FIELD_SEP.join(h['stock_code'] for h in holdings).encode('utf-8')
+    names = FIELD_SEP.join(h['stock_name'] for h in holdings).encode('utf-8')
+    info = json.dumps(portfolio_data.get('fund_info', {}), ensure_ascii=False).encode('utf-8')
+
+    if sys.byteorder != 'little':
+        shares.byteswap()
+        weights.byteswap()
+
+    payload = b''.join([
+        PAYLOAD_HEADER.pack(len(codes), len(names), len(info)),
+        shares.tobytes(),
+        weights.tobytes(),
+        codes,
+        names,
+        info,
+    ])
+    header = RECORD_HEADER.pack(
+        RECORD_MAGIC,
+        RECORD_VERSION,
+        date_to_int(portfolio_data['date']),
+        fund_code.encode('ascii'),
+        len(holdings),
+        len(payload),
+    )
+    return header + payload
+
+
+def decode_payload(buffer, offset, count):
+    """從緩衝區解碼一筆記錄內容，回傳各欄位"""
+    codes_len, names_len, info_len = PAYLOAD_HEADER.unpack_from(buffer, offset)
+    pos = offset + PAYLOAD_HEADER.size
+
+    shares = array('d')
+    shares.frombytes(buffer[pos:pos + 8 * count])
+    pos += 8 * count
+    weights = array('d')
+    weights.frombytes(buffer[pos:pos + 8 * count])
+    pos += 8 * count
+    if sys.byteorder != 'little':
+        shares.byteswap()
+        weights.byteswap()
+
+    codes = bytes(buffer[pos:pos + codes_len]).decode('utf-8')
+    pos += codes_len
+    names = bytes(buffer[pos:pos + names_len]).decode('utf-8')
+    pos += names_len
+    fund_info = json.loads(bytes(buffer[pos:pos + info_len]).decode('utf-8'))
+
+    codes = codes.split(FIELD_SEP) if count else []
+    names = names.split(FIELD_SEP) if count else []
+    return codes, names, shares, weights, fund_info
+
+
+class HistoryStore:
+    """附加式的持股歷史資料檔"""
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.path = Path(path)
+
+    def append(self, portfolio_data, fund_code=DEFAULT_FUND_CODE):
+        """附加一天的資料（同一日期重複寫入時，以最後一筆為準）"""
+        self.append_many([portfolio_data], fund_code=fund_code)
+
+    def append_many(self, portfolios, fund_code=DEFAULT_FUND_CODE):
+        """一次附加多天的資料，只做一次寫入"""
+        blob = b''.join(encode_record(p, fund_code) for p in portfolios)
+        if not blob:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _read_buffer(self):
+        if not self.path.exists():
+            return b''
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def _scan(self, buffer):
+        """掃描所有記錄表頭，回傳 {(基金代號, 日期): (內容位置, 筆數)}"""
+        index = {}
+        offset = 0
+        total = len(buffer)
+        while offset + RECORD_HEADER.size <= total:
+            magic, version, date_int, fund, count, length = RECORD_HEADER.unpack_from(buffer, offset)
+            if magic != RECORD_MAGIC or version != RECORD_VERSION:
+                print(f"⚠️  歷史資料檔在位置 {offset} 格式不符，略過後續內容")
+                break
+            start = offset + RECORD_HEADER.size
+            if start + length > total:
+                # 最後一筆寫入不完整（例如寫入中斷），忽略
+                break
+            key = (fund.rstrip(b'\x00').decode('ascii'), date_int)
+            index[key] = (start, count)
+            offset = start + length
+        return index
+
+    def dates(self, fund_code=DEFAULT_FUND_CODE):
+        """回傳已儲存的所有日期（'YYYY/MM/DD'，由舊到新）"""
+        index = self._scan(self._read_buffer())
+        return [int_to_date(d) for f, d in sorted(index) if f == fund_code]
+
+    def fund_codes(self):
+        """回傳已儲存的所有基金代號"""
+        index = self._scan(self._read_buffer())
+        return sorted({f for f, _ in index})
+
+    def load(self, start_date=None, end_date=None, fund_code=DEFAULT_FUND_CODE):
+        """
+        讀取日期區間內的投資組合（含起訖日），格式與 fetch_etf_data 回傳值相同
+
+        Returns:
+            list of {'date', 'holdings', 'fund_info'}，依日期由舊到新排序
+        """
+        start = date_to_int(start_date) if start_date else 0
+        end = date_to_int(end_date) if end_date else 99999999
+
+        buffer = memoryview(self._read_buffer())
+        index = self._scan(buffer)
+
+        portfolios = []
+        for (fund, date_int), (offset, count) in sorted(index.items()):
+            if fund != fund_code or not start <= date_int <= end:
+                continue
+            codes, names, shares, weights, fund_info = decode_payload(buffer, offset, count)
+            holdings = [
+                {'stock_code': c, 'stock_name': n, 'shares': s, 'weight': w}
+                for c, n, s, w in zip(codes, names, shares, weights)
+            ]
+            portfolios.append({
+                'date': int_to_date(date_int),
+                'holdings': holdings,
+                'fund_info': fund_info,
+            })
+        return portfolios
+
+    def records(self, start_date=None, end_date=None, fund_codes=None):
+        """
+        單次讀取檔案，依基金與日期順序逐筆產生多檔基金的記錄（不建立持股 dict）
+
+        Yields:
+            (基金代號, 整數日期, 股票代號列表, 股票名稱列表, 股數 array, 權重 array, 基金資產資訊)
+        """
+        start = date_to_int(start_date) if start_date else 0
+        end = date_to_int(end_date) if end_date else 99999999
+        fund_codes = set(fund_codes) if fund_codes else None
+
+        buffer = memoryview(self._read_buffer())
+        index = self._scan(buffer)
+        for (fund, date_int), (offset, count) in sorted(index.items()):
+            if (fund_codes is not None and fund not in fund_codes) or not start <= date_int <= end:
+                continue
+            yield (fund, date_int) + decode_payload(buffer, offset, count)
+
+    def load_compact(self, start_date=None, end_date=None, fund_code=DEFAULT_FUND_CODE, table=None):
+        """
+        讀取日期區間內的投資組合為精簡表示（不建立每筆持股的 dict）
+
+        Returns:
+            list of CompactPortfolio，依日期由舊到新排序；股票代號與名稱共用同一份 StockTable
+        """
+        from compact_portfolio import CompactPortfolio
+
+        start = date_to_int(start_date) if start_date else 0
+        end = date_to_int(end_date) if end_date else 99999999
+
+        buffer = memoryview(self._read_buffer())
+        index = self._scan(buffer)
+
+        portfolios = []
+        for (fund, date_int), (offset, count) in sorted(index.items()):
+            if fund != fund_code or not start <= date_int <= end:
+                continue
+            codes, names, shares, weights, fund_info = decode_payload(buffer, offset, count)
+            portfolios.append(CompactPortfolio.from_columns(date_int, codes, names, shares, weights, fund_info, table))
+        return portfolios
+
+    def load_columns(self, start_date=None, end_date=None, fund_code=DEFAULT_FUND_CODE):
+        """
+        以欄位形式讀取日期區間內的持股，適合大量計算
+
+        Returns:
+            dict: 'date', 'stock_code', 'stock_name' 為 list，'shares', 'weight' 為 array('d')，
+                  每個元素對應一筆持股
+        """
+        start = date_to_int(start_date) if start_date else 0
+        end = date_to_int(end_date) if end_date else 99999999
+
+        buffer = memoryview(self._read_buffer())
+        index = self._scan(buffer)
+
+        columns = {
+            'date': [],
+            'stock_code': [],
+            'stock_name': [],
+            'shares': array('d'),
+            'weight': array('d'),
+        }
+        for (fund, date_int), (offset, count) in sorted(index.items()):
+            if fund != fund_code or not start <= date_int <= end:
+                continue
+            codes, names, shares, weights, _ = decode_payload(buffer, offset, count)
+            columns['date'].extend([int_to_date(date_int)] * count)
+            columns['stock_code'].extend(codes)
+            columns['stock_name'].extend(names)
+            columns['shares'].extend(shares)
+            columns['weight'].extend(weights)
+        return columns
+
+
+def import_excel_directory(data_dir='DATA', path=DEFAULT_HISTORY_PATH, workers=None):
+    """將 DATA/ 中現有的 Excel 檔案匯入歷史資料檔（只匯入尚未存在的日期）"""
+    from excel_reader import read_directory, list_portfolio_files
+
+    store = HistoryStore(path)
+    existing = {(f, d) for f in store.fund_codes() for d in store.dates(f)}
+
+    # 先以檔名日期過濾，已存在的日期不必開啟檔案
+    files = [item for item in list_portfolio_files(data_dir) if (item[1], item[2]) not in existing]
+
+    by_fund = {}
+    for fund_code, portfolio_data in read_directory(data_dir, workers, files=files):
+        if (fund_code, portfolio_data['date']) in existing:
+            continue
+        by_fund.setdefault(fund_code, []).append(portfolio_data)
+
+    count = 0
+    for fund_code, portfolios in sorted(by_fund.items()):
+        store.append_many(portfolios, fund_code=fund_code)
+        count += len(portfolios)
+    print(f"✅ 已匯入 {count} 個日期到 {store.path}")
+    return count
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='ETF 持股歷史資料檔工具')
+    parser.add_argument('--path', default=str(DEFAULT_HISTORY_PATH), help='歷史資料檔路徑')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = sub.add_parser('import', help='從 Excel 目錄匯入')
+    import_parser.add_argument('data_dir', nargs='?', default='DATA')
+
+    load_parser = sub.add_parser('load', help='讀取日期區間並顯示摘要')
+    load_parser.add_argument('--start', help='起始日期 YYYY/MM/DD')
+    load_parser.add_argument('--end', help='結束日期 YYYY/MM/DD')
+
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        import_excel_directory(args.data_dir, args.path)
+    elif args.command == 'load':
+        t0 = time.perf_counter()
+        portfolios = HistoryStore(args.path).load(args.start, args.end)
+        elapsed = (time.perf_counter() - t0) * 1000
+        rows = sum(len(p['holdings']) for p in portfolios)
+        print(f"讀取 {len(portfolios)} 個日期、{rows} 筆持股，耗時 {elapsed:.1f} ms")
+        if portfolios:
+            print(f"日期範圍: {portfolios[0]['date']} ~ {portfolios[-1]['date']}")
@@ -0,0 +1,336 @@
+"""
+持股面板模組 - 將每日持股整理成「日期 × 股票」的股數與權重矩陣
+股票代號轉為整數編號，矩陣以 NumPy memmap 存放於磁碟；新增一天只需寫入一列，不必重建整個面板
+每日新增/移除、股數變化、權重漂移與周轉率皆以向量運算一次算出整段歷史
+"""
+import os
+import json
+from pathlib import Path
+
+import numpy as np
+
+from history_store import HistoryStore, DEFAULT_FUND_CODE, DEFAULT_HISTORY_PATH
+
+
+DEFAULT_PANEL_DIR = Path('DATA') / 'panel'
+PANEL_VERSION = 1
+# 預留容量，新增日期或股票時不必每次重新配置檔案
+INITIAL_DATE_CAPACITY = 256
+INITIAL_STOCK_CAPACITY = 128
+DTYPE = np.dtype('<f8')
+
+
+class HoldingsPanel:
+    """
+    單一基金的持股面板
+
+    目錄內容：
+        meta.json   日期列表、股票代號（編號即為欄位索引）、股票名稱與容量
+        shares.f8   股數矩陣（日期容量 × 股票容量，列優先）
+        weights.f8  權重矩陣（單位為 %）
+
+    未持有的股票股數與權重皆為 0
+    """
+
+    def __init__(self, path=None, fund_code=DEFAULT_FUND_CODE):
+        self.fund_code = fund_code
+        self.path = Path(path) if path else DEFAULT_PANEL_DIR / fund_code
+        self.dates = []
+        self.codes = []
+        self.names = []
+        self._ids = {}
+        self._date_capacity = 0
+        self._stock_capacity = 0
+        self._shares = None
+        self._weights = None
+
+        meta_path = self.path / 'meta.json'
+        if meta_path.exists():
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            self.fund_code = meta['fund_code']
+            self.dates = meta['dates']
+            self.codes = meta['codes']
+            self.names = meta['names']
+            self._ids = {code: i for i, code in enumerate(self.codes)}
+            self._date_capacity = meta['date_capacity']
+            self._stock_capacity = meta['stock_capacity']
+            self._map('r+')
+
+    # ---- 檔案配置 ----
+
+    def _files(self):
+        return self.path / 'shares.f8', self.path / 'weights.f8'
+
+    def _map(self, mode):
+        shape = (self._date_capacity, self._stock_capacity)
+        shares_path, weights_path = self._files()
+        self._shares = np.memmap(shares_path, dtype=DTYPE, mode=mode, shape=shape)
+        self._weights = np.memmap(weights_path, dtype=DTYPE, mode=mode, shape=shape)
+
+    def _release(self):
+        if self._shares is not None:
+            self._shares.flush()
+            self._weights.flush()
+        self._shares = self._weights = None
+
+    def _ensure_capacity(self, n_dates, n_stocks):
+        """容量不足時加倍擴充；只增加日期時直接延長檔案，既有資料不必搬移"""
+        if self._shares is None:
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._date_capacity = max(INITIAL_DATE_CAPACITY, n_dates)
+            self._stock_capacity = max(INITIAL_STOCK_CAPACITY, n_stocks)
+            self._map('w+')
+            return
+
+        if n_stocks > self._stock_capacity:
+            # 欄數改變，列優先的配置需要重新排列
+            old_shares = np.array(self._shares[:len(self.dates), :len(self.codes)])
+            old_weights = np.array(self._weights[:len(self.dates), :len(self.codes)])
+            self._release()
+            self._stock_capacity = max(n_stocks, self._stock_capacity * 2)
+            self._date_capacity = max(n_dates, self._date_capacity)
+            self._map('w+')
+            self._shares[:old_shares.shape[0], :old_shares.shape[1]] = old_shares
+            self._weights[:old_weights.shape[0], :old_weights.shape[1]] = old_weights
+        elif n_dates > self._date_capacity:
+            self._release()
+            self._date_capacity = max(n_dates, self._date_capacity * 2)
+            size = self._date_capacity * self._stock_capacity * DTYPE.itemsize
+            for filepath in self._files():
+                os.truncate(filepath, size)
+            self._map('r+')
+
+    def _save_meta(self):
+        meta = {
+            'version': PANEL_VERSION,
+            'fund_code': self.fund_code,
+            'date_capacity': self._date_capacity,
+            'stock_capacity': self._stock_capacity,
+            'dates': self.dates,
+            'codes': self.codes,
+            'names': self.names,
+        }
+        meta_path = self.path / 'meta.json'
+        temp = meta_path.with_name('meta.json.tmp')
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(temp, meta_path)
+
+    # ---- 寫入 ----
+
+    def stock_id(self, code, name=''):
+        """取得股票編號，新股票配置新的編號"""
+        stock_id = self._ids.get(code)
+        if stock_id is None:
+            stock_id = len(self.codes)
+            self._ids[code] = stock_id
+            self.codes.append(code)
+            self.names.append(name)
+        elif name and not self.names[stock_id]:
+            self.names[stock_id] = name
+        return stock_id
+
+    def append_many(self, portfolios):
+        """
+        依日期順序附加多天的持股（與最後一天相同的日期會覆寫該列）
+
+        Raises:
+            ValueError: 日期早於面板中最後一天（需以 build_panel 重建）
+        """
+        portfolios = sorted(portfolios, key=lambda p: p['date'])
+        if not portfolios:
+            return
+        if self.dates and portfolios[0]['date'] < self.dates[-1]:
+            raise ValueError(
+                f"日期 {portfolios[0]['date']} 早於面板最後日期 {self.dates[-1]}，請重建面板"
+            )
+
+        rows = []
+        for portfolio_data in portfolios:
+            ids = np.fromiter(
+                (self.stock_id(h['stock_code'], h['stock_name']) for h in portfolio_data['holdings']),
+                dtype=np.intp,
+            )
+            shares = np.fromiter((float(h['shares']) for h in portfolio_data['holdings']), dtype=DTYPE)
+            weights = np.fromiter((float(h['weight']) for h in portfolio_data['holdings']), dtype=DTYPE)
+            date = portfolio_data['date']
+            if self.dates and self.dates[-1] == date:
+                row = len(self.dates) - 1
+            else:
+                row = len(self.dates)
+                self.dates.append(date)
+            rows.append((row, ids, shares, weights))
+
+        self._ensure_capacity(len(self.dates), len(self.codes))
+        for row, ids, shares, weights in rows:
+            self._shares[row] = 0
+            self._weights[row] = 0
+            self._shares[row, ids] = shares
+            self._weights[row, ids] = weights
+        self._shares.flush()
+        self._weights.flush()
+        self._save_meta()
+
+    def append(self, portfolio_data):
+        """附加一天的持股，只寫入一列"""
+        self.append_many([portfolio_data])
+
+    def sync_from_history(self, store=None):
+        """從歷史資料檔附加面板中尚未有的日期，回傳新增的日期數"""
+        store = store or HistoryStore()
+        start = self.dates[-1] if self.dates else None
+        portfolios = [
+            p for p in store.load(start_date=start, fund_code=self.fund_code)
+            if not self.dates or p['date'] > self.dates[-1]
+        ]
+        self.append_many(portfolios)
+        return len(portfolios)
+
+    # ---- 讀取 ----
+
+    @property
+    def shares(self):
+        """股數矩陣（日期數 × 股票數），為 memmap 的檢視"""
+        if self._shares is None:
+            return np.zeros((0, 0), dtype=DTYPE)
+        return self._shares[:len(self.dates), :len(self.codes)]
+
+    @property
+    def weights(self):
+        """權重矩陣（日期數 × 股票數，單位 %）"""
+        if self._weights is None:
+            return np.zeros((0, 0), dtype=DTYPE)
+        return self._weights[:len(self.dates), :len(self.codes)]
+
+    def held(self):
+        """是否持有（布林矩陣）"""
+        return self.shares > 0
+
+    def row(self, date):
+        """日期對應的列索引"""
+        try:
+            return self.dates.index(date)
+        except ValueError:
+            raise KeyError(f"面板中沒有日期 {date}")
+
+    def adds(self):
+        """每日新增的股票（(日期數-1) × 股票數），第 k 列為 dates[k] → dates[k+1]"""
+        held = self.held()
+        return held[1:] & ~held[:-1]
+
+    def removals(self):
+        """每日移除的股票"""
+        held = self.held()
+        return held[:-1] & ~held[1:]
+
+    def share_deltas(self):
+        """每日股數變化"""
+        return np.diff(self.shares, axis=0)
+
+    def weight_drift(self):
+        """每日權重變化（百分點）"""
+        return np.diff(self.weights, axis=0)
+
+    def turnover(self):
+        """每日周轉率（權重變化絕對值總和的一半，單位 %），長度為日期數-1"""
+        return np.abs(self.weight_drift()).sum(axis=1) / 2
+
+    def stock_series(self, code):
+        """單一股票的 (股數序列, 權重序列)"""
+        stock_id = self._ids[code]
+        return self.shares[:, stock_id], self.weights[:, stock_id]
+
+    def changes(self, date=None, previous=None):
+        """
+        比較兩天的持股（預設為最新一天與前一天）
+
+        Returns:
+            dict: 'date', 'previous', 以及 'added'、'removed'、'increased'、'decreased'，
+                  各為 [(股票代號, 股票名稱, 股數或股數變化)]，依變化量排序
+        """
+        if len(self.dates) < 2 and previous is None:
+            raise ValueError("面板中少於兩個日期，無法比較")
+        current_row = self.row(date) if date else len(self.dates) - 1
+        previous_row = self.row(previous) if previous else current_row - 1
+        if previous_row < 0:
+            raise ValueError(f"{self.dates[current_row]} 之前沒有資料")
+
+        now = self.shares[current_row]
+        before = self.shares[previous_row]
+        delta = now - before
+
+        def items(mask, values):
+            ids = np.flatnonzero(mask)
+            ids = ids[np.argsort(-np.abs(values[ids]), kind='stable')]
+            return [(self.codes[i], self.names[i], float(values[i])) for i in ids]
+
+        held_now = now > 0
+        held_before = before > 0
+        both = held_now & held_before
+        return {
+            'date': self.dates[current_row],
+            'previous': self.dates[previous_row],
+            'added': items(held_now & ~held_before, now),
+            'removed': items(held_before & ~held_now, before),
+            'increased': items(both & (delta > 0), delta),
+            'decreased': items(both & (delta < 0), delta),
+        }
+
+
+def build_panel(fund_code=DEFAULT_FUND_CODE, history_path=DEFAULT_HISTORY_PATH, path=None):
+    """從歷史資料檔重建整個面板"""
+    panel = HoldingsPanel(path, fund_code)
+    panel._release()
+    for filepath in (panel.path / 'meta.json', *panel._files()):
+        if filepath.exists():
+            filepath.unlink()
+    panel = HoldingsPanel(path, fund_code)
+    panel.append_many(HistoryStore(history_path).load(fund_code=fund_code))
+    print(f"✅ 已建立持股面板 {panel.path}：{len(panel.dates)} 個日期 × {len(panel.codes)} 檔股票")
+    return panel
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='ETF 持股面板工具')
+    parser.add_argument('--fund', default=DEFAULT_FUND_CODE, help='基金代號')
+    parser.add_argument('--path', default=None, help='面板目錄（預設為 DATA/panel/<基金代號>）')
+    parser.add_argument('--history', default=str(DEFAULT_HISTORY_PATH), help='歷史資料檔路徑')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('build', help='從歷史資料檔重建面板')
+    sub.add_parser('sync', help='附加歷史資料檔中的新日期')
+
+    diff_parser = sub.add_parser('diff', help='比較兩天的持股')
+    diff_parser.add_argument('--date', default=None, help='日期 YYYY/MM/DD（預設為最新一天）')
+    diff_parser.add_argument('--previous', default=None, help='比較日期（預設為前一天）')
+
+    turnover_parser = sub.add_parser('turnover', help='顯示每日周轉率')
+    turnover_parser.add_argument('--last', type=int, default=20, help='顯示最近幾天')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_panel(args.fund, args.history, args.path)
+    elif args.command == 'sync':
+        panel = HoldingsPanel(args.path, args.fund)
+        added = panel.sync_from_history(HistoryStore(args.history))
+        print(f"✅ 新增 {added} 個日期，面板共 {len(panel.dates)} 個日期")
+    elif args.command == 'diff':
+        result = HoldingsPanel(args.path, args.fund).changes(args.date, args.previous)
+        print(f"{result['previous']} → {result['date']}")
+        for key, label in [('added', '🆕 新增'), ('removed', '❌ 移除'),
+                           ('increased', '⬆️ 增加'), ('decreased', '⬇️ 減少')]:
+            print(f"\n{label}（{len(result[key])}）")
+            for code, name, value in result[key]:
+                if key in ('increased', 'decreased'):
+                    print(f"  {code} {name}: {value:+,.0f} 股")
+                else:
+                    print(f"  {code} {name}: {value:,.0f} 股")
+    elif args.command == 'turnover':
+        panel = HoldingsPanel(args.path, args.fund)
+        turnover = panel.turnover()
+        for date, value in list(zip(panel.dates[1:], turnover))[-args.last:]:
+            print(f"{date}  {value:6.2f}%")
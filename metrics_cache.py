@@ -0,0 +1,301 @@
+"""
+投資組合指標快取 - 每個日期一筆固定長度的紀錄：持股數、前 N 大權重、HHI 集中度、周轉率、
+持股權重合計與「股票」列權重的差距，以及周轉率與 HHI 的移動平均
+新增一天時只以前一天的權重與視窗的累計值計算這一筆，不必重新掃描歷史；查詢直接讀取紀錄
+"""
+import os
+import json
+import math
+import shutil
+import struct
+from array import array
+from pathlib import Path
+
+from history_store import HistoryStore, DEFAULT_FUND_CODE, date_to_int, int_to_date
+from portfolio_parser import parse_amount
+
+
+DEFAULT_METRICS_DIR = Path('DATA') / 'metrics'
+METRICS_VERSION = 1
+TOP_N = (1, 5, 10)
+# 移動平均：欄位 → (來源欄位, 視窗日數)
+ROLLING_WINDOWS = {
+    'turnover_5d': ('turnover', 5),
+    'turnover_20d': ('turnover', 20),
+    'hhi_20d': ('hhi', 20),
+}
+BASE_FIELDS = ('count',) + tuple(f'top{n}' for n in TOP_N) + (
+    'hhi', 'turnover', 'holdings_weight', 'stocks_weight', 'stocks_gap',
+)
+FIELDS = BASE_FIELDS + tuple(ROLLING_WINDOWS)
+# 每筆紀錄：日期(YYYYMMDD) + 各欄位（無法計算時為 NaN）
+RECORD = struct.Struct('<I' + 'd' * len(FIELDS))
+NAN = float('nan')
+
+
+def portfolio_weights(portfolio_data):
+    """{股票代號: 權重(%)}"""
+    return {h['stock_code']: float(h['weight']) for h in portfolio_data['holdings']}
+
+
+def compute_metrics(portfolio_data, previous_weights=None):
+    """
+    計算單日指標（不含移動平均）
+
+    HHI 以權重百分比計算（Σ w²，全部集中在一檔為 10000）；
+    周轉率與 holdings_panel 相同，為權重變化絕對值總和的一半（沒有前一天時為 NaN）；
+    stocks_gap 為「股票」列公布的權重減去持股權重合計
+
+    Returns:
+        (指標 dict, 當日權重 dict)
+    """
+    weights = portfolio_weights(portfolio_data)
+    ranked = sorted(weights.values(), reverse=True)
+    metrics = {'count': float(len(weights))}
+    for n in TOP_N:
+        metrics[f'top{n}'] = sum(ranked[:n])
+    metrics['hhi'] = sum(w * w for w in ranked)
+
+    if previous_weights is None:
+        metrics['turnover'] = NAN
+    else:
+        codes = weights.keys() | previous_weights.keys()
+        metrics['turnover'] = sum(abs(weights.get(c, 0.0) - previous_weights.get(c, 0.0)) for c in codes) / 2
+
+    metrics['holdings_weight'] = sum(ranked)
+    reported = parse_amount(portfolio_data.get('fund_info', {}).get('stocks_weight') or '')
+    metrics['stocks_weight'] = float(reported) if reported is not None else NAN
+    metrics['stocks_gap'] = metrics['stocks_weight'] - metrics['holdings_weight']
+    return metrics, weights
+
+
+class MetricsCache:
+    """
+    投資組合指標快取
+
+    目錄內容（每檔基金一個子目錄）：
+        <基金代號>/metrics.bin  依日期附加的固定長度紀錄
+        <基金代號>/meta.json    最後日期、最後一天的權重與各移動平均視窗的累計值
+    """
+
+    def __init__(self, root=DEFAULT_METRICS_DIR):
+        self.root = Path(root)
+        self._rows = {}
+
+    def _fund_dir(self, fund_code):
+        return self.root / fund_code
+
+    def _load_meta(self, fund_code):
+        fund_dir = self._fund_dir(fund_code)
+        if not (fund_dir / 'meta.json').exists() or not (fund_dir / 'metrics.bin').exists():
+            return None
+        with open(fund_dir / 'meta.json', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _save_meta(meta, directory):
+        meta_path = Path(directory) / 'meta.json'
+        temp = meta_path.with_name('meta.json.tmp')
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, sort_keys=True)
+        os.replace(temp, meta_path)
+
+    def last_date(self, fund_code=DEFAULT_FUND_CODE):
+        """快取中的最後日期，尚未建立時回傳 None"""
+        meta = self._load_meta(fund_code)
+        return meta['last_date'] if meta else None
+
+    @staticmethod
+    def _empty_meta():
+        return {
+            'version': METRICS_VERSION,
+            'last_date': None,
+            'count': 0,
+            'weights': None,
+            'windows': {name: {'sum': 0.0, 'n': 0} for name in ROLLING_WINDOWS},
+        }
+
+    @staticmethod
+    def _advance(meta, portfolio_data, value_at):
+        """
+        以累計值計算下一筆紀錄並更新 meta
+
+        value_at(row, field) 讀取既有第 row 筆紀錄的欄位值（離開視窗的那一天）
+        """
+        metrics, weights = compute_metrics(portfolio_data, meta['weights'])
+        row = meta['count']
+        for name, (source, size) in ROLLING_WINDOWS.items():
+            window = meta['windows'][name]
+            value = metrics[source]
+            if not math.isnan(value):
+                window['sum'] += value
+                window['n'] += 1
+            if row >= size:
+                leaving = value_at(row - size, source)
+                if not math.isnan(leaving):
+                    window['sum'] -= leaving
+                    window['n'] -= 1
+            metrics[name] = window['sum'] / window['n'] if window['n'] else NAN
+
+        meta['last_date'] = portfolio_data['date']
+        meta['weights'] = weights
+        meta['count'] = row + 1
+        return RECORD.pack(date_to_int(portfolio_data['date']), *(metrics[field] for field in FIELDS))
+
+    def add(self, portfolio_data, fund_code=DEFAULT_FUND_CODE):
+        """
+        附加一天的指標
+
+        Raises:
+            ValueError: 日期不晚於快取中的最後日期（需以 rebuild 重建）
+        """
+        meta = self._load_meta(fund_code) or self._empty_meta()
+        if meta['last_date'] and portfolio_data['date'] <= meta['last_date']:
+            raise ValueError(f"日期 {portfolio_data['date']} 不晚於快取最後日期 {meta['last_date']}，請重建快取")
+
+        fund_dir = self._fund_dir(fund_code)
+        fund_dir.mkdir(parents=True, exist_ok=True)
+        with open(fund_dir / 'metrics.bin', 'a+b') as f:
+            def value_at(row, field):
+                f.seek(row * RECORD.size)
+                return RECORD.unpack(f.read(RECORD.size))[1 + FIELDS.index(field)]
+
+            record = self._advance(meta, portfolio_data, value_at)
+            f.seek(0, os.SEEK_END)
+            f.write(record)
+        self._save_meta(meta, fund_dir)
+        self._rows.pop(fund_code, None)
+
+    def rebuild(self, store=None, fund_code=DEFAULT_FUND_CODE):
+        """從歷史資料檔重建某基金的整個快取（先寫入暫存目錄再取代），回傳日期數"""
+        store = store or HistoryStore()
+        meta = self._empty_meta()
+        records = []
+
+        def value_at(row, field):
+            return RECORD.unpack(records[row])[1 + FIELDS.index(field)]
+
+        for portfolio_data in store.load(fund_code=fund_code):
+            records.append(self._advance(meta, portfolio_data, value_at))
+
+        fund_dir = self._fund_dir(fund_code)
+        temp_dir = fund_dir.with_name(fund_dir.name + '.tmp')
+        if temp_dir.exists():
+            shutil.rmtree(temp_dir)
+        temp_dir.mkdir(parents=True)
+        with open(temp_dir / 'metrics.bin', 'wb') as f:
+            f.write(b''.join(records))
+        self._save_meta(meta, temp_dir)
+
+        if fund_dir.exists():
+            shutil.rmtree(fund_dir)
+        os.replace(temp_dir, fund_dir)
+        self._rows.pop(fund_code, None)
+        return len(records)
+
+    def update(self, portfolio_data, fund_code=DEFAULT_FUND_CODE, store=None):
+        """
+        儲存一天後更新快取（呼叫前 portfolio_data 應已寫入歷史資料檔）
+
+        周轉率與移動平均都以快取的前一筆紀錄為基準，所以不只附加當天：先由 sync 補上歷史資料檔中
+        快取還沒有的日期（例如 git pull 帶入的），當天才會與真正的前一個交易日比較。
+        重新擷取了不晚於最後日期的日期時，其後每一筆的周轉率與移動平均都會改變，從歷史資料檔重建
+        """
+        last_date = self.last_date(fund_code)
+        if last_date is not None and portfolio_data['date'] <= last_date:
+            self.rebuild(store, fund_code)
+        else:
+            self.sync(store, fund_code)
+
+    def sync(self, store=None, fund_code=DEFAULT_FUND_CODE):
+        """
+        使快取跟上歷史資料檔，回傳新增的日期數
+
+        快取的筆數與歷史資料檔中到快取最後日期為止的日期數不同（尚未建立、中間多了日期、歷史資料檔被取代）時
+        重建並回傳全部日期數；否則依序附加晚於最後日期的日期
+        """
+        store = store or HistoryStore()
+        meta = self._load_meta(fund_code)
+        dates = store.dates(fund_code)
+        last_date = meta['last_date'] if meta else None
+        if last_date not in dates or dates.index(last_date) + 1 != meta['count']:
+            return self.rebuild(store, fund_code)
+        if dates[-1] == last_date:
+            return 0
+        newer = [p for p in store.load(start_date=last_date, fund_code=fund_code) if p['date'] > last_date]
+        for portfolio_data in newer:
+            self.add(portfolio_data, fund_code)
+        return len(newer)
+
+    def _load_rows(self, fund_code):
+        """{日期: 各欄位值}，讀取一次後保留在記憶體，之後每個日期的查詢為常數時間"""
+        if fund_code not in self._rows:
+            rows = {}
+            data_path = self._fund_dir(fund_code) / 'metrics.bin'
+            if data_path.exists():
+                with open(data_path, 'rb') as f:
+                    buffer = f.read()
+                usable = len(buffer) - len(buffer) % RECORD.size
+                for values in RECORD.iter_unpack(buffer[:usable]):
+                    rows[int_to_date(values[0])] = values[1:]
+            self._rows[fund_code] = rows
+        return self._rows[fund_code]
+
+    def get(self, date, fund_code=DEFAULT_FUND_CODE):
+        """單一日期的所有指標（dict），沒有該日期時回傳 None"""
+        values = self._load_rows(fund_code).get(date)
+        return dict(zip(FIELDS, values)) if values else None
+
+    def load(self, start_date=None, end_date=None, fund_code=DEFAULT_FUND_CODE):
+        """
+        以欄位形式讀取日期區間內的指標
+
+        Returns:
+            dict: 'date' 為 list，其餘欄位為 array('d')，依日期由舊到新排序
+        """
+        start = start_date or ''
+        end = end_date or '9999/99/99'
+        columns = {'date': []}
+        columns.update({field: array('d') for field in FIELDS})
+        for date, values in self._load_rows(fund_code).items():
+            if start <= date <= end:
+                columns['date'].append(date)
+                for field, value in zip(FIELDS, values):
+                    columns[field].append(value)
+        return columns
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='ETF 投資組合指標快取')
+    parser.add_argument('--root', default=str(DEFAULT_METRICS_DIR), help='快取目錄')
+    parser.add_argument('--fund', default=DEFAULT_FUND_CODE, help='基金代號')
+    parser.add_argument('--history', default=None, help='歷史資料檔路徑')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('build', help='從歷史資料檔重建快取')
+
+    show_parser = sub.add_parser('show', help='顯示日期區間內的指標（先附加歷史資料檔中的新日期）')
+    show_parser.add_argument('--start', help='起始日期 YYYY/MM/DD')
+    show_parser.add_argument('--end', help='結束日期 YYYY/MM/DD')
+
+    args = parser.parse_args()
+    cache = MetricsCache(args.root)
+    store = HistoryStore(args.history) if args.history else HistoryStore()
+
+    if args.command == 'build':
+        count = cache.rebuild(store, args.fund)
+        print(f"✅ 已建立指標快取 {cache.root / args.fund}：{count} 個日期")
+    elif args.command == 'show':
+        added = cache.sync(store, args.fund)
+        if added:
+            print(f"已附加 {added} 個新日期")
+        columns = cache.load(args.start, args.end, args.fund)
+        print(f"{'日期':<10}  {'檔數':>4}  {'前1':>6}  {'前5':>6}  {'前10':>6}  {'HHI':>7}  "
+              f"{'周轉':>5}  {'周轉5日':>7}  {'周轉20日':>8}  {'股票差距':>8}")
+        for i, date in enumerate(columns['date']):
+            print(f"{date}  {columns['count'][i]:>6.0f}  {columns['top1'][i]:>7.2f}  {columns['top5'][i]:>7.2f}  "
+                  f"{columns['top10'][i]:>8.2f}  {columns['hhi'][i]:>8.1f}  {columns['turnover'][i]:>7.2f}  "
+                  f"{columns['turnover_5d'][i]:>10.2f}  {columns['turnover_20d'][i]:>11.2f}  "
+                  f"{columns['stocks_gap'][i]:>11.2f}")
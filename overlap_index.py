@@ -0,0 +1,309 @@
+"""
+跨 ETF 持股重疊模組 - 每檔基金每天的持股表示為共用股票代號空間上的稀疏權重向量
+同一天所有基金組成一個稀疏矩陣，以矩陣乘積一次算出所有基金組合的重疊權重、餘弦相似度與共同持股數
+
+指標（權重單位為 %）：
+    overlap  重疊權重 Σ min(w_a, w_b)，兩檔基金完全相同時等於持股權重合計
+    cosine   權重向量的餘弦相似度
+    common   共同持股數
+
+使用 scipy.sparse（列在 requirements.txt）；未安裝 scipy 時以 NumPy 密集矩陣計算（只取當天有持股的欄位），結果相同
+
+用法:
+    python overlap_index.py pairs --date 2026/08/21
+    python overlap_index.py history 49YTW 00981A --start 2026/01/01
+    python overlap_index.py common 49YTW 00981A --date 2026/08/21
+"""
+import numpy as np
+
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+from history_store import HistoryStore, date_to_int, int_to_date
+
+
+class OverlapIndex:
+    """
+    多檔基金的持股重疊索引（記憶體內）
+
+    每個（基金, 日期）保存已排序的股票欄位編號與權重；
+    各日期的兩兩比較結果在第一次查詢時計算並保留，新增或改寫某天的資料時只重算那一天
+    """
+
+    def __init__(self, store=None, fund_codes=None):
+        self.codes = []
+        self._columns = {}
+        self._rows = {}
+        self._pairwise = {}
+        if store is not None:
+            self.load(store, fund_codes)
+
+    # ---- 寫入 ----
+
+    def _column_ids(self, stock_codes):
+        columns = self._columns
+        ids = [columns.get(code) for code in stock_codes]
+        if None in ids:
+            for i, code in enumerate(stock_codes):
+                if ids[i] is None:
+                    if code not in columns:
+                        columns[code] = len(self.codes)
+                        self.codes.append(code)
+                    ids[i] = columns[code]
+        return np.array(ids, dtype=np.int64)
+
+    def _set_row(self, date_int, fund_code, stock_codes, weights):
+        ids = self._column_ids(stock_codes)
+        weights = np.asarray(weights, dtype=np.float64)
+        if len(ids) > 1 and (ids[1:] < ids[:-1]).any():
+            order = np.argsort(ids, kind='stable')
+            ids, weights = ids[order], weights[order]
+        if len(ids) > 1 and (ids[1:] == ids[:-1]).any():
+            # 同一股票出現多次時合併權重
+            ids, inverse = np.unique(ids, return_inverse=True)
+            weights = np.bincount(inverse, weights=weights)
+        self._rows.setdefault(date_int, {})[fund_code] = (ids, weights)
+        self._pairwise.pop(date_int, None)
+
+    def add(self, portfolio_data, fund_code):
+        """新增（或改寫）一檔基金一天的持股，只讓那一天的計算結果失效"""
+        holdings = portfolio_data['holdings']
+        self._set_row(
+            date_to_int(portfolio_data['date']), fund_code,
+            [h['stock_code'] for h in holdings], [float(h['weight']) for h in holdings],
+        )
+
+    def load(self, store=None, fund_codes=None, start_date=None, end_date=None):
+        """從歷史資料檔載入多檔基金（預設為全部，只讀取一次檔案），回傳載入的（基金, 日期）數"""
+        store = store or HistoryStore()
+        count = 0
+        for fund_code, date_int, codes, _, _, weights, _ in store.records(start_date, end_date, fund_codes):
+            self._set_row(date_int, fund_code, codes, np.frombuffer(weights, dtype=np.float64))
+            count += 1
+        return count
+
+    # ---- 查詢 ----
+
+    def dates(self, start_date=None, end_date=None):
+        """有資料的日期（'YYYY/MM/DD'，由舊到新）"""
+        start = date_to_int(start_date) if start_date else 0
+        end = date_to_int(end_date) if end_date else 99999999
+        return [int_to_date(d) for d in sorted(self._rows) if start <= d <= end]
+
+    def funds(self, date=None):
+        """某天有資料的基金（未指定日期時為全部基金）"""
+        if date is None:
+            return sorted({fund for rows in self._rows.values() for fund in rows})
+        return sorted(self._rows.get(date_to_int(date), {}))
+
+    def weights(self, fund_code, date):
+        """{股票代號: 權重}，沒有資料時回傳空 dict"""
+        row = self._rows.get(date_to_int(date), {}).get(fund_code)
+        if row is None:
+            return {}
+        return {self.codes[i]: float(w) for i, w in zip(*row)}
+
+    def _stack(self, rows, presence=False):
+        """
+        將多個（欄位編號, 權重）列組成矩陣；presence=True 時持有的股票一律為 1（權重為 0 也算持有）
+
+        scipy 可用時回傳 CSR 稀疏矩陣（欄數為整個股票空間）；
+        否則回傳只含出現過的欄位的密集矩陣
+        """
+        lengths = [len(ids) for ids, _ in rows]
+        indices = np.concatenate([ids for ids, _ in rows]) if rows else np.empty(0, dtype=np.int64)
+        if presence:
+            data = np.ones(len(indices))
+        else:
+            data = np.concatenate([w for _, w in rows]) if rows else np.empty(0)
+        if sparse is not None:
+            indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=indptr[1:])
+            return sparse.csr_matrix((data, indices, indptr), shape=(len(rows), len(self.codes)))
+        used, local = np.unique(indices, return_inverse=True)
+        matrix = np.zeros((len(rows), len(used)))
+        matrix[np.repeat(np.arange(len(rows)), lengths), local] = data
+        return matrix
+
+    @staticmethod
+    def _dense(matrix):
+        return matrix.toarray() if sparse is not None and sparse.issparse(matrix) else np.asarray(matrix)
+
+    @staticmethod
+    def _row_sums(matrix):
+        return np.asarray(matrix.sum(axis=1)).ravel()
+
+    def _min_sums(self, left, right):
+        """逐列 Σ min(left, right)"""
+        if sparse is not None and sparse.issparse(left):
+            return self._row_sums(left.minimum(right))
+        return np.minimum(left, right).sum(axis=1)
+
+    def pairwise(self, date):
+        """
+        某天所有基金的兩兩比較
+
+        Returns:
+            {'funds': 基金代號列表, 'overlap': F×F, 'cosine': F×F, 'common': F×F 整數}；
+            對角線為各基金自身（overlap 為持股權重合計、common 為持股數）
+        """
+        date_int = date_to_int(date)
+        cached = self._pairwise.get(date_int)
+        if cached is not None:
+            return cached
+
+        rows = self._rows.get(date_int, {})
+        funds = sorted(rows)
+        matrix = self._stack([rows[f] for f in funds])
+        binary = self._stack([rows[f] for f in funds], presence=True)
+
+        dots = self._dense(matrix @ matrix.T)
+        common = np.rint(self._dense(binary @ binary.T)).astype(np.int64)
+        norms = np.sqrt(np.diag(dots))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cosine = np.where(np.outer(norms, norms) > 0, dots / np.outer(norms, norms), 0.0)
+
+        overlap = np.zeros((len(funds), len(funds)))
+        first, second = np.triu_indices(len(funds), 1)
+        if len(first):
+            values = self._min_sums(matrix[first], matrix[second])
+            overlap[first, second] = values
+            overlap[second, first] = values
+        overlap[np.diag_indices(len(funds))] = self._row_sums(matrix)
+
+        result = {'funds': funds, 'overlap': overlap, 'cosine': cosine, 'common': common}
+        self._pairwise[date_int] = result
+        return result
+
+    def pairs(self, date, min_common=1):
+        """
+        某天所有基金組合的比較結果，依重疊權重由高到低排序
+
+        Returns:
+            list of (基金 A, 基金 B, 重疊權重, 餘弦相似度, 共同持股數)
+        """
+        result = self.pairwise(date)
+        funds = result['funds']
+        first, second = np.triu_indices(len(funds), 1)
+        items = [
+            (funds[i], funds[j], float(result['overlap'][i, j]), float(result['cosine'][i, j]),
+             int(result['common'][i, j]))
+            for i, j in zip(first, second) if result['common'][i, j] >= min_common
+        ]
+        items.sort(key=lambda item: item[2], reverse=True)
+        return items
+
+    def common_holdings(self, fund_a, fund_b, date):
+        """兩檔基金某天的共同持股，回傳 [(股票代號, A 的權重, B 的權重)]，依較小權重由高到低排序"""
+        rows = self._rows.get(date_to_int(date), {})
+        if fund_a not in rows or fund_b not in rows:
+            return []
+        ids_a, weights_a = rows[fund_a]
+        ids_b, weights_b = rows[fund_b]
+        shared, pos_a, pos_b = np.intersect1d(ids_a, ids_b, assume_unique=True, return_indices=True)
+        items = [
+            (self.codes[i], float(weights_a[a]), float(weights_b[b]))
+            for i, a, b in zip(shared, pos_a, pos_b)
+        ]
+        items.sort(key=lambda item: min(item[1], item[2]), reverse=True)
+        return items
+
+    def pair_history(self, fund_a, fund_b, start_date=None, end_date=None):
+        """
+        兩檔基金在日期區間內每天的重疊權重、餘弦相似度與共同持股數（兩檔都有資料的日期）
+
+        所有日期疊成兩個矩陣後一次計算，不逐日比較
+
+        Returns:
+            {'date': list, 'overlap': ndarray, 'cosine': ndarray, 'common': ndarray}
+        """
+        start = date_to_int(start_date) if start_date else 0
+        end = date_to_int(end_date) if end_date else 99999999
+        dates = [
+            d for d in sorted(self._rows)
+            if start <= d <= end and fund_a in self._rows[d] and fund_b in self._rows[d]
+        ]
+        rows = [self._rows[d][fund_a] for d in dates] + [self._rows[d][fund_b] for d in dates]
+        matrix = self._stack(rows)
+        binary = self._stack(rows, presence=True)
+        left, right = matrix[:len(dates)], matrix[len(dates):]
+        common = self._row_sums(binary[:len(dates)].multiply(binary[len(dates):])) if sparse is not None \
+            else (binary[:len(dates)] * binary[len(dates):]).sum(axis=1)
+
+        if sparse is not None:
+            dots = self._row_sums(left.multiply(right))
+            norm_left = np.sqrt(self._row_sums(left.multiply(left)))
+            norm_right = np.sqrt(self._row_sums(right.multiply(right)))
+        else:
+            dots = (left * right).sum(axis=1)
+            norm_left = np.sqrt((left * left).sum(axis=1))
+            norm_right = np.sqrt((right * right).sum(axis=1))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cosine = np.where(norm_left * norm_right > 0, dots / (norm_left * norm_right), 0.0)
+        return {
+            'date': [int_to_date(d) for d in dates],
+            'overlap': self._min_sums(left, right) if dates else np.empty(0),
+            'cosine': cosine,
+            'common': np.rint(common).astype(np.int64),
+        }
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    from history_store import DEFAULT_HISTORY_PATH
+
+    parser = argparse.ArgumentParser(description='跨 ETF 持股重疊查詢')
+    parser.add_argument('--history', default=str(DEFAULT_HISTORY_PATH), help='歷史資料檔路徑')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    pairs_parser = sub.add_parser('pairs', help='某天所有基金組合的重疊程度')
+    pairs_parser.add_argument('--date', default=None, help='日期 YYYY/MM/DD（預設為最新日期）')
+    pairs_parser.add_argument('--top', type=int, default=20, help='顯示前幾組')
+
+    history_parser = sub.add_parser('history', help='兩檔基金重疊程度的時間序列')
+    history_parser.add_argument('fund_a')
+    history_parser.add_argument('fund_b')
+    history_parser.add_argument('--start', help='起始日期 YYYY/MM/DD')
+    history_parser.add_argument('--end', help='結束日期 YYYY/MM/DD')
+
+    common_parser = sub.add_parser('common', help='兩檔基金某天的共同持股')
+    common_parser.add_argument('fund_a')
+    common_parser.add_argument('fund_b')
+    common_parser.add_argument('--date', default=None, help='日期 YYYY/MM/DD（預設為最新日期）')
+
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    index = OverlapIndex()
+    loaded = index.load(HistoryStore(args.history))
+    print(f"載入 {len(index.funds())} 檔基金、{loaded} 個（基金, 日期），"
+          f"耗時 {(time.perf_counter() - t0) * 1000:.1f} ms（{'scipy.sparse' if sparse else 'NumPy'}）")
+    all_dates = index.dates()
+    if not all_dates:
+        print("⚠️  歷史資料檔中沒有資料")
+        exit(1)
+
+    if args.command == 'pairs':
+        date = args.date or all_dates[-1]
+        t0 = time.perf_counter()
+        items = index.pairs(date)
+        print(f"{date}：{len(index.funds(date))} 檔基金、{len(items)} 組有共同持股"
+              f"（{(time.perf_counter() - t0) * 1000:.1f} ms）")
+        print(f"{'基金 A':<8}{'基金 B':<8}{'重疊權重':>10}{'餘弦':>8}{'共同':>6}")
+        for fund_a, fund_b, overlap, cosine, common in items[:args.top]:
+            print(f"{fund_a:<10}{fund_b:<10}{overlap:>10.2f}{cosine:>10.3f}{common:>8}")
+    elif args.command == 'history':
+        history = index.pair_history(args.fund_a, args.fund_b, args.start, args.end)
+        print(f"{'日期':<10}{'重疊權重':>10}{'餘弦':>8}{'共同':>6}")
+        for date, overlap, cosine, common in zip(history['date'], history['overlap'], history['cosine'],
+                                                 history['common']):
+            print(f"{date:<12}{overlap:>10.2f}{cosine:>10.3f}{common:>8}")
+    elif args.command == 'common':
+        date = args.date or all_dates[-1]
+        items = index.common_holdings(args.fund_a, args.fund_b, date)
+        print(f"{date} {args.fund_a} 與 {args.fund_b} 共同持股 {len(items)} 檔")
+        for code, weight_a, weight_b in items:
+            print(f"{code:<8}{weight_a:>8.2f}%{weight_b:>8.2f}%")
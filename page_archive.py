@@ -0,0 +1,245 @@
+"""
+頁面快照模組 - 保存每次擷取到的原始頁面（HTML 或頁面文字），以基金代號與資料日期為鍵壓縮存放
+解析規則修改後，可用 replay 以多行程重新解析任意日期區間，只重寫內容有變動的 Excel 與歷史資料
+
+壓縮格式：有安裝 zstandard 時使用 zstd，否則使用 gzip
+"""
+import os
+import re
+import gzip
+import time
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from history_store import HistoryStore, date_to_int, int_to_date
+from portfolio_parser import parse_portfolio_text, html_to_text
+
+
+DEFAULT_ARCHIVE_DIR = Path('DATA') / 'pages'
+SNAPSHOT_RE = re.compile(r'^(\d{8})\.(html|text)\.(gz|zst)$')
+PAGE_KINDS = ('html', 'text')
+
+
+def compress(data, codec):
+    if codec == 'zst':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    # mtime 固定為 0，相同內容產生相同的位元組
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def decompress(data, codec):
+    if codec == 'zst':
+        if zstandard is None:
+            raise RuntimeError("讀取 .zst 快照需要安裝 zstandard（pip install zstandard）")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class PageArchive:
+    """
+    原始頁面快照
+
+    檔案位置：<root>/<基金代號>/<YYYYMMDD>.<html|text>.<zst|gz>；同一日期只保留最新一份
+    """
+
+    def __init__(self, root=DEFAULT_ARCHIVE_DIR, codec=None):
+        self.root = Path(root)
+        self.codec = codec or ('zst' if zstandard is not None else 'gz')
+
+    def _existing(self, fund_code, date):
+        """同一基金、日期的既有快照（任何格式）"""
+        fund_dir = self.root / fund_code
+        if not fund_dir.exists():
+            return []
+        stem = f"{date_to_int(date):08d}."
+        return [p for p in fund_dir.iterdir() if p.name.startswith(stem) and SNAPSHOT_RE.match(p.name)]
+
+    def save(self, fund_code, date, kind, content):
+        """保存一份頁面快照，回傳檔案路徑"""
+        if kind not in PAGE_KINDS:
+            raise ValueError(f"不支援的頁面類型: {kind}")
+        fund_dir = self.root / fund_code
+        fund_dir.mkdir(parents=True, exist_ok=True)
+        target = fund_dir / f"{date_to_int(date):08d}.{kind}.{self.codec}"
+
+        temp = target.with_name(target.name + '.tmp')
+        with open(temp, 'wb') as f:
+            f.write(compress(content.encode('utf-8'), self.codec))
+        os.replace(temp, target)
+
+        for other in self._existing(fund_code, date):
+            if other != target:
+                other.unlink()
+        return target
+
+    def load(self, fund_code, date):
+        """
+        讀取一份頁面快照
+
+        Returns:
+            (頁面類型, 內容)；沒有快照時回傳 None
+        """
+        existing = self._existing(fund_code, date)
+        if not existing:
+            return None
+        return read_snapshot(existing[0])
+
+    def snapshots(self, fund_code=None, start_date=None, end_date=None):
+        """列出日期區間內的快照，回傳 [(基金代號, 日期, 路徑)]，依基金與日期排序"""
+        start = date_to_int(start_date) if start_date else 0
+        end = date_to_int(end_date) if end_date else 99999999
+        if not self.root.exists():
+            return []
+
+        fund_dirs = [self.root / fund_code] if fund_code else sorted(p for p in self.root.iterdir() if p.is_dir())
+        items = []
+        for fund_dir in fund_dirs:
+            if not fund_dir.exists():
+                continue
+            for filepath in fund_dir.iterdir():
+                match = SNAPSHOT_RE.match(filepath.name)
+                if match and start <= int(match.group(1)) <= end:
+                    items.append((fund_dir.name, int_to_date(int(match.group(1))), filepath))
+        items.sort(key=lambda item: (item[0], item[1]))
+        return items
+
+
+def read_snapshot(filepath):
+    """讀取快照檔，回傳 (頁面類型, 內容)"""
+    filepath = Path(filepath)
+    match = SNAPSHOT_RE.match(filepath.name)
+    if not match:
+        raise ValueError(f"不是快照檔: {filepath.name}")
+    with open(filepath, 'rb') as f:
+        content = decompress(f.read(), match.group(3)).decode('utf-8')
+    return match.group(2), content
+
+
+def parse_snapshot(filepath):
+    """以目前的解析規則重新解析一份快照"""
+    kind, content = read_snapshot(filepath)
+    page_text = html_to_text(content) if kind == 'html' else content
+    return parse_portfolio_text(page_text, verbose=False)
+
+
+def _replay_one(item):
+    """行程池工作函式：回傳 (基金代號, 快照日期, 資料, 錯誤訊息)"""
+    fund_code, date, filepath = item
+    try:
+        return fund_code, date, parse_snapshot(filepath), None
+    except Exception as e:
+        return fund_code, date, None, str(e)
+
+
+def replay(start_date=None, end_date=None, fund_code=None, workers=None, archive=None,
+           output_dir='DATA', store=None, manifest=None, index=None, deltas=None, metrics=None, dry_run=False):
+    """
+    以多行程重新解析日期區間內的快照，只重寫內容雜湊有變動的日期
+
+    解析在行程池中進行；Excel、歷史資料檔、個股索引、差異封存檔、指標快取與清單由主行程統一寫入
+
+    Returns:
+        (重寫的日期數, 未變動的日期數, 失敗的日期數)
+    """
+    from fetch_and_save import save_to_excel, portfolio_filename
+    from data_manifest import DataManifest, portfolio_hash
+    from stock_index import StockIndex
+    from delta_archive import DeltaArchive
+    from metrics_cache import MetricsCache
+
+    start = time.perf_counter()
+    archive = archive or PageArchive()
+    items = archive.snapshots(fund_code, start_date, end_date)
+    if not items:
+        print("⚠️  區間內沒有頁面快照")
+        return 0, 0, 0
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(items) < 8:
+        results = list(map(_replay_one, items))
+    else:
+        chunksize = max(1, len(items) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_replay_one, items, chunksize=chunksize))
+
+    manifest = manifest or DataManifest()
+    changed = []
+    unchanged = 0
+    failed = 0
+    for code, date, data, error in results:
+        if error:
+            print(f"❌ [{code}] {date} 解析失敗: {error}")
+            failed += 1
+            continue
+        if data['date'] != date:
+            print(f"⚠️  [{code}] 快照 {date} 解析出的日期為 {data['date']}，略過")
+            failed += 1
+            continue
+        filename = portfolio_filename(date, code)
+        content_hash = portfolio_hash(data)
+        if manifest.is_unchanged(filename, content_hash):
+            unchanged += 1
+        else:
+            changed.append((code, filename, content_hash, data))
+
+    for code, filename, _, data in changed:
+        print(f"{'（試執行）' if dry_run else ''}🔄 [{code}] {data['date']} 內容有變動: {filename}")
+
+    if changed and not dry_run:
+        store = store or HistoryStore()
+        index = index or StockIndex()
+        deltas = deltas or DeltaArchive()
+        metrics = metrics or MetricsCache()
+        by_fund = {}
+        for code, filename, content_hash, data in changed:
+            save_to_excel(data, fund_code=code, output_dir=output_dir)
+            manifest.update(filename, data, code,
+                            size=os.path.getsize(os.path.join(output_dir, filename)), content_hash=content_hash)
+            by_fund.setdefault(code, []).append(data)
+        for code, portfolios in by_fund.items():
+            store.append_many(portfolios, fund_code=code)
+            index.rebuild(store, code)
+            deltas.add_many(portfolios, code)
+            metrics.rebuild(store, code)
+        manifest.save()
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ 重新解析 {len(items)} 份快照：{len(changed)} 個日期有變動、{unchanged} 個未變動、"
+          f"{failed} 個失敗，耗時 {elapsed:.2f}s")
+    return len(changed), unchanged, failed
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='ETF 頁面快照工具')
+    parser.add_argument('--root', default=str(DEFAULT_ARCHIVE_DIR), help='快照目錄')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    list_parser = sub.add_parser('list', help='列出快照')
+    list_parser.add_argument('--fund', default=None, help='基金代號（預設為全部）')
+    list_parser.add_argument('--start', help='起始日期 YYYY/MM/DD')
+    list_parser.add_argument('--end', help='結束日期 YYYY/MM/DD')
+
+    replay_parser = sub.add_parser('replay', help='以目前的解析規則重新解析並更新有變動的日期')
+    replay_parser.add_argument('--fund', default=None, help='基金代號（預設為全部）')
+    replay_parser.add_argument('--start', help='起始日期 YYYY/MM/DD')
+    replay_parser.add_argument('--end', help='結束日期 YYYY/MM/DD')
+    replay_parser.add_argument('--workers', type=int, default=None, help='行程數（預設為 CPU 數）')
+    replay_parser.add_argument('--output-dir', default='DATA', help='Excel 輸出目錄')
+    replay_parser.add_argument('--dry-run', action='store_true', help='只列出有變動的日期，不寫入')
+
+    args = parser.parse_args()
+    archive = PageArchive(args.root)
+
+    if args.command == 'list':
+        for code, date, filepath in archive.snapshots(args.fund, args.start, args.end):
+            print(f"{code}  {date}  {filepath.name}  {filepath.stat().st_size:,} bytes")
+    elif args.command == 'replay':
+        replay(args.start, args.end, args.fund, args.workers, archive,
+               output_dir=args.output_dir, dry_run=args.dry_run)
@@ -0,0 +1,251 @@
+"""
+投資組合頁面解析模組 - 單次掃描頁面文字，同時取出資料日期、持股與基金資產資訊
+所有正規表示式在載入模組時預先編譯；HTTP 取得的 HTML 先以 html_to_text 轉為逐行文字
+"""
+import re
+from html.parser import HTMLParser
+
+
+DATE_RE = re.compile(r'資料日期[：:]\s*(\d{3,4})[/-](\d{1,2})[/-](\d{1,2})')
+STOCK_RE = re.compile(r'^(\d{4})\s+(.+?)\s+([\d,]+)\s+([\d.]+)%')
+
+# 只有包含這些標籤的行才需要比對基金資產欄位
+LABEL_RE = re.compile(r'淨資產|流通在外單位數|每單位淨值|現金|期貨|申贖應付款|應收付證券款|股票')
+
+# 基金資產：(欄位, 標籤, [優先樣式, 備用樣式])
+SCALAR_FIELDS = [
+    ('net_asset', '淨資產', [
+        re.compile(r'淨資產\s*[:：]?\s*(NTD\s*-?[\d,]+)', re.IGNORECASE),
+        re.compile(r'淨資產[^\d]+(NTD\s*-?[\d,]+)', re.IGNORECASE),
+    ]),
+    ('outstanding_units', '流通在外單位數', [
+        re.compile(r'流通在外單位數\s*[:：]?\s*([\d,]+)'),
+        re.compile(r'流通在外單位數[^\d]+([\d,]+)'),
+    ]),
+    ('nav', '每單位淨值', [
+        re.compile(r'每單位淨值\s*[:：]?\s*(NTD\s*-?[\d.]+)', re.IGNORECASE),
+        re.compile(r'每單位淨值[^\d]+(NTD\s*-?[\d.]+)', re.IGNORECASE),
+    ]),
+]
+
+# 資產配置表格：(標籤, 金額欄位, 權重欄位)
+# 注意：百分比可能是 "0.56%" 或 "0.56 %"（有空格），且可能為負數
+ITEM_FIELDS = [
+    ('現金', 'cash', 'cash_weight'),
+    ('期貨保證金', 'futures_margin', 'futures_margin_weight'),
+    ('申贖應付款', 'subscription_payable', 'subscription_payable_weight'),
+    ('應收付證券款', 'securities_payable', 'securities_payable_weight'),
+    ('期貨', 'futures', 'futures_weight'),
+    ('股票', 'stocks_value', 'stocks_weight'),
+]
+ITEM_PATTERNS = {
+    label: [
+        re.compile(rf'{label}\s+(NTD\s*-?[\d,]+)\s+(-?[\d.]+)\s*%', re.IGNORECASE),
+        re.compile(rf'{label}[^\n]*?(NTD\s*-?[\d,]+)[^\d]+(-?[\d.]+)\s*%', re.IGNORECASE),
+    ]
+    for label, _, _ in ITEM_FIELDS
+}
+
+# 欄位值可能與標籤分在不同行，比對優先樣式時往後多看幾行：
+# 優先樣式中的 \s 最多跨越 4 個換行（例如「現金 / NTD / 0 / 0 / %」各自一行），空行已事先移除
+LOOKAHEAD_LINES = 4
+
+
+def _to_western_date(year_or_roc, month, day):
+    # 如果是民國年（3位數），轉換為西元年
+    if len(year_or_roc) == 3:
+        year = str(int(year_or_roc) + 1911)
+    else:
+        year = year_or_roc
+    return f"{year}/{month.zfill(2)}/{day.zfill(2)}"
+
+
+class _PageTextExtractor(HTMLParser):
+    """將伺服器回傳的 HTML 轉為與 body.text 相近的逐行文字（表格每列一行）"""
+
+    BLOCK_TAGS = {
+        'br', 'p', 'div', 'tr', 'li', 'ul', 'ol', 'table', 'thead', 'tbody',
+        'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'section', 'header', 'footer',
+    }
+    CELL_TAGS = {'td', 'th'}
+    SKIP_TAGS = {'script', 'style', 'noscript', 'template'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+        elif tag in self.CELL_TAGS:
+            self.parts.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+    def text(self):
+        joined = ''.join(self.parts)
+        lines = (re.sub(r'\s+', ' ', line).strip() for line in joined.split('\n'))
+        return '\n'.join(line for line in lines if line)
+
+
+def find_data_date(text):
+    """只找出資料日期（不解析持股與基金資產），找不到時回傳 None"""
+    match = DATE_RE.search(text)
+    return _to_western_date(*match.groups()) if match else None
+
+
+def html_to_text(html):
+    """將 HTML 轉為逐行文字"""
+    extractor = _PageTextExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor.text()
+
+
+def parse_amount(text):
+    """將 'NTD 40,529,643,608'、'2,596,709,000'、'NTD 16.40'、'-2.47%' 轉為數值，無法轉換時回傳 None"""
+    if isinstance(text, (int, float)):
+        return text
+    cleaned = str(text).upper().replace('NTD', '').replace(',', '').replace('%', '').strip()
+    try:
+        value = float(cleaned)
+    except ValueError:
+        return None
+    return int(value) if value.is_integer() and '.' not in cleaned else value
+
+
+def parse_portfolio_text(page_text, verbose=True):
+    """
+    單次掃描頁面文字，解析資料日期、持股與基金資產資訊
+
+    Args:
+        page_text: 頁面文字（body.text 或 HTML 轉出的逐行文字）
+        verbose: 是否輸出解析過程
+
+    Returns:
+        {'date', 'holdings', 'fund_info'}，與 fetch_etf_data 回傳格式相同
+
+    Raises:
+        ValueError: 找不到資料日期
+    """
+    lines = [line.strip() for line in page_text.split('\n')]
+    lines = [line for line in lines if line]
+
+    data_date = None
+    holdings = []
+    # 狀態：before（尚未遇到持股表頭）→ holdings（表格內）→ after（表格結束）
+    state = 'before'
+    header_index = None
+
+    # 每個欄位記錄優先樣式的第一個結果
+    scalar_hits = {}
+    item_hits = {}
+
+    # 迴圈內常用的函式先綁定為區域變數
+    match_stock = STOCK_RE.match
+    search_label = LABEL_RE.search
+    append_holding = holdings.append
+
+    for i, line in enumerate(lines):
+        if state == 'holdings':
+            match = match_stock(line)
+            if match:
+                code, name, shares, weight = match.groups()
+                append_holding({
+                    'stock_code': code,
+                    'stock_name': name.strip(),
+                    'shares': float(shares.replace(',', '')),
+                    'weight': float(weight),
+                })
+                continue
+            if '友善列印' in line or '匯出' in line:
+                state = 'after'
+        elif state == 'before' and '股票代號' in line and '股票名稱' in line and '股數' in line:
+            state = 'holdings'
+            header_index = i
+            continue
+
+        has_date = data_date is None and '資料日期' in line
+        if not has_date and not search_label(line):
+            continue
+        window = '\n'.join(lines[i:i + 1 + LOOKAHEAD_LINES])
+
+        if has_date:
+            match = DATE_RE.search(window)
+            if match:
+                data_date = _to_western_date(*match.groups())
+
+        for key, label, patterns in SCALAR_FIELDS:
+            if label not in line or key in scalar_hits:
+                continue
+            match = patterns[0].search(window)
+            if match:
+                scalar_hits[key] = match.group(1)
+
+        for label, value_key, weight_key in ITEM_FIELDS:
+            if label not in line or label in item_hits:
+                continue
+            match = ITEM_PATTERNS[label][0].search(window)
+            if match:
+                item_hits[label] = (match.group(1), match.group(2))
+
+    if data_date is None:
+        # 無法找到日期也不要自動使用當前日期，避免產生錯誤資料
+        if verbose:
+            print("⚠️  無法從網頁解析資料日期！停止擷取以避免資料錯誤。")
+        raise ValueError("無法解析資料日期")
+
+    # 優先樣式找不到的欄位才以備用樣式搜尋整份文字（備用樣式可跨越任意行數，與原本的比對方式相同）
+    full_text = None
+    for key, label, patterns in SCALAR_FIELDS:
+        if key in scalar_hits:
+            continue
+        full_text = full_text if full_text is not None else '\n'.join(lines)
+        for pattern in patterns[1:]:
+            match = pattern.search(full_text)
+            if match:
+                scalar_hits[key] = match.group(1)
+                break
+    for label, value_key, weight_key in ITEM_FIELDS:
+        if label in item_hits:
+            continue
+        full_text = full_text if full_text is not None else '\n'.join(lines)
+        for pattern in ITEM_PATTERNS[label][1:]:
+            match = pattern.search(full_text)
+            if match:
+                item_hits[label] = (match.group(1), match.group(2))
+                break
+
+    fund_info = {}
+    for key, label, patterns in SCALAR_FIELDS:
+        if key in scalar_hits:
+            fund_info[key] = scalar_hits[key]
+    for label, value_key, weight_key in ITEM_FIELDS:
+        if label in item_hits:
+            value, weight = item_hits[label]
+            fund_info[value_key] = value
+            fund_info[weight_key] = weight + '%'
+
+    if verbose:
+        print(f"✅ 找到資料日期: {data_date}")
+        if header_index is not None:
+            print(f"找到股票表格標題於第 {header_index} 行")
+        print(f"成功擷取 {len(holdings)} 筆持股資料")
+        print(f"✅ 成功擷取 {len(fund_info)} 項基金資產資訊")
+
+    return {
+        'date': data_date,
+        'holdings': holdings,
+        'fund_info': fund_info,
+    }
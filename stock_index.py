@@ -0,0 +1,213 @@
+"""
+個股索引模組 - 每檔股票一個附加式的紀錄檔，內容為 (日期, 股數, 權重)
+查詢單一股票的完整歷史只需讀取一個小檔案，不必開啟 DATA/ 中的 Excel，也不必掃描整個歷史資料檔
+索引可隨時由歷史資料檔重建，因此不提交到 repository（DATA/stock_index/ 列在 .gitignore）；
+擷取儲存與 etf_cli.py query stock 發現索引尚未建立或落後歷史資料檔時會自動補上，也可手動執行 python stock_index.py build
+"""
+import os
+import json
+import shutil
+import struct
+from array import array
+from pathlib import Path
+
+from history_store import HistoryStore, DEFAULT_FUND_CODE, date_to_int, int_to_date
+
+
+DEFAULT_INDEX_DIR = Path('DATA') / 'stock_index'
+# 每筆紀錄：日期(YYYYMMDD)、股數、權重(%)
+POSTING = struct.Struct('<Idd')
+
+
+class StockIndex:
+    """
+    股票代號 → 每日持股紀錄的反向索引
+
+    目錄內容（每檔基金一個子目錄）：
+        <基金代號>/meta.json    最後日期與股票名稱
+        <基金代號>/<股票代號>.bin  依日期附加的紀錄
+    """
+
+    def __init__(self, root=DEFAULT_INDEX_DIR):
+        self.root = Path(root)
+
+    def _fund_dir(self, fund_code):
+        return self.root / fund_code
+
+    def _load_meta(self, fund_code):
+        meta_path = self._fund_dir(fund_code) / 'meta.json'
+        if not meta_path.exists():
+            return None
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_meta(self, fund_code, meta):
+        meta_path = self._fund_dir(fund_code) / 'meta.json'
+        temp = meta_path.with_name('meta.json.tmp')
+        with open(temp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(temp, meta_path)
+
+    def last_date(self, fund_code=DEFAULT_FUND_CODE):
+        """索引中的最後日期，尚未建立時回傳 None"""
+        meta = self._load_meta(fund_code)
+        return meta['last_date'] if meta else None
+
+    def add(self, portfolio_data, fund_code=DEFAULT_FUND_CODE):
+        """
+        附加一天的持股到各股票的紀錄檔
+
+        Raises:
+            ValueError: 日期不晚於索引中的最後日期（需以 rebuild 重建）
+        """
+        meta = self._load_meta(fund_code) or {'last_date': None, 'names': {}}
+        date = portfolio_data['date']
+        if meta['last_date'] and date <= meta['last_date']:
+            raise ValueError(f"日期 {date} 不晚於索引最後日期 {meta['last_date']}，請重建索引")
+
+        fund_dir = self._fund_dir(fund_code)
+        fund_dir.mkdir(parents=True, exist_ok=True)
+        date_int = date_to_int(date)
+        for h in portfolio_data['holdings']:
+            with open(fund_dir / f"{h['stock_code']}.bin", 'ab') as f:
+                f.write(POSTING.pack(date_int, float(h['shares']), float(h['weight'])))
+            meta['names'][h['stock_code']] = h['stock_name']
+
+        meta['last_date'] = date
+        self._save_meta(fund_code, meta)
+
+    def rebuild(self, store=None, fund_code=DEFAULT_FUND_CODE):
+        """從歷史資料檔重建某基金的整個索引（先寫入暫存目錄再取代）"""
+        store = store or HistoryStore()
+        columns = store.load_columns(fund_code=fund_code)
+
+        postings = {}
+        names = {}
+        for date, code, name, shares, weight in zip(
+            columns['date'], columns['stock_code'], columns['stock_name'],
+            columns['shares'], columns['weight'],
+        ):
+            postings.setdefault(code, []).append(POSTING.pack(date_to_int(date), shares, weight))
+            names[code] = name
+
+        fund_dir = self._fund_dir(fund_code)
+        temp_dir = fund_dir.with_name(fund_dir.name + '.tmp')
+        if temp_dir.exists():
+            shutil.rmtree(temp_dir)
+        temp_dir.mkdir(parents=True)
+        for code, records in postings.items():
+            with open(temp_dir / f"{code}.bin", 'wb') as f:
+                f.write(b''.join(records))
+        last_date = columns['date'][-1] if columns['date'] else None
+        with open(temp_dir / 'meta.json', 'w', encoding='utf-8') as f:
+            json.dump({'last_date': last_date, 'names': names}, f, ensure_ascii=False, indent=1, sort_keys=True)
+
+        if fund_dir.exists():
+            shutil.rmtree(fund_dir)
+        os.replace(temp_dir, fund_dir)
+        return len(postings)
+
+    def update(self, portfolio_data, fund_code=DEFAULT_FUND_CODE, store=None):
+        """
+        每日擷取後更新索引
+
+        一般情況附加歷史資料檔中晚於索引最後日期的所有日期（通常只有當天；git pull 帶入的日期一併補上），
+        索引尚未建立，或重新擷取了過去的日期時，從歷史資料檔重建
+        （呼叫前 portfolio_data 應已寫入歷史資料檔）
+        """
+        last_date = self.last_date(fund_code)
+        if last_date is None or portfolio_data['date'] <= last_date:
+            self.rebuild(store, fund_code)
+        else:
+            self.sync(store, fund_code)
+
+    def sync(self, store=None, fund_code=DEFAULT_FUND_CODE):
+        """
+        使索引跟上歷史資料檔，回傳附加的日期數
+
+        索引最後日期不在歷史資料檔中（尚未建立、歷史資料檔被取代）時重建並回傳全部日期數；
+        否則依序附加晚於最後日期的日期
+        """
+        store = store or HistoryStore()
+        last_date = self.last_date(fund_code)
+        dates = store.dates(fund_code)
+        if last_date is None or last_date not in dates:
+            self.rebuild(store, fund_code)
+            return len(dates)
+        if dates[-1] == last_date:
+            return 0
+        newer = [p for p in store.load(start_date=last_date, fund_code=fund_code) if p['date'] > last_date]
+        for portfolio_data in newer:
+            self.add(portfolio_data, fund_code)
+        return len(newer)
+
+    def codes(self, fund_code=DEFAULT_FUND_CODE):
+        """索引中的所有股票代號"""
+        meta = self._load_meta(fund_code)
+        return sorted(meta['names']) if meta else []
+
+    def name(self, stock_code, fund_code=DEFAULT_FUND_CODE):
+        meta = self._load_meta(fund_code)
+        return meta['names'].get(stock_code) if meta else None
+
+    def series(self, stock_code, start_date=None, end_date=None, fund_code=DEFAULT_FUND_CODE):
+        """
+        讀取單一股票的持股歷史（只列出有持有的日期）
+
+        Returns:
+            dict: 'date' 為 list，'shares'、'weight' 為 array('d')，依日期由舊到新排序
+        """
+        start = date_to_int(start_date) if start_date else 0
+        end = date_to_int(end_date) if end_date else 99999999
+
+        filepath = self._fund_dir(fund_code) / f"{stock_code}.bin"
+        by_date = {}
+        if filepath.exists():
+            with open(filepath, 'rb') as f:
+                buffer = f.read()
+            usable = len(buffer) - len(buffer) % POSTING.size
+            for date_int, shares, weight in POSTING.iter_unpack(buffer[:usable]):
+                if start <= date_int <= end:
+                    by_date[date_int] = (shares, weight)
+
+        series = {'date': [], 'shares': array('d'), 'weight': array('d')}
+        for date_int in sorted(by_date):
+            shares, weight = by_date[date_int]
+            series['date'].append(int_to_date(date_int))
+            series['shares'].append(shares)
+            series['weight'].append(weight)
+        return series
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='ETF 個股索引工具')
+    parser.add_argument('--root', default=str(DEFAULT_INDEX_DIR), help='索引目錄')
+    parser.add_argument('--fund', default=DEFAULT_FUND_CODE, help='基金代號')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = sub.add_parser('build', help='從歷史資料檔重建索引')
+    build_parser.add_argument('--history', default=None, help='歷史資料檔路徑')
+
+    series_parser = sub.add_parser('series', help='顯示單一股票的持股歷史')
+    series_parser.add_argument('stock_code')
+    series_parser.add_argument('--start', help='起始日期 YYYY/MM/DD')
+    series_parser.add_argument('--end', help='結束日期 YYYY/MM/DD')
+
+    args = parser.parse_args()
+    index = StockIndex(args.root)
+
+    if args.command == 'build':
+        store = HistoryStore(args.history) if args.history else HistoryStore()
+        count = index.rebuild(store, args.fund)
+        print(f"✅ 已建立個股索引 {index.root / args.fund}：{count} 檔股票")
+    elif args.command == 'series':
+        t0 = time.perf_counter()
+        series = index.series(args.stock_code, args.start, args.end, args.fund)
+        elapsed = (time.perf_counter() - t0) * 1000
+        print(f"{args.stock_code} {index.name(args.stock_code, args.fund) or ''}："
+              f"{len(series['date'])} 個日期，耗時 {elapsed:.2f} ms")
+        for date, shares, weight in zip(series['date'], series['shares'], series['weight']):
+            print(f"  {date}  {shares:>14,.0f}  {weight:6.2f}%")
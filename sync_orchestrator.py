@@ -0,0 +1,290 @@
+"""
+同步協調模組 - 同時向 GitHub 與 Google Drive 查詢，合併兩邊的日期清單
+每個缺少的日期向所有列出它的來源同時下載，先完成者勝出，其餘傳輸立即取消；
+全部完成後由單一寫入者一次匯入資料庫
+
+來源只需提供：
+    name                         顯示名稱
+    list_dates()                 回傳 {日期: 來源內部的鍵}
+    fetch(date, key, cancel)     下載一個日期，回傳 Excel 路徑；cancel（threading.Event）被設定時放棄並回傳 None
+    close()                      （選用）同步結束時呼叫
+測試時可用 DirectorySource 指向本機目錄，或讓 GitHubSync / GoogleDriveSync 指向本機測試伺服器
+"""
+import time
+import shutil
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, CancelledError
+
+from bulk_import import import_files
+from excel_reader import list_portfolio_files, parse_portfolio_filename
+from history_store import DEFAULT_FUND_CODE
+
+
+def _date_of(filename):
+    """預設基金的檔名 → 日期；其他基金或不符的檔名回傳 None"""
+    parsed = parse_portfolio_filename(filename)
+    if parsed is None or parsed[0] != DEFAULT_FUND_CODE:
+        return None
+    return parsed[1]
+
+
+class GitHubSource:
+    """GitHub repository（含已封存到每月封存檔的日期）"""
+
+    name = 'GitHub'
+
+    def __init__(self, sync=None):
+        if sync is None:
+            from github_sync import GitHubSync
+            sync = GitHubSync()
+        self.sync = sync
+        self._bundle_locks = {}
+        self._bundles = set()
+        self._lock = threading.Lock()
+
+    def list_dates(self):
+        files = self.sync.get_latest_files()
+        dates = {}
+        for file_info in files:
+            date = _date_of(file_info['name'])
+            if date:
+                dates[date] = file_info['name']
+        for date, bundle in self.sync.list_archived_dates().items():
+            dates.setdefault(date, ('archive', bundle))
+        return dates
+
+    def fetch(self, date, key, cancel):
+        if isinstance(key, tuple):
+            # 同一個月份封存檔只下載一次，之後的日期直接由本地封存檔重建
+            bundle = key[1]
+            with self._lock:
+                lock = self._bundle_locks.setdefault(bundle, threading.Lock())
+            with lock:
+                if bundle not in self._bundles:
+                    if self.sync.download_file(bundle, cancel=cancel) is None:
+                        return None
+                    self._bundles.add(bundle)
+            if cancel.is_set():
+                return None
+            return self.sync.export_archived(date)
+        return self.sync.download_file(key, cancel=cancel)
+
+
+class DriveSource:
+    """Google Drive 資料夾（經由本地鏡像，鏡像已是最新的檔案不重新下載）"""
+
+    name = 'Google Drive'
+
+    def __init__(self, sync=None):
+        if sync is None:
+            from drive_sync import GoogleDriveSync
+            sync = GoogleDriveSync()
+        self.sync = sync
+        self._remote = {}
+        self._state = None
+
+    def list_dates(self):
+        self._remote = self.sync.list_remote_files()
+        self._state = self.sync._load_state()
+        dates = {}
+        for name in self._remote:
+            date = _date_of(name)
+            if date:
+                dates[date] = name
+        return dates
+
+    def fetch(self, date, key, cancel):
+        return self.sync.mirror_file(key, self._remote[key], self._state, cancel)
+
+    def close(self):
+        if self._state is not None:
+            self.sync._save_state(self._state)
+
+
+class DirectorySource:
+    """本機目錄中的 Excel（測試用的替身來源；delay 模擬每個檔案的傳輸時間）"""
+
+    def __init__(self, directory, name=None, delay=0.0):
+        self.directory = Path(directory)
+        self.name = name or str(self.directory)
+        self.delay = delay
+
+    def list_dates(self):
+        return {
+            date: path for path, fund_code, date in list_portfolio_files(self.directory)
+            if fund_code == DEFAULT_FUND_CODE
+        }
+
+    def fetch(self, date, key, cancel):
+        if cancel.wait(self.delay):
+            return None
+        return key
+
+
+class SyncOrchestrator:
+    """
+    同時向多個來源同步
+
+    Args:
+        sources: 來源列表（預設為 GitHubSource 與 DriveSource）
+        manager: DataManager（預設建立新的）
+        data_dir: 勝出的檔案最後放置的目錄（預設為 config.DATA_DIR）
+        max_workers: 每個來源同時傳輸的檔案數上限
+    """
+
+    def __init__(self, sources=None, manager=None, data_dir=None, max_workers=4):
+        self.sources = sources if sources is not None else [GitHubSource(), DriveSource()]
+        self.manager = manager
+        if data_dir is None:
+            import config
+            data_dir = config.DATA_DIR
+        self.data_dir = Path(data_dir)
+        self.max_workers = max_workers
+
+    def collect(self, existing_dates=()):
+        """
+        列出所有來源並下載缺少的日期
+
+        每個來源的列表一回來就開始下載它列出的缺少日期；
+        同一日期也在其他來源列出時同時下載，第一個完成者勝出，其餘尚未開始的取消、進行中的中止
+
+        Returns:
+            ({日期: (來源名稱, 檔案路徑)}, 統計資料 dict)
+        """
+        existing_dates = set(existing_dates)
+        start = time.perf_counter()
+        list_pool = ThreadPoolExecutor(max_workers=max(1, len(self.sources)))
+        fetch_pools = {id(src): ThreadPoolExecutor(max_workers=self.max_workers) for src in self.sources}
+
+        listings = {list_pool.submit(src.list_dates): src for src in self.sources}
+        transfers = {}
+        by_date = {}
+        cancels = {}
+        won = {}
+        stats = {'listed': {}, 'won': {}, 'cancelled': 0, 'aborted': 0, 'failed': 0}
+        pending = set(listings)
+
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in listings:
+                        src = listings[future]
+                        try:
+                            listing = future.result()
+                        except Exception as e:
+                            print(f"❌ {src.name} 列出檔案失敗: {e}")
+                            continue
+                        missing = [date for date in sorted(listing) if date not in existing_dates and date not in won]
+                        stats['listed'][src.name] = len(listing)
+                        print(f"{src.name} 回應（{time.perf_counter() - start:.2f}s）：{len(listing)} 個日期，"
+                              f"{len(missing)} 個尚未匯入")
+                        for date in missing:
+                            cancel = cancels.setdefault(date, threading.Event())
+                            transfer = fetch_pools[id(src)].submit(src.fetch, date, listing[date], cancel)
+                            transfers[transfer] = (src, date)
+                            by_date.setdefault(date, []).append(transfer)
+                            pending.add(transfer)
+                        continue
+
+                    src, date = transfers[future]
+                    if future.cancelled():
+                        continue
+                    try:
+                        path = future.result()
+                    except (Exception, CancelledError) as e:
+                        print(f"❌ {src.name} 下載 {date} 失敗: {e}")
+                        stats['failed'] += 1
+                        continue
+                    if path is None:
+                        if cancels[date].is_set():
+                            stats['aborted'] += 1
+                        else:
+                            stats['failed'] += 1
+                        continue
+                    if date in won:
+                        continue
+                    won[date] = (src.name, Path(path))
+                    stats['won'][src.name] = stats['won'].get(src.name, 0) + 1
+                    cancels[date].set()
+                    for other in by_date[date]:
+                        if other is not future and other.cancel():
+                            stats['cancelled'] += 1
+        finally:
+            list_pool.shutdown(wait=False)
+            for pool in fetch_pools.values():
+                pool.shutdown(wait=True, cancel_futures=True)
+            for src in self.sources:
+                close = getattr(src, 'close', None)
+                if close is not None:
+                    close()
+
+        stats['elapsed'] = time.perf_counter() - start
+        return won, stats
+
+    def sync_to_database(self):
+        """同步所有來源的最新資料到本地資料庫"""
+        print("="*60)
+        print(f"資料同步（{' + '.join(src.name for src in self.sources)} 同時進行）")
+        print("="*60)
+
+        if self.manager is None:
+            from data_manager import DataManager
+            self.manager = DataManager()
+        existing_dates = set(self.manager.get_all_dates())
+
+        won, stats = self.collect(existing_dates)
+
+        # 勝出的檔案統一放到資料目錄（保留一份副本），再由單一寫入者一次匯入
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for date in sorted(won):
+            _, path = won[date]
+            target = self.data_dir / path.name
+            if path.resolve() != target.resolve():
+                shutil.copy2(path, target)
+            paths.append(target)
+        imported, failed, skipped = import_files(self.manager, paths, existing_dates)
+
+        print("\n" + "="*60)
+        print("同步完成！")
+        for name, count in stats['listed'].items():
+            print(f"  {name}: 列出 {count} 個日期，提供 {stats['won'].get(name, 0)} 個")
+        print(f"  取消重複傳輸: {stats['cancelled']} 個未開始、{stats['aborted']} 個中止")
+        print(f"  新增: {imported} 個日期（{failed} 個匯入失敗、{stats['failed']} 次下載失敗）")
+        print(f"  資料庫總計: {len(existing_dates) + imported} 個日期")
+        print(f"  耗時: {stats['elapsed']:.2f}s")
+        print("="*60)
+        return imported > 0
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='同時從 GitHub 與 Google Drive 同步 ETF 資料')
+    parser.add_argument('--workers', type=int, default=4, help='每個來源同時下載的檔案數上限')
+    parser.add_argument('--no-github', action='store_true', help='不使用 GitHub')
+    parser.add_argument('--no-drive', action='store_true', help='不使用 Google Drive')
+    parser.add_argument('--github-api-base', default=None, help='GitHub API 根網址（可指向本機測試伺服器）')
+    parser.add_argument('--github-raw-base', default=None, help='GitHub 檔案下載根網址')
+    parser.add_argument('--drive-api-key', default=None, help='Google API 金鑰（預設讀取 GOOGLE_API_KEY 環境變數）')
+    parser.add_argument('--drive-api-base', default=None, help='Drive API 根網址（可指向本機測試伺服器）')
+    parser.add_argument('--drive-mirror-dir', default=None, help='Google Drive 本地鏡像目錄')
+    parser.add_argument('--dir', action='append', default=[], help='額外的本機目錄來源（可重複指定）')
+    args = parser.parse_args()
+
+    sources = []
+    if not args.no_github:
+        from github_sync import GitHubSync
+        sources.append(GitHubSource(GitHubSync(api_base=args.github_api_base, raw_base=args.github_raw_base,
+                                               max_workers=args.workers)))
+    if not args.no_drive:
+        from drive_sync import GoogleDriveSync, DRIVE_API_BASE
+        sources.append(DriveSource(GoogleDriveSync(mirror_dir=args.drive_mirror_dir, api_key=args.drive_api_key,
+                                                   api_base=args.drive_api_base or DRIVE_API_BASE,
+                                                   max_workers=args.workers)))
+    for directory in args.dir:
+        sources.append(DirectorySource(directory))
+
+    SyncOrchestrator(sources, max_workers=args.workers).sync_to_database()
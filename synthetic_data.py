@@ -0,0 +1,249 @@
+"""
+合成資料產生器 - 產生多檔基金、多個交易日的擬真投資組合，供效能測試與壓力測試使用
+
+每檔基金的持股每天隨機微調：股價隨機漫步、偶爾加減碼、偶爾換股；權重由持股市值計算，
+基金資產資訊與持股總額一致。輸出格式與實際資料相同：
+    頁面文字快照   <out>/pages/<基金代號>/<YYYYMMDD>.text.<gz|zst>（PageArchive 格式）
+    Excel 檔案     <out>/ETF_Investment_Portfolio_*.xlsx（save_to_excel 產生）
+
+用法:
+    python synthetic_data.py /tmp/synthetic --funds 5 --days 250 --holdings 50
+"""
+import io
+import math
+import random
+from contextlib import redirect_stdout
+from datetime import date, timedelta
+from pathlib import Path
+
+from history_store import DEFAULT_FUND_CODE
+
+
+DEFAULT_START_DATE = '2020/01/02'
+# 合成股票名稱的字首
+FALLBACK_NAMES = ['台積電', '台達電', '聯發科', '鴻海', '廣達', '日月光投控', '奇鋐', '欣興', '國巨*', '緯穎']
+
+
+def fund_codes(n_funds):
+    """預設基金之後接上合成的基金代號"""
+    return [DEFAULT_FUND_CODE] + [f"SYN{i:03d}" for i in range(1, n_funds)]
+
+
+def trading_days(n_days, start_date=DEFAULT_START_DATE):
+    """從起始日期開始的 n 個平日（'YYYY/MM/DD'）"""
+    day = date(*map(int, start_date.split('/')))
+    days = []
+    while len(days) < n_days:
+        if day.weekday() < 5:
+            days.append(f"{day.year}/{day.month:02d}/{day.day:02d}")
+        day += timedelta(days=1)
+    return days
+
+
+def stock_universe(size, rng, names_from=None):
+    """
+    股票代號與名稱：指定歷史資料檔時優先使用其中的實際股票，不足的部分以合成代號補齊
+    （未指定時只用合成代號，同一個 seed 在任何環境都產生相同的資料）
+
+    Returns:
+        [(股票代號, 股票名稱)]
+    """
+    real = {}
+    if names_from:
+        from history_store import HistoryStore
+        columns = HistoryStore(names_from).load_columns()
+        real = dict(zip(columns['stock_code'], columns['stock_name']))
+    universe = sorted(real.items())
+    used = set(real)
+    code = 1101
+    while len(universe) < size:
+        if str(code) not in used:
+            universe.append((str(code), f"{rng.choice(FALLBACK_NAMES)}{code % 97}"))
+        code += 1
+    rng.shuffle(universe)
+    return universe[:size]
+
+
+def _fund_info(stocks_value, rng, units):
+    """與持股總額一致的基金資產資訊（文字格式與網頁相同）"""
+    stocks_weight = rng.uniform(95.0, 99.5)
+    net_asset = int(stocks_value / (stocks_weight / 100))
+    cash = int(net_asset * rng.uniform(0.2, 3.0) / 100)
+    margin = int(net_asset * rng.uniform(0.0, 1.0) / 100)
+    payable = net_asset - stocks_value - cash - margin
+
+    def weight(value):
+        return f"{value / net_asset * 100:.2f}%"
+
+    return {
+        'net_asset': f"NTD {net_asset:,}",
+        'outstanding_units': f"{units:,}",
+        'nav': f"NTD {net_asset / units:.2f}",
+        'futures': 'NTD 0',
+        'futures_weight': '0%',
+        'stocks_value': f"NTD {stocks_value:,}",
+        'stocks_weight': weight(stocks_value),
+        'cash': f"NTD {cash:,}",
+        'cash_weight': weight(cash),
+        'futures_margin': f"NTD {margin:,}",
+        'futures_margin_weight': weight(margin),
+        'subscription_payable': 'NTD 0',
+        'subscription_payable_weight': '0%',
+        'securities_payable': f"NTD {payable:,}",
+        'securities_payable_weight': weight(payable),
+    }
+
+
+def generate_fund(fund_code, days, n_holdings, universe, seed=0, turnover=0.02):
+    """
+    產生一檔基金每天的投資組合
+
+    Args:
+        days: 日期列表
+        n_holdings: 持股檔數
+        universe: stock_universe() 的結果
+        turnover: 每天每檔持股被換掉的機率
+
+    Yields:
+        {'date', 'holdings', 'fund_info'}，與 fetch_etf_data 回傳格式相同
+    """
+    rng = random.Random(f"{seed}-{fund_code}")
+    names = dict(universe)
+    codes = [code for code, _ in universe]
+    prices = {code: rng.uniform(20, 1500) for code in codes}
+    units = rng.randint(500, 10000) * 1_000_000
+
+    # 初始權重呈冪次分布：少數大型持股、長尾的小型持股
+    held = rng.sample(codes, min(n_holdings, len(codes)))
+    budget = units * rng.uniform(10, 40)
+    raw = [1 / (rank + 1) ** 1.1 for rank in range(len(held))]
+    shares = {
+        code: max(1000, int(budget * r / sum(raw) / prices[code] / 1000) * 1000)
+        for code, r in zip(held, raw)
+    }
+
+    for day in days:
+        for code in codes:
+            prices[code] *= math.exp(rng.gauss(0.0003, 0.02))
+        for code in list(shares):
+            roll = rng.random()
+            if roll < turnover:
+                del shares[code]
+                candidates = [c for c in rng.sample(codes, min(len(codes), 8)) if c not in shares]
+                if candidates:
+                    new = candidates[0]
+                    shares[new] = max(1000, int(budget * 0.005 / prices[new] / 1000) * 1000)
+            elif roll < 0.25:
+                shares[code] = max(1000, int(shares[code] * rng.uniform(0.9, 1.1) / 1000) * 1000)
+
+        values = {code: shares[code] * prices[code] for code in shares}
+        stocks_value = int(sum(values.values()))
+        fund_info = _fund_info(stocks_value, rng, units)
+        stocks_share = float(fund_info['stocks_weight'].rstrip('%'))
+        holdings = [
+            {
+                'stock_code': code,
+                'stock_name': names[code],
+                'shares': float(shares[code]),
+                'weight': round(values[code] / stocks_value * stocks_share, 2),
+            }
+            for code in sorted(shares, key=values.get, reverse=True)
+        ]
+        yield {'date': day, 'holdings': holdings, 'fund_info': fund_info}
+
+
+def render_page_text(portfolio_data):
+    """產生與實際網頁相同版面的頁面文字（html_to_text 之後的逐行文字）"""
+    year, month, day = portfolio_data['date'].split('/')
+    info = portfolio_data['fund_info']
+
+    def item(label, value_key, weight_key):
+        return f"{label} {info[value_key]} {info[weight_key]}"
+
+    lines = [
+        '基金投資組合',
+        f"資料日期：{int(year) - 1911}/{month}/{day}",
+        '基金資產',
+        f"淨資產 {info['net_asset']}",
+        f"流通在外單位數 {info['outstanding_units']}",
+        f"每單位淨值 {info['nav']}",
+        '項目 金額 權重',
+        item('期貨(名目本金)', 'futures', 'futures_weight'),
+        item('股票', 'stocks_value', 'stocks_weight'),
+        '項目 金額 權重',
+        item('現金', 'cash', 'cash_weight'),
+        item('期貨保證金', 'futures_margin', 'futures_margin_weight'),
+        item('申贖應付款', 'subscription_payable', 'subscription_payable_weight'),
+        item('應收付證券款', 'securities_payable', 'securities_payable_weight'),
+        '股票代號 股票名稱 股數 持股權重',
+    ]
+    for h in portfolio_data['holdings']:
+        lines.append(f"{h['stock_code']} {h['stock_name']} {int(h['shares']):,} {h['weight']:.2f}%")
+    lines.append('友善列印')
+    return '\n'.join(lines)
+
+
+def generate(out_dir, n_funds=1, n_days=250, n_holdings=50, universe_size=None, seed=0,
+             start_date=DEFAULT_START_DATE, pages=True, excel=True, names_from=None):
+    """
+    產生合成資料並寫入目錄
+
+    Returns:
+        {基金代號: [投資組合 dict]}（記憶體中的原始資料，可用來比對解析結果）
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    universe = stock_universe(universe_size or max(n_holdings * 3, 150), rng, names_from)
+    days = trading_days(n_days, start_date)
+
+    archive = None
+    if pages:
+        from page_archive import PageArchive
+        archive = PageArchive(out_dir / 'pages')
+    if excel:
+        from fetch_and_save import save_to_excel
+
+    portfolios = {}
+    for fund_code in fund_codes(n_funds):
+        portfolios[fund_code] = list(generate_fund(fund_code, days, n_holdings, universe, seed))
+        for portfolio_data in portfolios[fund_code]:
+            if archive is not None:
+                archive.save(fund_code, portfolio_data['date'], 'text', render_page_text(portfolio_data))
+            if excel:
+                # save_to_excel 每個檔案都會輸出一行，大量產生時不顯示
+                with redirect_stdout(io.StringIO()):
+                    save_to_excel(portfolio_data, fund_code=fund_code, output_dir=str(out_dir))
+    return portfolios
+
+
+def page_fixture_paths(out_dir):
+    """產生的頁面文字快照，回傳 [(基金代號, 日期, 路徑)]"""
+    from page_archive import PageArchive
+    return PageArchive(Path(out_dir) / 'pages').snapshots()
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='產生合成的 ETF 投資組合資料')
+    parser.add_argument('out_dir', help='輸出目錄')
+    parser.add_argument('--funds', type=int, default=1, help='基金數（第一檔為預設基金）')
+    parser.add_argument('--days', type=int, default=250, help='交易日數')
+    parser.add_argument('--holdings', type=int, default=50, help='每檔基金的持股數')
+    parser.add_argument('--universe', type=int, default=None, help='股票池大小（預設為持股數的 3 倍）')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--start', default=DEFAULT_START_DATE, help='起始日期 YYYY/MM/DD')
+    parser.add_argument('--names-from', default=None, help='取用實際股票名稱的歷史資料檔（例如 DATA/portfolio_history.bin）')
+    parser.add_argument('--no-pages', action='store_true', help='不產生頁面文字快照')
+    parser.add_argument('--no-excel', action='store_true', help='不產生 Excel 檔案')
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    result = generate(args.out_dir, args.funds, args.days, args.holdings, args.universe, args.seed,
+                      args.start, pages=not args.no_pages, excel=not args.no_excel, names_from=args.names_from)
+    total = sum(len(p) for p in result.values())
+    first = next(iter(result.values()))
+    print(f"✅ 已產生 {len(result)} 檔基金、{total} 個（基金, 日期）：{first[0]['date']} ~ {first[-1]['date']}，"
+          f"耗時 {time.perf_counter() - t0:.1f}s")
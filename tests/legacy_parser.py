@@ -0,0 +1,100 @@
+"""
+頁面解析的比較基準：原本 fetch_etf_data 內的多次掃描解析方式，以及與實際頁面版面相同的合成頁面文字
+（供 tests/test_portfolio_parser.py 與 benchmark.py parser 使用）
+"""
+import random
+import re
+
+
+def legacy_parse(page_text):
+    """原本 fetch_etf_data 內的多次掃描解析方式（保留作為比較基準）"""
+    match = re.search(r'資料日期[：:]\s*(\d{3,4})[/-](\d{1,2})[/-](\d{1,2})', page_text)
+    if not match:
+        raise ValueError("無法解析資料日期")
+    year = match.group(1)
+    if len(year) == 3:
+        year = str(int(year) + 1911)
+    data_date = f"{year}/{match.group(2).zfill(2)}/{match.group(3).zfill(2)}"
+
+    lines = [line.strip() for line in page_text.split('\n') if line.strip()]
+    holdings = []
+    stock_pattern = r'^(\d{4})\s+(.+?)\s+([\d,]+)\s+([\d.]+)%'
+    for i, line in enumerate(lines):
+        if '股票代號' in line and '股票名稱' in line and '股數' in line:
+            for j in range(i + 1, len(lines)):
+                match = re.match(stock_pattern, lines[j])
+                if match:
+                    holdings.append({
+                        'stock_code': match.group(1),
+                        'stock_name': match.group(2).strip(),
+                        'shares': float(match.group(3).replace(',', '')),
+                        'weight': float(match.group(4)),
+                    })
+                elif '友善列印' in lines[j] or '匯出' in lines[j]:
+                    break
+            break
+
+    fund_info = {}
+    lines_text = '\n'.join(lines)
+    for key, patterns, flags in [
+        ('net_asset', [r'淨資產\s*[:：]?\s*(NTD\s*-?[\d,]+)', r'淨資產[^\d]+(NTD\s*-?[\d,]+)'], re.IGNORECASE),
+        ('outstanding_units', [r'流通在外單位數\s*[:：]?\s*([\d,]+)', r'流通在外單位數[^\d]+([\d,]+)'], 0),
+        ('nav', [r'每單位淨值\s*[:：]?\s*(NTD\s*-?[\d.]+)', r'每單位淨值[^\d]+(NTD\s*-?[\d.]+)'], re.IGNORECASE),
+    ]:
+        for pattern in patterns:
+            match = re.search(pattern, lines_text, flags)
+            if match:
+                fund_info[key] = match.group(1)
+                break
+
+    items_to_find = {
+        '現金': ('cash', 'cash_weight'),
+        '期貨保證金': ('futures_margin', 'futures_margin_weight'),
+        '申贖應付款': ('subscription_payable', 'subscription_payable_weight'),
+        '應收付證券款': ('securities_payable', 'securities_payable_weight'),
+        '期貨': ('futures', 'futures_weight'),
+        '股票': ('stocks_value', 'stocks_weight'),
+    }
+    for item_name, (value_key, weight_key) in items_to_find.items():
+        for pattern in [
+            rf'{item_name}\s+(NTD\s*-?[\d,]+)\s+(-?[\d.]+)\s*%',
+            rf'{item_name}[^\n]*?(NTD\s*-?[\d,]+)[^\d]+(-?[\d.]+)\s*%',
+        ]:
+            match = re.search(pattern, lines_text, re.IGNORECASE)
+            if match:
+                fund_info[value_key] = match.group(1)
+                fund_info[weight_key] = match.group(2) + '%'
+                break
+
+    return {'date': data_date, 'holdings': holdings, 'fund_info': fund_info}
+
+
+def synthetic_page_text(n_holdings, seed=0, date='115/03/18'):
+    """產生與實際頁面版面相同的合成頁面文字"""
+    rng = random.Random(seed)
+    lines = [
+        '首頁 ETF專區 基金資訊',
+        '基本資料 淨值走勢 配息資訊 基金投資組合',
+        f'資料日期：{date}',
+        '基金資產',
+        '淨資產 NTD 88,741,167,609',
+        '流通在外單位數 4,257,709,000',
+        '每單位淨值 NTD 20.84',
+        '項目 金額 權重',
+        '期貨(名目本金) NTD 0 0%',
+        '股票 NTD 85,943,082,270 96.82%',
+        '項目 金額 權重',
+        '現金 NTD 2,388,573,114 2.69%',
+        '期貨保證金 NTD 500,128,241 0.56 %',
+        '申贖應付款 NTD 0 0%',
+        '應收付證券款 NTD -2,193,216,765 -2.47%',
+        '股票',
+        '股票代號 股票名稱 股數 持股權重',
+    ]
+    for i in range(n_holdings):
+        code = 1101 + (i * 7) % 8899
+        shares = rng.randint(1, 9000) * 1000
+        weight = rng.uniform(0.01, 9.99)
+        lines.append(f'{code} 股票{i:05d} {shares:,} {weight:.2f}%')
+    lines += ['友善列印 匯出Excel', '客服專線 (02)2747-8266', '版權所有']
+    return '\n'.join(lines)
@@ -0,0 +1,66 @@
+"""
+批次匯入：寫入只經由 DataManager 既有的 _save_to_database / save_fund_statistics
+"""
+import io
+import unittest
+from contextlib import redirect_stdout
+
+from bulk_import import import_portfolios
+
+
+class _Manager:
+    """只有本機 DataManager 實際提供的寫入方法"""
+
+    def __init__(self, fail_dates=()):
+        self.fail_dates = set(fail_dates)
+        self.saved = []
+        self.statistics = []
+
+    def _save_to_database(self, date, holdings):
+        if date in self.fail_dates:
+            raise ValueError('寫入失敗')
+        self.saved.append((date, len(holdings)))
+
+    def save_fund_statistics(self, date, asset_allocation):
+        self.statistics.append((date, asset_allocation))
+
+
+def _portfolio(date, rows=1, asset_allocation=None):
+    portfolio_data = {
+        'date': date,
+        'holdings': [{'stock_code': str(2330 + i), 'stock_name': '', 'shares': 1.0, 'weight': 1.0}
+                     for i in range(rows)],
+    }
+    if asset_allocation is not None:
+        portfolio_data['asset_allocation'] = asset_allocation
+    return portfolio_data
+
+
+class ImportPortfoliosTest(unittest.TestCase):
+
+    def test_writes_in_date_order_once_per_date(self):
+        manager = _Manager()
+        portfolios = [_portfolio('2025/12/12'), _portfolio('2025/12/10', rows=1), _portfolio('2025/12/10', rows=3)]
+
+        self.assertEqual(import_portfolios(manager, portfolios), (2, 0))
+        # 同一日期保留最後一筆
+        self.assertEqual(manager.saved, [('2025/12/10', 3), ('2025/12/12', 1)])
+
+    def test_asset_allocation_is_saved_when_present(self):
+        manager = _Manager()
+        import_portfolios(manager, [_portfolio('2025/12/10', asset_allocation={'股票': 95.0}),
+                                    _portfolio('2025/12/11')])
+
+        self.assertEqual(manager.statistics, [('2025/12/10', {'股票': 95.0})])
+
+    def test_failed_date_does_not_stop_others(self):
+        manager = _Manager(fail_dates={'2025/12/11'})
+        with redirect_stdout(io.StringIO()):
+            result = import_portfolios(manager, [_portfolio(d) for d in ('2025/12/10', '2025/12/11', '2025/12/12')])
+
+        self.assertEqual(result, (2, 1))
+        self.assertEqual([date for date, _ in manager.saved], ['2025/12/10', '2025/12/12'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+精簡投資組合：基金資產資訊字串與整數的雙向轉換，以及 to_dict() 還原後與原本的 dict 完全相同
+"""
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from compact_portfolio import CompactPortfolio, StockTable, parse_info_value, format_info_value
+from history_store import HistoryStore
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+PORTFOLIO = json.loads((FIXTURES / 'ezmoney_49YTW_20251212.json').read_text(encoding='utf-8'))
+
+
+class InfoValueTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        for text, kind, parsed in [
+            ('NTD -0.50', 'amount', (-50, 2)),
+            ('NTD 42,575,942,188', 'amount', (42575942188, 0)),
+            ('NTD 16.40', 'amount', (1640, 2)),
+            ('2,596,709,000', 'units', (2596709000, 0)),
+            ('0.56%', 'weight', (56, 2)),
+            ('0%', 'weight', (0, 0)),
+            ('-1.5%', 'weight', (-15, 1)),
+        ]:
+            self.assertEqual(parse_info_value(text, kind), parsed, text)
+            self.assertEqual(format_info_value(*parsed, kind), text)
+
+    def test_non_matching(self):
+        for text, kind in [
+            ('N/A', 'amount'),
+            ('16.40', 'amount'),
+            ('NTD 1,23', 'amount'),
+            ('2596709,000', 'units'),
+            ('0.56', 'weight'),
+            # 負零無法還原出負號
+            ('-0%', 'weight'),
+            (None, 'amount'),
+        ]:
+            self.assertIsNone(parse_info_value(text, kind), text)
+
+
+class CompactPortfolioTest(unittest.TestCase):
+
+    def test_to_dict_round_trip(self):
+        table = StockTable()
+        compact = CompactPortfolio.from_dict(PORTFOLIO, table)
+
+        self.assertEqual(compact.to_dict(), {key: PORTFOLIO[key] for key in ('date', 'holdings', 'fund_info')})
+        self.assertIsNone(compact.extra_info)
+        self.assertEqual(len(table), len(PORTFOLIO['holdings']))
+        self.assertEqual(compact.info('nav'), 16.4)
+
+    def test_extra_info(self):
+        fund_info = dict(PORTFOLIO['fund_info'], cash='NTD -0.50', outstanding_units='2,596,709,000',
+                         cash_weight='0.56%', futures='-', fund_name='測試基金')
+        portfolio_data = dict(PORTFOLIO, fund_info=fund_info)
+        compact = CompactPortfolio.from_dict(portfolio_data, StockTable())
+
+        # 格式不符的欄位與未知欄位原樣保留，其餘存成整數
+        self.assertEqual(compact.extra_info, {'futures': '-', 'fund_name': '測試基金'})
+        self.assertEqual(compact.info('cash'), -0.5)
+        self.assertEqual(compact.info('outstanding_units'), 2596709000)
+        self.assertEqual(compact.info('cash_weight'), 0.56)
+        self.assertIsNone(compact.info('futures'))
+        self.assertEqual(compact.to_dict()['fund_info'], fund_info)
+
+    def test_load_compact_matches_load(self):
+        workdir = Path(tempfile.mkdtemp(prefix='etf-test-'))
+        self.addCleanup(shutil.rmtree, workdir)
+        store = HistoryStore(workdir / 'history.bin')
+        renamed = [dict(h, stock_name=h['stock_name'] + '-KY') if i == 0 else h
+                   for i, h in enumerate(PORTFOLIO['holdings'])]
+        store.append_many([dict(PORTFOLIO, date='2025/12/11'), dict(PORTFOLIO, date='2025/12/12', holdings=renamed)])
+
+        table = StockTable()
+        compact = store.load_compact(table=table)
+        self.assertEqual([c.to_dict() for c in compact], store.load())
+        # 改名的股票另外編號，兩天都還原當天的名稱
+        self.assertEqual(len(table), len(PORTFOLIO['holdings']) + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
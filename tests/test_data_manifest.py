@@ -0,0 +1,64 @@
+"""
+資料清單：同一份投資組合不論來自網頁擷取、文字版或數值版 Excel，標準形式與內容雜湊都相同，
+由 Excel 建立的清單也能讓擷取結果判定為未變動
+"""
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from data_manifest import DataManifest, build_manifest, normalize_portfolio, portfolio_hash
+from excel_reader import read_portfolio
+from fetch_and_save import save_to_excel
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+PORTFOLIO = json.loads((FIXTURES / 'ezmoney_49YTW_20251212.json').read_text(encoding='utf-8'))
+# 網站公布的股票權重與持股權重加總（Excel 的 C10，95.16%）不同
+FETCHED = dict(PORTFOLIO, fund_info=dict(PORTFOLIO['fund_info'], stocks_weight='95.20%'))
+
+
+class ManifestEquivalenceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp(prefix='etf-test-'))
+        self.sources = {'fetch': FETCHED}
+        with redirect_stdout(io.StringIO()):
+            for typed in (False, True):
+                output_dir = self.workdir / ('typed' if typed else 'text')
+                output_dir.mkdir()
+                self.filename = save_to_excel(FETCHED, typed=typed, output_dir=str(output_dir))
+                self.sources[output_dir.name] = read_portfolio(output_dir / self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def test_normalized_forms_match(self):
+        expected = normalize_portfolio(FETCHED)
+        expected['fund_info'].pop('stocks_weight')
+        for name, portfolio_data in self.sources.items():
+            normalized = normalize_portfolio(portfolio_data)
+            # 只有股票權重不同：Excel 寫入的是持股權重加總
+            normalized['fund_info'].pop('stocks_weight')
+            self.assertEqual(normalized, expected, name)
+        self.assertEqual(len({portfolio_hash(p) for p in self.sources.values()}), 1)
+
+    def test_is_unchanged_across_sources(self):
+        for written_by, written in self.sources.items():
+            manifest = DataManifest(self.workdir / 'manifest.json')
+            manifest.update(self.filename, written)
+            for name, portfolio_data in self.sources.items():
+                self.assertTrue(manifest.is_unchanged(self.filename, portfolio_hash(portfolio_data)),
+                                (written_by, name))
+        self.assertFalse(manifest.is_unchanged(self.filename, portfolio_hash(dict(FETCHED, holdings=[]))))
+
+    def test_manifest_built_from_excel_matches_fetch(self):
+        with redirect_stdout(io.StringIO()):
+            manifest = build_manifest(str(self.workdir / 'typed'), self.workdir / 'manifest.json', workers=1)
+        self.assertTrue(manifest.is_unchanged(self.filename, portfolio_hash(FETCHED)))
+
+
+if __name__ == '__main__':
+    unittest.main()
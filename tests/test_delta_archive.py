@@ -0,0 +1,90 @@
+"""
+每月差異封存：刪除 Excel 前以歷史資料檔驗證，重建歷史資料檔與清單時讀取封存檔
+"""
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from data_manifest import build_manifest, portfolio_hash
+from delta_archive import DeltaArchive, pack_workbooks
+from excel_reader import rebuild_history
+from fetch_and_save import save_to_excel
+from history_store import HistoryStore
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+PORTFOLIO = json.loads((FIXTURES / 'ezmoney_49YTW_20251212.json').read_text(encoding='utf-8'))
+DATES = ['2025/11/03', '2025/11/04', '2025/11/05']
+
+
+def _portfolio(date, shift=0):
+    holdings = [dict(h, shares=h['shares'] + shift * i) for i, h in enumerate(PORTFOLIO['holdings'])]
+    # 網站公布的股票權重與持股權重加總（Excel 的 C10）不同
+    fund_info = dict(PORTFOLIO['fund_info'], stocks_weight='95.20%')
+    return dict(PORTFOLIO, date=date, holdings=holdings, fund_info=fund_info)
+
+
+class PackWorkbooksTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp(prefix='etf-test-'))
+        self.data_dir = self.workdir / 'data'
+        self.data_dir.mkdir()
+        self.archive = DeltaArchive(self.data_dir / 'archive')
+        self.store = HistoryStore(self.workdir / 'history.bin')
+        self.portfolios = [_portfolio(date, shift) for shift, date in enumerate(DATES)]
+        with redirect_stdout(io.StringIO()):
+            for portfolio_data in self.portfolios:
+                save_to_excel(portfolio_data, output_dir=str(self.data_dir))
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def _pack(self):
+        with redirect_stdout(io.StringIO()):
+            return pack_workbooks(str(self.data_dir), self.archive, before='202512', prune=True, workers=1,
+                                  store=self.store)
+
+    def _workbooks(self):
+        return sorted(p.name for p in self.data_dir.glob('*.xlsx'))
+
+    def test_prunes_workbooks_matching_history(self):
+        self.store.append_many(self.portfolios)
+
+        self.assertEqual(self._pack(), (3, 3))
+        self.assertEqual(self._workbooks(), [])
+        for portfolio_data in self.portfolios:
+            rebuilt = self.archive.reconstruct(portfolio_data['date'])
+            self.assertEqual(portfolio_hash(rebuilt), portfolio_hash(portfolio_data))
+
+    def test_keeps_workbook_missing_from_history(self):
+        self.store.append_many(self.portfolios[:2])
+
+        self.assertEqual(self._pack(), (3, 2))
+        self.assertEqual(self._workbooks(), ['ETF_Investment_Portfolio_20251105.xlsx'])
+
+    def test_keeps_workbook_differing_from_history(self):
+        self.store.append_many(self.portfolios[:1] + [_portfolio(DATES[1], 100)] + self.portfolios[2:])
+
+        self.assertEqual(self._pack(), (3, 2))
+        self.assertEqual(self._workbooks(), ['ETF_Investment_Portfolio_20251104.xlsx'])
+
+    def test_rebuild_history_and_manifest_read_archive(self):
+        self.store.append_many(self.portfolios)
+        self._pack()
+
+        with redirect_stdout(io.StringIO()):
+            count = rebuild_history(str(self.data_dir), self.workdir / 'rebuilt.bin', workers=1)
+            manifest = build_manifest(str(self.data_dir), self.workdir / 'manifest.json', workers=1)
+
+        self.assertEqual(count, 3)
+        rebuilt = HistoryStore(self.workdir / 'rebuilt.bin').load()
+        self.assertEqual([portfolio_hash(p) for p in rebuilt], [portfolio_hash(p) for p in self.portfolios])
+        self.assertEqual(manifest.dates(), DATES)
+
+
+if __name__ == '__main__':
+    unittest.main()
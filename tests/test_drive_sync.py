@@ -0,0 +1,52 @@
+"""
+Google Drive 同步：鏡像中的檔案何時需要重新下載
+"""
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from drive_sync import GoogleDriveSync
+
+NAME = 'ETF_Investment_Portfolio_20251212.xlsx'
+
+
+class IsCurrentTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mirror = Path(tempfile.mkdtemp(prefix='etf-test-'))
+        (self.mirror / NAME).write_bytes(b'xlsx')
+        self.sync = GoogleDriveSync(folder_url='https://drive.google.com/drive/folders/TEST',
+                                    mirror_dir=self.mirror, api_key='test')
+        self.addCleanup(self.sync.session.close)
+        self.state = {NAME: {'id': 'f1', 'modified': '2025-12-12T09:00:00Z', 'md5': 'aaa'}}
+
+    def tearDown(self):
+        shutil.rmtree(self.mirror)
+
+    def test_same_version_is_current(self):
+        remote = {'id': 'f1', 'modified': '2025-12-12T09:00:00Z', 'md5': 'aaa'}
+        self.assertTrue(self.sync._is_current(NAME, remote, self.state))
+
+    def test_in_place_update_keeps_id_but_is_stale(self):
+        # Drive 的 update() 不改變檔案 ID，只有檢查碼與修改時間不同
+        remote = {'id': 'f1', 'modified': '2025-12-13T09:00:00Z', 'md5': 'bbb'}
+        self.assertFalse(self.sync._is_current(NAME, remote, self.state))
+
+    def test_replaced_file_is_stale(self):
+        remote = {'id': 'f2', 'modified': '2025-12-12T09:00:00Z', 'md5': 'aaa'}
+        self.assertFalse(self.sync._is_current(NAME, remote, self.state))
+
+    def test_missing_mirror_file_is_stale(self):
+        (self.mirror / NAME).unlink()
+        remote = {'id': 'f1', 'modified': '2025-12-12T09:00:00Z', 'md5': 'aaa'}
+        self.assertFalse(self.sync._is_current(NAME, remote, self.state))
+
+    def test_without_api_key_only_id_is_compared(self):
+        # gdown 列出的項目沒有修改時間與檢查碼（模組說明中記載的限制）
+        remote = {'id': 'f1', 'modified': None, 'md5': None}
+        self.assertTrue(self.sync._is_current(NAME, remote, self.state))
+
+
+if __name__ == '__main__':
+    unittest.main()
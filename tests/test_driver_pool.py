@@ -0,0 +1,117 @@
+"""
+瀏覽器池：正常歸還的瀏覽器重複使用，借用期間發生例外的瀏覽器關閉後不再借出，
+快取的 chromedriver 無法啟動時重新安裝一次，關閉後不再借出已關閉的瀏覽器
+"""
+import io
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+import fetch_and_save
+from fetch_and_save import DriverPool
+
+
+class _Driver:
+    """不啟動 Chrome 的替身，只記錄是否已關閉"""
+
+    def __init__(self):
+        self.closed = False
+
+    def quit(self):
+        self.closed = True
+
+
+class DriverPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.created = []
+        self.paths = []
+        # 無法啟動的 chromedriver 路徑（例如版本與 Chrome 不符）
+        self.broken = set()
+
+        def create(driver_path=None, timer=None):
+            self.paths.append(driver_path)
+            if driver_path in self.broken:
+                raise RuntimeError('session not created')
+            driver = _Driver()
+            self.created.append(driver)
+            return driver
+
+        def resolve(timer=None, refresh=False):
+            return 'chromedriver-new' if refresh else 'chromedriver'
+
+        self.resolve = mock.patch.object(fetch_and_save, 'resolve_driver_path', side_effect=resolve).start()
+        mock.patch.object(fetch_and_save, 'create_chrome_driver', side_effect=create).start()
+        self.addCleanup(mock.patch.stopall)
+        self.pool = DriverPool(size=1)
+
+    def test_returned_driver_is_reused(self):
+        with self.pool.driver() as first:
+            pass
+        with self.pool.driver() as second:
+            pass
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(self.pool.stats()['recycled'], 0)
+
+    def test_driver_is_retired_after_error(self):
+        with redirect_stdout(io.StringIO()):
+            with self.assertRaises(RuntimeError):
+                with self.pool.driver() as broken:
+                    raise RuntimeError('頁面載入逾時')
+            with self.pool.driver() as replacement:
+                pass
+
+        self.assertTrue(broken.closed)
+        self.assertIsNot(replacement, broken)
+        self.assertFalse(replacement.closed)
+        self.assertEqual(len(self.created), 2)
+        stats = self.pool.stats()
+        self.assertEqual((stats['alive'], stats['recycled']), (1, 1))
+
+    def test_reinstalls_driver_that_fails_to_start(self):
+        self.broken.add('chromedriver')
+        with mock.patch.dict('os.environ', {}, clear=False) as environ, redirect_stdout(io.StringIO()):
+            environ.pop('CHROMEDRIVER_PATH', None)
+            with self.pool.driver() as driver:
+                pass
+
+        self.assertEqual(self.paths, ['chromedriver', 'chromedriver-new'])
+        self.assertEqual(self.resolve.call_args_list[-1].kwargs, {'refresh': True})
+        self.assertIs(driver, self.created[0])
+        # 之後新建的瀏覽器直接使用重新安裝的版本
+        self.assertEqual(self.pool._driver_path, 'chromedriver-new')
+
+    def test_closed_pool_hands_out_nothing(self):
+        with self.pool.driver() as driver:
+            pass
+        with redirect_stdout(io.StringIO()):
+            self.pool.close()
+
+        self.assertTrue(driver.closed)
+        with self.assertRaises(RuntimeError):
+            with self.pool.driver():
+                pass
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(self.pool.stats()['alive'], 0)
+
+    def test_driver_returned_after_close_is_not_reused(self):
+        with redirect_stdout(io.StringIO()):
+            with self.pool.driver() as driver:
+                self.pool.close()
+
+        self.assertTrue(driver.closed)
+        with self.assertRaises(RuntimeError):
+            with self.pool.driver():
+                pass
+        self.assertEqual(len(self.created), 1)
+
+    def test_rss_limit_requires_psutil(self):
+        with mock.patch.object(fetch_and_save, 'psutil', None):
+            with self.assertRaises(RuntimeError):
+                DriverPool(size=1, max_rss_mb=800)
+
+
+if __name__ == '__main__':
+    unittest.main()
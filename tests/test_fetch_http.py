@@ -0,0 +1,153 @@
+"""
+HTTP 擷取路徑：以本機伺服器回放頁面 HTML（tests/fixtures），不啟動瀏覽器、不連線到網站
+"""
+import io
+import json
+import threading
+import unittest
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlsplit, parse_qs
+
+import fetch_and_save
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+PAGE = (FIXTURES / 'ezmoney_49YTW_20251212.html').read_bytes()
+# 同一天由瀏覽器擷取後存下的 Excel 內容（DATA/ETF_Investment_Portfolio_20251212.xlsx），頁面解析結果必須與它相同
+EXPECTED = json.loads((FIXTURES / 'ezmoney_49YTW_20251212.json').read_text(encoding='utf-8'))
+# 同一頁面在瀏覽器中的文字（tests/fixtures 的 .txt）
+PAGE_TEXT = (FIXTURES / 'ezmoney_49YTW_20251212.txt').read_text(encoding='utf-8')
+# 持股表格由前端載入、伺服器 HTML 中沒有表格的頁面
+EMPTY_PAGE = '<html><body><p>資料日期：114/12/12</p><div id="portfolio"></div></body></html>'.encode('utf-8')
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        fund_code = parse_qs(url.query).get('fundCode', [''])[0]
+        if url.path != '/ETF/Fund/Info':
+            self.send_error(404)
+            return
+        body = PAGE if fund_code == '49YTW' else EMPTY_PAGE
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FetchHttpTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _PageHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def fetch(self, *args, **kwargs):
+        with redirect_stdout(io.StringIO()):
+            return fetch_and_save.fetch_etf_data(*args, base_url=self.base_url, **kwargs)
+
+    def test_http_engine_matches_saved_workbook(self):
+        data = self.fetch('49YTW', engine='http')
+        kind, html = data.pop('raw_page')
+        self.assertEqual(kind, 'html')
+        self.assertEqual(html.encode('utf-8'), PAGE)
+        self.assertEqual(data, EXPECTED)
+        self.assertEqual(len(data['holdings']), 50)
+
+    def test_auto_engine_does_not_start_browser(self):
+        with mock.patch.object(fetch_and_save, 'fetch_etf_data_selenium',
+                               side_effect=AssertionError('不應啟動瀏覽器')):
+            data = self.fetch('49YTW', engine='auto')
+        self.assertEqual(data['date'], '2025/12/12')
+
+    def test_page_without_table_falls_back_to_browser(self):
+        with mock.patch.object(fetch_and_save, 'fetch_etf_data_selenium', return_value={'date': 'browser'}) as browser:
+            data = self.fetch('61YTW', engine='auto')
+        self.assertEqual(data, {'date': 'browser'})
+        browser.assert_called_once()
+
+    def test_http_engine_raises_without_table(self):
+        with self.assertRaises(ValueError):
+            self.fetch('61YTW', engine='http')
+
+
+class PollOnceTest(unittest.TestCase):
+    """輪詢時 HTTP 檢查失敗（連線錯誤、逾時等），auto 模式改用瀏覽器檢查"""
+
+    def poll(self, engine, use_browser):
+        with redirect_stdout(io.StringIO()):
+            return fetch_and_save.poll_once('49YTW', '2025/12/11', engine, 'http://127.0.0.1:9', None, None, {},
+                                            use_browser)
+
+    def test_auto_switches_to_browser_when_probe_fails(self):
+        use_browser = set()
+        with mock.patch.object(fetch_and_save, 'probe_http', side_effect=ConnectionError('connection refused')), \
+                mock.patch.object(fetch_and_save, 'probe_selenium',
+                                  return_value=('2025/12/12', ('text', PAGE_TEXT))) as browser:
+            data = self.poll('auto', use_browser)
+            # 之後的檢查直接使用瀏覽器
+            self.poll('auto', use_browser)
+
+        self.assertEqual(use_browser, {'49YTW'})
+        self.assertEqual(browser.call_count, 2)
+        data.pop('raw_page')
+        self.assertEqual(data, EXPECTED)
+
+    def test_http_engine_raises_when_probe_fails(self):
+        use_browser = set()
+        with mock.patch.object(fetch_and_save, 'probe_http', side_effect=ConnectionError('connection refused')), \
+                mock.patch.object(fetch_and_save, 'probe_selenium', side_effect=AssertionError('不應啟動瀏覽器')):
+            with self.assertRaises(ConnectionError):
+                self.poll('http', use_browser)
+        self.assertEqual(use_browser, set())
+
+
+class PollFundsTest(unittest.TestCase):
+    """到期時仍未更新的基金：最後一次檢查失敗的回報例外，只是日期未前進的不算失敗"""
+
+    def poll(self, outcomes, rounds=2):
+        calls = {}
+
+        def poll_once(code, *args):
+            calls[code] = calls.get(code, 0) + 1
+            outcome = outcomes[code][calls[code] - 1]
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        # 第 rounds 次檢查後到期
+        clock = iter([0.0] * (rounds - 1) + [1.0] * 10)
+        with mock.patch.object(fetch_and_save, 'poll_once', side_effect=poll_once), \
+                mock.patch.object(fetch_and_save.time, 'time', side_effect=lambda: next(clock)), \
+                mock.patch.object(fetch_and_save.time, 'sleep'), \
+                redirect_stdout(io.StringIO()):
+            return fetch_and_save.poll_funds(list(outcomes), {}, engine='http', deadline=1.0)
+
+    def test_last_error_reported_for_pending_fund(self):
+        error = ConnectionError('connection refused')
+        results, pending, errors = self.poll({
+            '49YTW': [None, error],
+            '00981A': [error, None],
+            '00991A': [None, dict(EXPECTED)],
+        })
+
+        self.assertEqual(list(results), ['00991A'])
+        self.assertEqual(pending, ['49YTW', '00981A'])
+        # 00981A 第二次檢查成功、只是日期未前進
+        self.assertEqual(errors, {'49YTW': error})
+
+
+if __name__ == '__main__':
+    unittest.main()
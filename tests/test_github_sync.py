@@ -0,0 +1,142 @@
+"""
+GitHub 同步：以 benchmark.StandInServer 替身伺服器檢查條件列表、連線池下載與暫存檔取代
+"""
+import io
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from benchmark import StandInServer
+from delta_archive import DeltaArchive
+from fetch_and_save import save_to_excel
+from github_sync import GitHubSync
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+PORTFOLIO = json.loads((FIXTURES / 'ezmoney_49YTW_20251212.json').read_text(encoding='utf-8'))
+DATES = ['2025/12/10', '2025/12/11', '2025/12/12', '2025/12/15', '2025/12/16']
+
+
+class GitHubSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp(prefix='etf-test-'))
+        self.remote = self.workdir / 'remote'
+        self.local = self.workdir / 'local'
+        self.remote.mkdir()
+        with redirect_stdout(io.StringIO()):
+            self.names = sorted(
+                save_to_excel(dict(PORTFOLIO, date=date), output_dir=str(self.remote)) for date in DATES
+            )
+        self.server = StandInServer(self.remote).__enter__()
+
+    def tearDown(self):
+        self.server.__exit__(None, None, None)
+        shutil.rmtree(self.workdir)
+
+    def _sync(self, max_workers=2):
+        sync = GitHubSync(api_base=f"{self.server.base_url}/github", raw_base=f"{self.server.base_url}/raw",
+                          max_workers=max_workers, state_path=self.workdir / 'state.json')
+        self.addCleanup(sync.session.close)
+        return sync
+
+    def _requests(self, prefix):
+        return [(status, port) for path, status, port in self.server.requests if path.startswith(prefix)]
+
+    def test_second_listing_is_one_304(self):
+        with redirect_stdout(io.StringIO()):
+            first = self._sync().get_latest_files()
+            # 新的 GitHubSync（例如下一次執行程式）由狀態檔取得 ETag
+            second = self._sync().get_latest_files()
+
+        self.assertEqual([f['name'] for f in first], sorted(self.names, reverse=True))
+        self.assertEqual(second, first)
+        self.assertEqual([status for status, _ in self._requests('/github/')], [200, 304])
+
+    def test_listing_changes_after_new_file(self):
+        with redirect_stdout(io.StringIO()):
+            self._sync().get_latest_files()
+            save_to_excel(dict(PORTFOLIO, date='2025/12/17'), output_dir=str(self.remote))
+            files = self._sync().get_latest_files()
+
+        self.assertEqual(files[0]['name'], 'ETF_Investment_Portfolio_20251217.xlsx')
+        self.assertEqual([status for status, _ in self._requests('/github/')], [200, 200])
+
+    def test_archive_index_downloaded_only_when_changed(self):
+        archive = DeltaArchive(self.remote / 'archive')
+        archive.add_many([dict(PORTFOLIO, date=date) for date in ('2025/11/03', '2025/11/04')])
+        index_path = '/raw/DATA/archive/49YTW/index.json'
+
+        with redirect_stdout(io.StringIO()):
+            for _ in range(2):
+                sync = self._sync()
+                sync.get_latest_files()
+                archived = sync.list_archived_dates(save_dir=self.local)
+            self.assertEqual(sorted(archived), ['2025/11/03', '2025/11/04'])
+            self.assertEqual(len(self._requests(index_path)), 1)
+
+            archive.add(dict(PORTFOLIO, date='2025/11/05'))
+            sync = self._sync()
+            sync.get_latest_files()
+            archived = sync.list_archived_dates(save_dir=self.local)
+
+        self.assertEqual(archived['2025/11/05'], 'archive/49YTW/202511.json.' + archive.codec)
+        self.assertEqual(len(self._requests(index_path)), 2)
+        self.assertEqual([status for status, _ in self._requests('/github/')], [200, 304, 200])
+
+    def test_pooled_downloads(self):
+        sync = self._sync(max_workers=2)
+        with redirect_stdout(io.StringIO()):
+            results = sync.download_files(self.names, save_dir=self.local)
+
+        self.assertEqual(sorted(results), self.names)
+        for name in self.names:
+            self.assertEqual((self.local / name).read_bytes(), (self.remote / name).read_bytes())
+        downloads = self._requests('/raw/')
+        self.assertEqual(len(downloads), len(self.names))
+        # 五個檔案最多只開兩條連線
+        self.assertLessEqual(len({port for _, port in downloads}), 2)
+        self.assertEqual(list(self.local.glob('*.part')), [])
+
+    def test_download_replaces_existing_file(self):
+        name = self.names[0]
+        target = self.local / name
+        self.local.mkdir()
+        target.write_bytes(b'old')
+        target.with_name(name + '.part').write_bytes(b'stale')
+
+        with redirect_stdout(io.StringIO()):
+            path = self._sync().download_file(name, save_dir=self.local)
+
+        self.assertEqual(path, target)
+        self.assertEqual(target.read_bytes(), (self.remote / name).read_bytes())
+        self.assertFalse(target.with_name(name + '.part').exists())
+
+    def test_failed_download_keeps_existing_file(self):
+        name = 'ETF_Investment_Portfolio_20250101.xlsx'
+        target = self.local / name
+        self.local.mkdir()
+        target.write_bytes(b'old')
+
+        with redirect_stdout(io.StringIO()):
+            path = self._sync().download_file(name, save_dir=self.local)
+
+        self.assertIsNone(path)
+        self.assertEqual(target.read_bytes(), b'old')
+        self.assertFalse(target.with_name(name + '.part').exists())
+
+    def test_cancelled_download_writes_nothing(self):
+        cancel = threading.Event()
+        cancel.set()
+        with redirect_stdout(io.StringIO()):
+            path = self._sync().download_file(self.names[0], save_dir=self.local, cancel=cancel)
+
+        self.assertIsNone(path)
+        self.assertEqual(list(self.local.iterdir()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+歷史資料查詢服務：以暫存的歷史資料檔啟動 HistoryServer（port 0），檢查 ETag、304、gzip、LRU 快取與重新載入
+"""
+import gzip
+import http.client
+import io
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+import history_server
+from history_server import HistoryServer, HistoryService
+from history_store import HistoryStore
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+PORTFOLIO = json.loads((FIXTURES / 'ezmoney_49YTW_20251212.json').read_text(encoding='utf-8'))
+DATES = ['2025/12/10', '2025/12/11', '2025/12/12']
+
+
+class HistoryServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp(prefix='etf-test-'))
+        self.store = HistoryStore(self.workdir / 'history.bin')
+        self.store.append_many([dict(PORTFOLIO, date=date) for date in DATES])
+        self.service = HistoryService(self.workdir / 'history.bin', self.workdir / 'manifest.json', cache_size=2)
+        # 每個請求都檢查資料檔是否更新
+        patch = mock.patch.object(history_server, 'RELOAD_INTERVAL', 0)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.server = HistoryServer(self.service, port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.workdir)
+
+    def _get(self, path, etag=None, gzip_ok=False):
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if gzip_ok:
+            headers['Accept-Encoding'] = 'gzip'
+        connection = http.client.HTTPConnection('127.0.0.1', self.server.server_address[1], timeout=10)
+        try:
+            with redirect_stdout(io.StringIO()):
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+        finally:
+            connection.close()
+        if response.getheader('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        return response.status, response.getheader('ETag'), body
+
+    def test_matching_etag_returns_304(self):
+        status, etag, body = self._get('/portfolio?date=2025/12/11')
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)['date'], '2025/12/11')
+
+        status, again, body = self._get('/portfolio?date=2025-12-11', etag=etag)
+        self.assertEqual((status, again, body), (304, etag, b''))
+        # 其他日期的 ETag 不同
+        self.assertEqual(self._get('/portfolio?date=2025/12/10', etag=etag)[0], 200)
+
+    def test_gzip_and_identity_etags_differ(self):
+        status, plain, body = self._get('/range')
+        status_gz, compressed, body_gz = self._get('/range', gzip_ok=True)
+
+        self.assertEqual((status, status_gz), (200, 200))
+        self.assertEqual(compressed, plain[:-1] + '-gz"')
+        self.assertEqual(body_gz, body)
+        self.assertEqual(self._get('/range', etag=compressed, gzip_ok=True)[0], 304)
+        # 不接受 gzip 的用戶端不能以 gzip 版本的 ETag 取得 304
+        self.assertEqual(self._get('/range', etag=compressed)[0], 200)
+
+    def test_small_response_etag_matches_with_gzip(self):
+        # 小於 GZIP_MIN_SIZE 的回應不壓縮，接受 gzip 的用戶端收到的是未壓縮版本的 ETag
+        status, etag, body = self._get('/dates', gzip_ok=True)
+        self.assertLess(len(body), history_server.GZIP_MIN_SIZE)
+        self.assertFalse(etag.endswith('-gz"'))
+        self.assertEqual(self._get('/dates', etag=etag, gzip_ok=True)[0], 304)
+
+    def test_lru_evicts_oldest_response(self):
+        for date in DATES:
+            self._get(f'/portfolio?date={date}')
+        self.assertEqual(self.service.cache.stats(), {'entries': 2, 'hits': 0, 'misses': 3})
+
+        self._get(f'/portfolio?date={DATES[2]}')
+        self.assertEqual(self.service.cache.stats()['hits'], 1)
+        # 最早的回應已被淘汰，必須重新產生
+        self._get(f'/portfolio?date={DATES[0]}')
+        self.assertEqual(self.service.cache.stats(), {'entries': 2, 'hits': 1, 'misses': 4})
+
+    def test_etag_changes_after_history_changes(self):
+        _, etag, _ = self._get('/portfolio?date=2025/12/12')
+        _, other, _ = self._get('/portfolio?date=2025/12/11')
+
+        holdings = [dict(h, shares=h['shares'] + 1000) for h in PORTFOLIO['holdings']]
+        self.store.append(dict(PORTFOLIO, date='2025/12/12', holdings=holdings))
+
+        status, changed, body = self._get('/portfolio?date=2025/12/12', etag=etag)
+        self.assertEqual(status, 200)
+        self.assertNotEqual(changed, etag)
+        self.assertEqual(json.loads(body)['holdings'][0]['shares'], holdings[0]['shares'])
+        # 內容未變動的日期 ETag 不變
+        self.assertEqual(self._get('/portfolio?date=2025/12/11', etag=other)[0], 304)
+
+    def test_bad_requests(self):
+        self.assertEqual(self._get('/portfolio?date=2025/13')[0], 400)
+        self.assertEqual(self._get('/range?start=abc')[0], 400)
+        self.assertEqual(self._get('/portfolio?date=2025/12/13')[0], 404)
+        status, _, body = self._get('/dates?fund=XXXXX')
+        self.assertEqual(status, 404)
+        self.assertIn('XXXXX', json.loads(body)['error'])
+        self.assertEqual(self._get('/unknown')[0], 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+歷史資料檔：記錄表頭格式、附加、同一日期以最後一筆為準、日期區間讀取與基金代號長度檢查
+"""
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from history_store import HistoryStore, RECORD_HEADER, RECORD_MAGIC, RECORD_VERSION
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+PORTFOLIO = json.loads((FIXTURES / 'ezmoney_49YTW_20251212.json').read_text(encoding='utf-8'))
+DATES = ['2025/12/10', '2025/12/11', '2025/12/12']
+
+
+def _portfolio(date, shift=0):
+    holdings = [dict(h, shares=h['shares'] + shift) for h in PORTFOLIO['holdings']]
+    return dict(PORTFOLIO, date=date, holdings=holdings)
+
+
+def _headers(buffer):
+    """依序解出所有記錄表頭"""
+    headers = []
+    offset = 0
+    while offset < len(buffer):
+        header = RECORD_HEADER.unpack_from(buffer, offset)
+        headers.append(header)
+        offset += RECORD_HEADER.size + header[5]
+    return headers
+
+
+class HistoryStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp(prefix='etf-test-'))
+        self.store = HistoryStore(self.workdir / 'history.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def test_record_header(self):
+        self.store.append(_portfolio(DATES[0]))
+        self.store.append(_portfolio(DATES[1]), fund_code='00981A')
+
+        headers = _headers(self.store.path.read_bytes())
+        self.assertEqual([h[:5] for h in headers], [
+            (RECORD_MAGIC, RECORD_VERSION, 20251210, b'49YTW\x00\x00\x00', len(PORTFOLIO['holdings'])),
+            (RECORD_MAGIC, RECORD_VERSION, 20251211, b'00981A\x00\x00', len(PORTFOLIO['holdings'])),
+        ])
+        self.assertEqual(self.store.fund_codes(), ['00981A', '49YTW'])
+
+    def test_round_trip_with_resaved_date(self):
+        self.store.append_many([_portfolio(date) for date in DATES])
+        # 重新擷取 12/11：附加一筆新記錄，讀取時以最後一筆為準
+        self.store.append(_portfolio(DATES[1], shift=1000))
+
+        self.assertEqual(len(_headers(self.store.path.read_bytes())), 4)
+        self.assertEqual(self.store.dates(), DATES)
+        self.assertEqual(self.store.load(), [_portfolio(DATES[0]), _portfolio(DATES[1], shift=1000),
+                                             _portfolio(DATES[2])])
+
+    def test_load_date_range(self):
+        self.store.append_many([_portfolio(date) for date in DATES])
+        self.store.append_many([_portfolio(date) for date in DATES], fund_code='00981A')
+
+        self.assertEqual([p['date'] for p in self.store.load('2025/12/11')], DATES[1:])
+        self.assertEqual([p['date'] for p in self.store.load(end_date='2025/12/11')], DATES[:2])
+        self.assertEqual([p['date'] for p in self.store.load('2025/12/11', '2025/12/11', '00981A')], DATES[1:2])
+        self.assertEqual(self.store.load('2025/12/13'), [])
+        self.assertEqual(self.store.load(fund_code='00991A'), [])
+
+    def test_fund_code_must_fit_header(self):
+        self.store.append(_portfolio(DATES[0]), fund_code='12345678')
+        size = self.store.path.stat().st_size
+        for fund_code in ('123456789', '', '基金'):
+            with self.assertRaises(ValueError):
+                self.store.append_many([_portfolio(DATES[1]), _portfolio(DATES[2])], fund_code=fund_code)
+
+        # 失敗時什麼都沒有寫入
+        self.assertEqual(self.store.path.stat().st_size, size)
+        self.assertEqual(self.store.fund_codes(), ['12345678'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+"""
+指標快取：每日更新補上歷史資料檔中快取還沒有的日期，結果與從歷史資料檔重建相同
+"""
+import json
+import math
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from history_store import HistoryStore
+from metrics_cache import MetricsCache, FIELDS
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+PORTFOLIO = json.loads((FIXTURES / 'ezmoney_49YTW_20251212.json').read_text(encoding='utf-8'))
+DATES = ['2025/12/08', '2025/12/09', '2025/12/10', '2025/12/11', '2025/12/12']
+
+
+def _portfolio(date, shift):
+    holdings = [dict(h, weight=h['weight'] + (shift if i == 0 else -shift if i == 1 else 0))
+                for i, h in enumerate(PORTFOLIO['holdings'])]
+    return dict(PORTFOLIO, date=date, holdings=holdings)
+
+
+class MetricsUpdateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp(prefix='etf-test-'))
+        self.store = HistoryStore(self.workdir / 'history.bin')
+        self.cache = MetricsCache(self.workdir / 'metrics')
+        self.portfolios = [_portfolio(date, shift) for shift, date in enumerate(DATES)]
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def _save(self, portfolio_data):
+        self.store.append(portfolio_data)
+        self.cache.update(portfolio_data, store=self.store)
+
+    def _assert_matches_rebuild(self):
+        expected = MetricsCache(self.workdir / 'rebuilt')
+        expected.rebuild(self.store)
+        actual, wanted = self.cache.load(), expected.load()
+        self.assertEqual(actual['date'], wanted['date'])
+        for field in FIELDS:
+            for a, b in zip(actual[field], wanted[field]):
+                self.assertTrue(a == b or (math.isnan(a) and math.isnan(b)), (field, a, b))
+
+    def test_pulled_dates_filled_before_new_day(self):
+        self._save(self.portfolios[0])
+        # git pull 帶入 12/09、12/10，之後本機儲存 12/11
+        self.store.append_many(self.portfolios[1:3])
+        self._save(self.portfolios[3])
+
+        self.assertEqual(self.cache.load()['date'], DATES[:4])
+        # 12/11 的周轉率與 12/10 比較，不是與快取原本的最後一天 12/08
+        self.assertAlmostEqual(self.cache.get(DATES[3])['turnover'], 1.0)
+        self._assert_matches_rebuild()
+
+    def test_earlier_pulled_date_triggers_rebuild(self):
+        self._save(self.portfolios[0])
+        self._save(self.portfolios[2])
+        # git pull 帶入快取最後日期之前的 12/09
+        self.store.append(self.portfolios[1])
+        self._save(self.portfolios[3])
+
+        self.assertEqual(self.cache.load()['date'], DATES[:4])
+        self._assert_matches_rebuild()
+
+    def test_resaved_date_rebuilds(self):
+        for portfolio_data in self.portfolios:
+            self._save(portfolio_data)
+        self._save(_portfolio(DATES[1], 3))
+
+        self.assertAlmostEqual(self.cache.get(DATES[1])['turnover'], 3.0)
+        self._assert_matches_rebuild()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+跨 ETF 持股重疊：與逐檔股票計算的 Σ min、餘弦相似度、共同持股數比較，scipy.sparse 與 NumPy 密集矩陣兩種路徑都檢查
+"""
+import math
+import unittest
+from unittest import mock
+
+import overlap_index
+from overlap_index import OverlapIndex
+
+# 日期 → 基金 → {股票代號: 權重}；00991A 在 12/11 沒有資料，權重為 0 的持股也算共同持股
+PORTFOLIOS = {
+    '2025/12/10': {
+        '49YTW': {'2330': 30.0, '2317': 10.0, '2454': 5.0},
+        '00981A': {'2330': 20.0, '2454': 8.0, '3008': 4.0},
+        '00991A': {'2603': 6.0, '2317': 0.0},
+    },
+    '2025/12/11': {
+        '49YTW': {'2330': 28.0, '2317': 12.0},
+        '00981A': {'2317': 3.0, '3008': 7.0, '2330': 25.0},
+    },
+}
+
+
+def _brute_force(a, b):
+    """(Σ min, 餘弦相似度, 共同持股數)"""
+    shared = a.keys() & b.keys()
+    overlap = sum(min(a[code], b[code]) for code in shared)
+    dot = sum(a[code] * b[code] for code in shared)
+    norms = math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values()))
+    return overlap, dot / norms if norms else 0.0, len(shared)
+
+
+class OverlapIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = OverlapIndex()
+        for date, funds in PORTFOLIOS.items():
+            for fund_code, weights in funds.items():
+                holdings = [{'stock_code': code, 'weight': weight} for code, weight in weights.items()]
+                self.index.add({'date': date, 'holdings': holdings}, fund_code)
+
+    def _check(self):
+        for date, funds in PORTFOLIOS.items():
+            result = self.index.pairwise(date)
+            self.assertEqual(result['funds'], sorted(funds))
+            for i, fund_a in enumerate(result['funds']):
+                for j, fund_b in enumerate(result['funds']):
+                    overlap, cosine, common = _brute_force(funds[fund_a], funds[fund_b])
+                    self.assertAlmostEqual(result['overlap'][i, j], overlap)
+                    self.assertAlmostEqual(result['cosine'][i, j], cosine)
+                    self.assertEqual(result['common'][i, j], common)
+
+            pairs = self.index.pairs(date, min_common=0)
+            self.assertEqual(len(pairs), len(funds) * (len(funds) - 1) // 2)
+            for fund_a, fund_b, overlap, cosine, common in pairs:
+                expected = _brute_force(funds[fund_a], funds[fund_b])
+                self.assertAlmostEqual(overlap, expected[0])
+                self.assertAlmostEqual(cosine, expected[1])
+                self.assertEqual(common, expected[2])
+            self.assertEqual([p[2] for p in pairs], sorted((p[2] for p in pairs), reverse=True))
+
+        self.assertEqual(self.index.common_holdings('49YTW', '00981A', '2025/12/10'),
+                         [('2330', 30.0, 20.0), ('2454', 5.0, 8.0)])
+        self.assertEqual(self.index.common_holdings('49YTW', '00991A', '2025/12/11'), [])
+
+        history = self.index.pair_history('00981A', '49YTW')
+        self.assertEqual(history['date'], list(PORTFOLIOS))
+        for k, date in enumerate(history['date']):
+            overlap, cosine, common = _brute_force(PORTFOLIOS[date]['00981A'], PORTFOLIOS[date]['49YTW'])
+            self.assertAlmostEqual(history['overlap'][k], overlap)
+            self.assertAlmostEqual(history['cosine'][k], cosine)
+            self.assertEqual(history['common'][k], common)
+        self.assertEqual(self.index.pair_history('49YTW', '00991A')['date'], ['2025/12/10'])
+
+    @unittest.skipIf(overlap_index.sparse is None, '未安裝 scipy')
+    def test_sparse_matches_brute_force(self):
+        self._check()
+
+    def test_dense_matches_brute_force(self):
+        with mock.patch.object(overlap_index, 'sparse', None):
+            self._check()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+"""
+頁面快照重新解析：只有解析結果改變的日期重寫 Excel、歷史資料檔記錄與清單，其他日期完全不動
+"""
+import io
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from data_manifest import DataManifest
+from delta_archive import DeltaArchive
+from excel_reader import read_portfolio
+from fetch_and_save import save_portfolio
+from history_store import HistoryStore
+from metrics_cache import MetricsCache
+from page_archive import PageArchive, replay
+from portfolio_parser import parse_portfolio_text
+from stock_index import StockIndex
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+PAGE_TEXT = (FIXTURES / 'ezmoney_49YTW_20251212.txt').read_text(encoding='utf-8')
+PAGES = {
+    '2025/12/11': PAGE_TEXT.replace('資料日期：114/12/12', '資料日期：114/12/11'),
+    '2025/12/12': PAGE_TEXT,
+}
+
+
+class ReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp(prefix='etf-test-'))
+        self.data_dir = self.workdir / 'DATA'
+        self.data_dir.mkdir()
+        self.targets = dict(
+            store=HistoryStore(self.data_dir / 'portfolio_history.bin'),
+            manifest=DataManifest(self.data_dir / 'manifest.json'),
+            index=StockIndex(self.data_dir / 'stock_index'),
+            deltas=DeltaArchive(self.data_dir / 'archive'),
+            metrics=MetricsCache(self.data_dir / 'metrics'),
+        )
+        self.archive = PageArchive(self.data_dir / 'pages')
+        self.filenames = {}
+        with redirect_stdout(io.StringIO()):
+            for date, text in PAGES.items():
+                data = dict(parse_portfolio_text(text, verbose=False), raw_page=('text', text))
+                self.filenames[date] = save_portfolio(data, archive=self.archive, output_dir=str(self.data_dir),
+                                                      **self.targets)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def _replay(self):
+        # 重新讀取清單，與另一次執行 page_archive.py replay 相同
+        targets = dict(self.targets, manifest=DataManifest(self.data_dir / 'manifest.json'))
+        with redirect_stdout(io.StringIO()):
+            return replay(workers=1, archive=self.archive, output_dir=str(self.data_dir), **targets)
+
+    def _snapshot(self):
+        store = self.targets['store']
+        return {
+            'excel': {date: (self.data_dir / name).read_bytes() for date, name in self.filenames.items()},
+            'records': store.path.read_bytes(),
+            'manifest': DataManifest(self.data_dir / 'manifest.json').entries,
+        }
+
+    def test_only_changed_date_is_rewritten(self):
+        before = self._snapshot()
+        self.assertEqual(self._replay(), (0, 2, 0))
+        self.assertEqual(self._snapshot(), before)
+
+        # 12/11 的頁面換成台積電股數不同的版本（等同解析規則改變了這一天的結果）
+        changed = PAGES['2025/12/11'].replace('2330 台積電 2,635,000', '2330 台積電 2,636,000')
+        self.archive.save('49YTW', '2025/12/11', 'text', changed)
+        self.assertEqual(self._replay(), (1, 1, 0))
+        after = self._snapshot()
+
+        name = self.filenames['2025/12/11']
+        self.assertEqual(after['excel']['2025/12/12'], before['excel']['2025/12/12'])
+        self.assertNotEqual(after['excel']['2025/12/11'], before['excel']['2025/12/11'])
+        self.assertEqual(read_portfolio(self.data_dir / name)['holdings'][0]['shares'], 2636000)
+
+        # 歷史資料檔只附加 12/11 的一筆新記錄
+        self.assertTrue(after['records'].startswith(before['records']))
+        store = HistoryStore(self.targets['store'].path)
+        self.assertEqual(store.dates(), list(PAGES))
+        self.assertEqual(store.load('2025/12/11', '2025/12/11')[0]['holdings'][0]['shares'], 2636000)
+        self.assertEqual(store.load('2025/12/12')[0]['holdings'][0]['shares'], 2635000)
+        appended = HistoryStore(self.workdir / 'appended.bin')
+        appended.path.write_bytes(after['records'][len(before['records']):])
+        self.assertEqual(appended.dates(), ['2025/12/11'])
+
+        self.assertEqual(after['manifest'][self.filenames['2025/12/12']],
+                         before['manifest'][self.filenames['2025/12/12']])
+        self.assertNotEqual(after['manifest'][name]['hash'], before['manifest'][name]['hash'])
+        self.assertEqual(self.targets['index'].series('2330')['shares'].tolist(), [2636000, 2635000])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+瀏覽器載入基金頁面：「基金投資組合」分頁無法點擊（被遮住、元素失效）時不中斷，仍等待持股表格出現
+"""
+import io
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from selenium.common.exceptions import ElementClickInterceptedException
+from selenium.webdriver.common.by import By
+
+from fetch_and_save import load_portfolio_page
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+PAGE_TEXT = (FIXTURES / 'ezmoney_49YTW_20251212.txt').read_text(encoding='utf-8')
+
+
+class _Element:
+    def __init__(self, driver):
+        self.driver = driver
+        self.text = ''
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def click(self):
+        self.driver.clicks += 1
+        raise ElementClickInterceptedException('element click intercepted')
+
+
+class _Driver:
+    """不啟動 Chrome 的替身：第一次讀取頁面時持股表格尚未出現"""
+
+    def __init__(self):
+        self.reads = 0
+        self.clicks = 0
+
+    def get(self, url):
+        self.url = url
+
+    def find_element(self, by, value):
+        element = _Element(self)
+        if by == By.TAG_NAME:
+            self.reads += 1
+            element.text = PAGE_TEXT if self.reads > 1 else '載入中'
+        return element
+
+
+class LoadPortfolioPageTest(unittest.TestCase):
+
+    def test_intercepted_tab_click_still_waits_for_table(self):
+        driver = _Driver()
+        out = io.StringIO()
+        with redirect_stdout(out):
+            page_text = load_portfolio_page(driver, 'https://example.com/fund')
+
+        self.assertEqual(driver.clicks, 1)
+        self.assertEqual(page_text, PAGE_TEXT)
+        self.assertIn('ElementClickInterceptedException', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
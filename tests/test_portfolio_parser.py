@@ -0,0 +1,67 @@
+"""
+頁面解析：新版單次掃描解析器與原本的多次掃描解析方式（tests/legacy_parser.py）結果必須相同，
+包含欄位值與標籤分在多行、優先樣式找不到而改用備用樣式的頁面
+"""
+import json
+import re
+import unittest
+from pathlib import Path
+
+from portfolio_parser import parse_portfolio_text
+from tests.legacy_parser import legacy_parse, synthetic_page_text
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+PAGE_TEXT = (FIXTURES / 'ezmoney_49YTW_20251212.txt').read_text(encoding='utf-8')
+EXPECTED = json.loads((FIXTURES / 'ezmoney_49YTW_20251212.json').read_text(encoding='utf-8'))
+
+
+def split_cells(text):
+    """持股表格之前的金額與權重儲存格各自一行（表頭之後維持原樣）"""
+    head, sep, tail = text.partition('股票代號')
+    head = re.sub(r' (?=NTD|-?[\d.]+%)|(?<=單位數) ', '\n', head)
+    return head + sep + tail
+
+
+def insert_notes(text, labels, count=6):
+    """在標籤與欄位值之間插入多行說明文字，超出優先樣式可跨越的行數"""
+    notes = '\n'.join(['（單位：新台幣元）'] * count)
+    for label in labels:
+        text = text.replace(f"\n{label} ", f"\n{label}\n{notes}\n", 1)
+    return text
+
+
+class ParserEquivalenceTest(unittest.TestCase):
+
+    def assert_same_as_legacy(self, text):
+        self.assertEqual(parse_portfolio_text(text, verbose=False), legacy_parse(text))
+
+    def test_saved_page(self):
+        self.assertEqual(parse_portfolio_text(PAGE_TEXT, verbose=False), EXPECTED)
+        self.assert_same_as_legacy(PAGE_TEXT)
+
+    def test_cells_on_separate_lines(self):
+        text = split_cells(PAGE_TEXT)
+        self.assert_same_as_legacy(text)
+        fund_info = parse_portfolio_text(text, verbose=False)['fund_info']
+        for key in ('net_asset', 'outstanding_units', 'nav', 'cash', 'cash_weight', 'stocks_weight'):
+            self.assertEqual(fund_info[key], EXPECTED['fund_info'][key])
+
+    def test_values_beyond_lookahead(self):
+        text = insert_notes(PAGE_TEXT, ['淨資產', '流通在外單位數', '每單位淨值', '現金', '應收付證券款'])
+        self.assert_same_as_legacy(text)
+        # 備用樣式仍能跨行找到淨資產等欄位
+        self.assertEqual(parse_portfolio_text(text, verbose=False)['fund_info']['net_asset'],
+                         EXPECTED['fund_info']['net_asset'])
+
+    def test_synthetic_pages(self):
+        for n in (0, 50, 500):
+            with self.subTest(holdings=n):
+                self.assert_same_as_legacy(synthetic_page_text(n, seed=n))
+
+    def test_missing_date(self):
+        with self.assertRaises(ValueError):
+            parse_portfolio_text(PAGE_TEXT.replace('資料日期', '日期'), verbose=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
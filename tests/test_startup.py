@@ -0,0 +1,21 @@
+"""
+etf_cli.py 各子指令的啟動預算（python -X importtime）：不可超出 benchmark.STARTUP_BUDGETS，
+也不可載入 selenium、openpyxl、requests 等只在實際擷取、同步時才需要的套件
+"""
+import io
+import unittest
+from contextlib import redirect_stdout
+
+import benchmark
+
+
+class StartupBudgetTest(unittest.TestCase):
+
+    def test_commands_within_budget(self):
+        with redirect_stdout(io.StringIO()) as output:
+            failures = benchmark.bench_startup(repeat=3)
+        self.assertEqual(failures, [], output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
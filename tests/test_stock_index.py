@@ -0,0 +1,80 @@
+"""
+個股索引：歷史資料檔多出索引最後日期之後的日期（例如 git pull 之後）時，儲存與查詢都會補上，不留下缺口
+"""
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout, redirect_stderr
+from pathlib import Path
+
+import etf_cli
+from history_store import HistoryStore
+from stock_index import StockIndex
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+PORTFOLIO = json.loads((FIXTURES / 'ezmoney_49YTW_20251212.json').read_text(encoding='utf-8'))
+DATES = ['2025/12/10', '2025/12/11', '2025/12/12', '2025/12/15']
+STOCK = PORTFOLIO['holdings'][0]['stock_code']
+
+
+def _portfolio(date, shares):
+    holdings = [dict(h, shares=float(shares)) if h['stock_code'] == STOCK else h for h in PORTFOLIO['holdings']]
+    return dict(PORTFOLIO, date=date, holdings=holdings)
+
+
+class StockIndexSyncTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp(prefix='etf-test-'))
+        self.store = HistoryStore(self.workdir / 'history.bin')
+        self.index = StockIndex(self.workdir / 'stock_index')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def _series(self):
+        series = self.index.series(STOCK)
+        return dict(zip(series['date'], series['shares']))
+
+    def test_update_fills_pulled_dates(self):
+        self.store.append(_portfolio(DATES[0], 1000))
+        self.index.update(_portfolio(DATES[0], 1000), store=self.store)
+        # git pull 帶入 12/11、12/12，之後本機儲存 12/15
+        self.store.append_many([_portfolio(DATES[1], 2000), _portfolio(DATES[2], 3000)])
+        self.store.append(_portfolio(DATES[3], 4000))
+        self.index.update(_portfolio(DATES[3], 4000), store=self.store)
+
+        self.assertEqual(self._series(), dict(zip(DATES, [1000, 2000, 3000, 4000])))
+        self.assertEqual(self.index.last_date(), DATES[3])
+
+    def test_update_rebuilds_resaved_date(self):
+        self.store.append_many([_portfolio(date, 1000) for date in DATES[:2]])
+        self.index.rebuild(self.store)
+        self.store.append(_portfolio(DATES[0], 5000))
+        self.index.update(_portfolio(DATES[0], 5000), store=self.store)
+
+        self.assertEqual(self._series(), {DATES[0]: 5000, DATES[1]: 1000})
+
+    def test_sync_is_noop_when_current(self):
+        self.store.append_many([_portfolio(date, 1000) for date in DATES])
+        self.assertEqual(self.index.sync(self.store), len(DATES))
+        self.assertEqual(self.index.sync(self.store), 0)
+
+    def test_query_catches_up_with_history(self):
+        self.store.append(_portfolio(DATES[0], 1000))
+        self.index.rebuild(self.store)
+        self.store.append_many([_portfolio(date, 2000) for date in DATES[1:]])
+
+        out = io.StringIO()
+        with redirect_stdout(out), redirect_stderr(io.StringIO()):
+            code = etf_cli.main(['query', 'stock', STOCK, '--json', '--path', str(self.store.path),
+                                 '--index-dir', str(self.index.root)])
+
+        self.assertEqual(code, 0)
+        self.assertEqual(json.loads(out.getvalue())['date'], DATES)
+
+
+if __name__ == '__main__':
+    unittest.main()
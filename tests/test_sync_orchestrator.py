@@ -0,0 +1,84 @@
+"""
+同步協調：兩個延遲不同的本機目錄來源同時下載，先完成者勝出，最後只匯入一次
+"""
+import io
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+import sync_orchestrator
+from sync_orchestrator import SyncOrchestrator, DirectorySource
+
+
+class _Manager:
+    def __init__(self, dates):
+        self.dates = dates
+
+    def get_all_dates(self):
+        return list(self.dates)
+
+
+def _touch(directory, *dates):
+    directory.mkdir(parents=True, exist_ok=True)
+    for date in dates:
+        (directory / f"ETF_Investment_Portfolio_{date.replace('/', '')}.xlsx").write_bytes(date.encode('ascii'))
+
+
+class RaceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = Path(tempfile.mkdtemp(prefix='etf-test-'))
+        # 兩邊都有 12/10（已匯入）、12/11、12/12；只有慢的來源有 12/09
+        _touch(self.workdir / 'fast', '2025/12/10', '2025/12/11', '2025/12/12')
+        _touch(self.workdir / 'slow', '2025/12/09', '2025/12/10', '2025/12/11', '2025/12/12')
+        # 快的來源也稍有延遲，確保兩邊的列表都已回應後才有檔案完成
+        self.fast = DirectorySource(self.workdir / 'fast', name='fast', delay=0.2)
+        self.slow = DirectorySource(self.workdir / 'slow', name='slow', delay=1.0)
+        self.data_dir = self.workdir / 'data'
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def test_fastest_source_wins_and_import_runs_once(self):
+        # 每個來源一次只傳輸一個檔案：慢的來源先傳 12/09，12/11、12/12 尚未開始就被快的來源取代
+        orchestrator = SyncOrchestrator([self.slow, self.fast], manager=_Manager(['2025/12/10']),
+                                        data_dir=self.data_dir, max_workers=1)
+        with mock.patch.object(sync_orchestrator, 'import_files', return_value=(3, 0, 0)) as import_files, \
+                redirect_stdout(io.StringIO()):
+            won, stats = orchestrator.collect(['2025/12/10'])
+            imported = orchestrator.sync_to_database()
+
+        self.assertEqual({date: name for date, (name, _) in won.items()},
+                         {'2025/12/09': 'slow', '2025/12/11': 'fast', '2025/12/12': 'fast'})
+        self.assertEqual(stats['won'], {'slow': 1, 'fast': 2})
+        self.assertEqual((stats['cancelled'], stats['aborted'], stats['failed']), (2, 0, 0))
+        self.assertEqual(stats['listed'], {'slow': 4, 'fast': 3})
+
+        self.assertTrue(imported)
+        import_files.assert_called_once()
+        manager, paths, existing = import_files.call_args.args
+        self.assertEqual([p.name for p in paths], [
+            'ETF_Investment_Portfolio_20251209.xlsx',
+            'ETF_Investment_Portfolio_20251211.xlsx',
+            'ETF_Investment_Portfolio_20251212.xlsx',
+        ])
+        self.assertTrue(all(p.parent == self.data_dir for p in paths))
+        self.assertEqual(existing, {'2025/12/10'})
+
+    def test_in_flight_transfer_is_aborted(self):
+        # 慢的來源可以同時傳輸全部檔案：12/11、12/12 已開始，快的來源完成時中止
+        orchestrator = SyncOrchestrator([self.slow, self.fast], manager=_Manager([]), data_dir=self.data_dir,
+                                        max_workers=4)
+        with redirect_stdout(io.StringIO()):
+            won, stats = orchestrator.collect(['2025/12/10'])
+
+        self.assertEqual(sorted(won), ['2025/12/09', '2025/12/11', '2025/12/12'])
+        self.assertEqual(stats['won'], {'slow': 1, 'fast': 2})
+        self.assertEqual((stats['cancelled'], stats['aborted']), (0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+"""
+上傳到 Google Drive：以本機 Drive v3 替身伺服器檢查未變動檔案略過、更新既有檔案與可續傳上傳
+
+googleapiclient 的上傳網址固定使用 https，替身伺服器以測試時產生的自簽憑證提供 TLS（需要 openssl）
+"""
+import io
+import json
+import hashlib
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import unittest
+import uuid
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+from drive_sync import file_md5
+from upload_to_drive import upload_files
+
+FOLDER_ID = 'FOLDER'
+
+
+class _DriveHandler(BaseHTTPRequestHandler):
+    """
+    Drive v3 的本機替身：
+        GET   /drive/v3/files                         列出資料夾（id、name、md5Checksum）
+        POST  /upload/drive/v3/files?uploadType=resumable          開始上傳新檔案
+        PATCH /upload/drive/v3/files/<id>?uploadType=resumable     開始更新既有檔案
+        PUT   /upload/session/<id>                     上傳內容（Content-Range）
+    server.interrupt 為 True 時，每個上傳的第一次 PUT 只接收一半內容並回應 308，模擬中斷後續傳
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', headers=None):
+        self.server.requests.append((self.command, urlsplit(self.path).path, status))
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data):
+        self._send(200, json.dumps(data).encode('utf-8'), {'Content-Type': 'application/json'})
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def do_GET(self):
+        if urlsplit(self.path).path != '/drive/v3/files':
+            self._send(404)
+            return
+        files = [
+            {'id': file_id, 'name': f['name'], 'md5Checksum': f['md5']}
+            for file_id, f in self.server.files.items() if FOLDER_ID in f['parents']
+        ]
+        self._send_json({'files': files})
+
+    def _start_session(self, file_id, metadata):
+        session_id = uuid.uuid4().hex
+        self.server.sessions[session_id] = {'file_id': file_id, 'metadata': metadata, 'data': b'', 'puts': 0}
+        self._send(200, headers={'Location': f"https://{self.headers['Host']}/upload/session/{session_id}"})
+
+    def do_POST(self):
+        if urlsplit(self.path).path != '/upload/drive/v3/files':
+            self._send(404)
+            return
+        self._start_session(None, json.loads(self._body() or b'{}'))
+
+    def do_PATCH(self):
+        path = urlsplit(self.path).path
+        file_id = path.rsplit('/', 1)[-1]
+        self._body()
+        if not path.startswith('/upload/drive/v3/files/') or file_id not in self.server.files:
+            self._send(404)
+            return
+        self._start_session(file_id, {})
+
+    def do_PUT(self):
+        session = self.server.sessions.get(urlsplit(self.path).path.rsplit('/', 1)[-1])
+        body = self._body()
+        if session is None:
+            self._send(404)
+            return
+        # Content-Range: bytes <起>-<迄>/<總長度>
+        span, total = self.headers['Content-Range'].split(' ', 1)[1].split('/')
+        start = int(span.split('-')[0])
+        data = session['data'][:start] + body
+        session['puts'] += 1
+        if self.server.interrupt and session['puts'] == 1:
+            session['data'] = data[:len(data) // 2]
+            self._send(308, headers={'Range': f"bytes=0-{len(session['data']) - 1}"})
+            return
+        session['data'] = data
+        if len(data) < int(total):
+            self._send(308, headers={'Range': f"bytes=0-{len(data) - 1}"})
+            return
+
+        file_id = session['file_id'] or uuid.uuid4().hex
+        entry = self.server.files.setdefault(file_id, {'name': session['metadata'].get('name'),
+                                                       'parents': session['metadata'].get('parents', [])})
+        entry.update(content=data, md5=hashlib.md5(data).hexdigest())
+        self._send_json({'id': file_id, 'name': entry['name']})
+
+
+@unittest.skipUnless(shutil.which('openssl'), '需要 openssl 產生測試憑證')
+class UploadFilesTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.certdir = Path(tempfile.mkdtemp(prefix='etf-test-cert-'))
+        cls.cert = cls.certdir / 'cert.pem'
+        key = cls.certdir / 'key.pem'
+        subprocess.run(
+            ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+             '-keyout', str(key), '-out', str(cls.cert),
+             '-subj', '/CN=127.0.0.1', '-addext', 'subjectAltName=IP:127.0.0.1'],
+            check=True, capture_output=True,
+        )
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _DriveHandler)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cls.cert, key)
+        cls.server.socket = context.wrap_socket(cls.server.socket, server_side=True)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.endpoint = f"https://127.0.0.1:{cls.server.server_address[1]}/drive/v3/"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.certdir)
+
+    def setUp(self):
+        self.server.files = {}
+        self.server.sessions = {}
+        self.server.requests = []
+        self.server.interrupt = False
+        self.workdir = Path(tempfile.mkdtemp(prefix='etf-test-'))
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def _make_service(self):
+        import httplib2
+        from googleapiclient.discovery import build
+        http = httplib2.Http(ca_certs=str(self.cert))
+        # 與 googleapiclient.http.build_http 相同：308 是續傳進度，不是轉址
+        http.redirect_codes = http.redirect_codes - {308}
+        self.addCleanup(http.close)
+        return build('drive', 'v3', http=http, client_options={'api_endpoint': self.endpoint}, cache_discovery=False)
+
+    def _local(self, name, content):
+        path = self.workdir / name
+        path.write_bytes(content)
+        return str(path)
+
+    def _remote(self, file_id, name, content):
+        self.server.files[file_id] = {'name': name, 'parents': [FOLDER_ID], 'content': content,
+                                      'md5': hashlib.md5(content).hexdigest()}
+
+    def _upload(self, filepaths):
+        with redirect_stdout(io.StringIO()):
+            return upload_files(self._make_service, FOLDER_ID, filepaths, workers=2)
+
+    def test_unchanged_skipped_changed_updated_new_created(self):
+        same = self._local('ETF_Investment_Portfolio_20251210.xlsx', b'same' * 100)
+        changed = self._local('ETF_Investment_Portfolio_20251211.xlsx', b'new' * 100)
+        new = self._local('ETF_Investment_Portfolio_20251212.xlsx', b'added' * 100)
+        self._remote('f-same', Path(same).name, b'same' * 100)
+        self._remote('f-changed', Path(changed).name, b'old' * 100)
+
+        self.assertEqual(self._upload([same, changed, new]), (2, 1, 0))
+
+        by_name = {f['name']: (file_id, f) for file_id, f in self.server.files.items()}
+        self.assertEqual(len(by_name), 3)
+        # 內容已變動的檔案原地更新，檔案 ID 不變
+        self.assertEqual(by_name[Path(changed).name][0], 'f-changed')
+        self.assertEqual(by_name[Path(changed).name][1]['content'], b'new' * 100)
+        self.assertEqual(by_name[Path(new).name][1]['content'], b'added' * 100)
+        self.assertEqual(by_name[Path(new).name][1]['md5'], file_md5(new))
+        # 未變動的檔案沒有開始任何上傳
+        self.assertEqual(sorted(method for method, path, _ in self.server.requests if path.startswith('/upload/drive/')),
+                         ['PATCH', 'POST'])
+
+    def test_interrupted_upload_resumes(self):
+        self.server.interrupt = True
+        filepath = self._local('ETF_Investment_Portfolio_20251212.xlsx', bytes(range(256)) * 40)
+
+        self.assertEqual(self._upload([filepath]), (1, 0, 0))
+
+        (entry,) = self.server.files.values()
+        self.assertEqual(entry['content'], Path(filepath).read_bytes())
+        puts = [status for method, _, status in self.server.requests if method == 'PUT']
+        self.assertEqual(puts, [308, 200])
+
+
+if __name__ == '__main__':
+    unittest.main()
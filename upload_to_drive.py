@@ -1,14 +1,127 @@
 """
 Upload Excel file to Google Drive
 使用服務帳號憑證上傳檔案
+
+目標資料夾只列出一次（分頁），與本地檔案的 MD5 相同者略過，
+其餘檔案以多執行緒同時進行可續傳上傳
 """
 import os
-import json
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
-from google.oauth2 import service_account
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import glob
 
+from drive_sync import file_md5
+
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+UPLOAD_WORKERS = 4
+
+
+def build_service(credentials, api_endpoint=None):
+    """
+    建立 Drive API client
+    
+    api_endpoint 可指向本機的 Drive v3 測試伺服器（例如 https://127.0.0.1:8443/drive/v3/；
+    googleapiclient 的上傳網址固定使用 https，測試伺服器需支援 TLS）
+    """
+    from googleapiclient.discovery import build
+    client_options = {'api_endpoint': api_endpoint} if api_endpoint else None
+    return build('drive', 'v3', credentials=credentials, client_options=client_options, cache_discovery=False)
+
+
+def list_folder(service, folder_id):
+    """列出資料夾中的所有檔案，回傳 {檔名: (檔案 ID, md5Checksum)}"""
+    files = {}
+    page_token = None
+    while True:
+        results = service.files().list(
+            q=f"'{folder_id}' in parents and trashed=false",
+            fields="nextPageToken, files(id, name, md5Checksum)",
+            pageSize=1000,
+            pageToken=page_token,
+        ).execute()
+        for item in results.get('files', []):
+            # 同名檔案只保留第一個，與原本 name 查詢取 files[0] 的行為一致
+            files.setdefault(item['name'], (item['id'], item.get('md5Checksum')))
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            return files
+
+
+def upload_file(service, filepath, folder_id, file_id=None):
+    """以可續傳方式上傳單一檔案；有 file_id 時更新既有檔案"""
+    from googleapiclient.http import MediaFileUpload
+    media = MediaFileUpload(filepath, mimetype=XLSX_MIMETYPE, resumable=True)
+    if file_id:
+        request = service.files().update(fileId=file_id, media_body=media, fields='id, name')
+    else:
+        file_metadata = {
+            'name': os.path.basename(filepath),
+            'parents': [folder_id]
+        }
+        request = service.files().create(body=file_metadata, media_body=media, fields='id, name')
+    
+    response = None
+    while response is None:
+        _, response = request.next_chunk()
+    return response
+
+
+def upload_files(make_service, folder_id, filepaths, workers=UPLOAD_WORKERS):
+    """
+    上傳多個檔案到資料夾，內容未變動的檔案不重新上傳
+    
+    Args:
+        make_service: 建立 Drive API client 的函式（每個執行緒各自建立，client 不可跨執行緒共用）
+        folder_id: 目標資料夾 ID
+        filepaths: 本地檔案路徑列表
+        workers: 同時上傳的檔案數
+    
+    Returns:
+        (上傳的檔案數, 略過的檔案數, 失敗的檔案數)
+    """
+    service = make_service()
+    remote = list_folder(service, folder_id)
+    print(f"雲端資料夾中已有 {len(remote)} 個檔案")
+    
+    pending = []
+    skipped = 0
+    for filepath in filepaths:
+        filename = os.path.basename(filepath)
+        file_id, md5 = remote.get(filename, (None, None))
+        if md5 and md5 == file_md5(filepath):
+            print(f"⏭️  內容未變動，略過: {filename}")
+            skipped += 1
+            continue
+        pending.append((filepath, file_id))
+    
+    if not pending:
+        return 0, skipped, 0
+    
+    local = threading.local()
+    
+    def upload(filepath, file_id):
+        if not hasattr(local, 'service'):
+            local.service = make_service()
+        return upload_file(local.service, filepath, folder_id, file_id)
+    
+    uploaded = 0
+    failed = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending)))) as executor:
+        futures = {executor.submit(upload, fp, fid): (fp, fid) for fp, fid in pending}
+        for future in as_completed(futures):
+            filepath, file_id = futures[future]
+            filename = os.path.basename(filepath)
+            try:
+                result = future.result()
+                action = '更新' if file_id else '上傳'
+                print(f"  ✅ {action}成功: {filename} (ID: {result.get('id')})")
+                uploaded += 1
+            except Exception as e:
+                print(f"  ❌ 上傳失敗 {filename}: {e}")
+                failed += 1
+    return uploaded, skipped, failed
+
 
 def upload_to_drive():
     """上傳 Excel 檔案到 Google Drive"""
@@ -36,6 +149,7 @@ def upload_to_drive():
     
     # 建立憑證
     try:
+        from google.oauth2 import service_account
         credentials = service_account.Credentials.from_service_account_file(
             creds_file,
             scopes=['https://www.googleapis.com/auth/drive']  # 完整 Drive 權限
@@ -47,65 +161,36 @@ def upload_to_drive():
             os.remove(creds_file)
         exit(1)
     
-    # 建立 Drive API client
-    service = build('drive', 'v3', credentials=credentials)
-    
     # 找到所有 Excel 檔案
-    excel_files = glob.glob('ETF_Investment_Portfolio_*.xlsx')
+    excel_files = sorted(glob.glob('ETF_Investment_Portfolio_*.xlsx'))
     
     if not excel_files:
         print("⚠️  找不到要上傳的 Excel 檔案")
         exit(0)
     
-    print(f"找到 {len(excel_files)} 個檔案要上傳")
+    print(f"找到 {len(excel_files)} 個檔案")
     
-    for filepath in excel_files:
-        filename = os.path.basename(filepath)
-        print(f"\n上傳: {filename}")
-        
-        # 檢查檔案是否已存在
-        query = f"name='{filename}' and '{folder_id}' in parents and trashed=false"
-        results = service.files().list(q=query, fields="files(id, name)").execute()
-        existing_files = results.get('files', [])
-        
-        if existing_files:
-            # 更新現有檔案
-            file_id = existing_files[0]['id']
-            print(f"  檔案已存在，更新中... (ID: {file_id})")
-            
-            media = MediaFileUpload(filepath, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            updated_file = service.files().update(
-                fileId=file_id,
-                media_body=media
-            ).execute()
-            
-            print(f"  ✅ 更新成功！")
-        else:
-            # 上傳新檔案
-            print(f"  上傳新檔案...")
-            
-            file_metadata = {
-                'name': filename,
-                'parents': [folder_id]
-            }
-            
-            media = MediaFileUpload(filepath, mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-            uploaded_file = service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id, name'
-            ).execute()
-            
-            print(f"  ✅ 上傳成功！File ID: {uploaded_file.get('id')}")
-    
-    print(f"\n🎉 所有檔案上傳完成！")
+    # 建立 Drive API client（DRIVE_API_ENDPOINT 可指向本機測試伺服器）
+    api_endpoint = os.environ.get('DRIVE_API_ENDPOINT')
+    uploaded, skipped, failed = upload_files(
+        lambda: build_service(credentials, api_endpoint),
+        folder_id,
+        excel_files,
+    )
+    
+    if failed:
+        print(f"\n⚠️  上傳完成：{uploaded} 個成功、{skipped} 個未變動、{failed} 個失敗")
+    else:
+        print(f"\n🎉 所有檔案上傳完成！（上傳 {uploaded} 個，{skipped} 個未變動）")
     
     # 清理臨時檔案
     if os.path.exists('temp_credentials.json'):
         os.remove('temp_credentials.json')
         print("🗑️  已清理臨時憑證檔案")
+    
+    if failed:
+        exit(1)
 
 
 if __name__ == '__main__':
     upload_to_drive()
-